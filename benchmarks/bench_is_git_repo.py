@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+bench_is_git_repo
+----------------------------------
+
+Micro-benchmark of utils.is_git_repo over a synthetic src tree of 100
+repositories (a mix of plain clones, worktrees and gitfile checkouts) plus
+the directories between them, compared with asking GitPython directly.
+
+    python benchmarks/bench_is_git_repo.py [-n ROUNDS]
+"""
+from __future__ import absolute_import, print_function
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from zendev import utils  # noqa: E402
+
+REPOS = 100
+
+
+def git(*args):
+    with open(os.devnull, "w") as devnull:
+        subprocess.check_call(("git",) + args, stdout=devnull, stderr=devnull)
+
+
+def make_tree(tmp):
+    """
+    Create the tree; return every directory in it.
+    """
+    env = {
+        "GIT_AUTHOR_NAME": "zendev",
+        "GIT_AUTHOR_EMAIL": "zendev@example.com",
+        "GIT_COMMITTER_NAME": "zendev",
+        "GIT_COMMITTER_EMAIL": "zendev@example.com",
+    }
+    os.environ.update(env)
+    src = os.path.join(tmp, "src")
+    os.makedirs(os.path.join(tmp, "gitdirs"))
+    paths = []
+    for i in range(REPOS):
+        org = os.path.join(src, "github.com", "org%d" % (i % 10))
+        path = os.path.join(org, "repo%d" % i)
+        if i % 10 == 9:
+            # A worktree of an earlier repo
+            git("-C", paths[-2], "worktree", "add", "-q", "--detach", path)
+        elif i % 10 == 8:
+            gitdir = os.path.join(tmp, "gitdirs", "repo%d" % i)
+            git("init", "-q", "--separate-git-dir", gitdir, path)
+        else:
+            git("init", "-q", path)
+            git("-C", path, "commit", "-q", "--allow-empty", "-m", "init")
+        paths.append(path)
+    dirs = [src, os.path.join(src, "github.com")]
+    dirs.extend(os.path.dirname(p) for p in paths[:10])
+    return paths + dirs
+
+
+def gitpython(path):
+    import git
+
+    try:
+        git.Repo(path)
+        return True
+    except git.InvalidGitRepositoryError:
+        return False
+
+
+def timed(func, paths, rounds, setup=None):
+    samples = []
+    for _ in range(rounds):
+        if setup is not None:
+            setup()
+        start = time.time()
+        for path in paths:
+            func(path)
+        samples.append(time.time() - start)
+    return sorted(samples)[len(samples) // 2]
+
+
+def clear():
+    utils._git_repos = utils.LRUCache(utils._git_repos.maxsize)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    try:
+        paths = make_tree(tmp)
+        expected = [gitpython(p) for p in paths]
+        clear()
+        assert [utils.is_git_repo(p) for p in paths] == expected
+        print("%d paths, %d repositories" % (len(paths), sum(expected)))
+        for name, func, setup in (
+            ("gitpython", gitpython, None),
+            ("stat (cold)", utils.is_git_repo, clear),
+            ("stat (cached)", utils.is_git_repo, None),
+        ):
+            median = timed(func, paths, args.rounds, setup)
+            print(
+                "%-14s %8.2fms %8.1fus/path"
+                % (name, median * 1000, median * 1e6 / len(paths))
+            )
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
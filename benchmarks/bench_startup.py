@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+bench_startup
+----------------------------------
+
+Cold-start timings for the zendev commands our shell wrappers call most.
+
+Every sample runs a fresh interpreter against a throwaway $HOME holding a
+single initialized environment, so nothing is shared between runs except
+the OS page cache.
+
+    python benchmarks/bench_startup.py [-n RUNS]
+"""
+from __future__ import absolute_import, print_function
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+SCENARIOS = (
+    ("root", ["root"], {}),
+    ("env", ["env"], {}),
+    ("ls", ["ls"], {}),
+    (
+        "complete",
+        [],
+        {
+            "_ARGCOMPLETE": "1",
+            "_ARGCOMPLETE_STDOUT_FILENAME": os.devnull,
+            "COMP_LINE": "zendev se",
+            "COMP_POINT": "9",
+        },
+    ),
+)
+
+
+def make_home(tmp):
+    home = os.path.join(tmp, "home")
+    envroot = os.path.join(tmp, "bench")
+    os.makedirs(os.path.join(home, ".zendev"))
+    os.makedirs(os.path.join(envroot, ".zendev"))
+    config = {
+        "current": "bench",
+        "environments": {"bench": {"path": envroot, "version": "v2"}},
+    }
+    with open(os.path.join(home, ".zendev", "environments.json"), "w") as f:
+        json.dump(config, f)
+    return home
+
+
+def run(argv, home, extra):
+    env = dict(os.environ)
+    env.update(extra)
+    env["HOME"] = home
+    env["PYTHONPATH"] = ROOT
+    env.pop("ZDCTLCHANNEL", None)
+    cmd = [sys.executable, "-m", "zendev.zendev"] + argv
+    start = time.time()
+    with open(os.devnull, "w") as devnull:
+        subprocess.call(cmd, env=env, stdout=devnull, stderr=devnull)
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    try:
+        home = make_home(tmp)
+        print("%-10s %10s %10s %10s" % ("command", "min", "median", "max"))
+        for name, argv, extra in SCENARIOS:
+            samples = sorted(
+                run(argv, home, extra) for _ in range(args.runs)
+            )
+            print(
+                "%-10s %8.1fms %8.1fms %8.1fms"
+                % (
+                    name,
+                    samples[0] * 1000,
+                    samples[len(samples) // 2] * 1000,
+                    samples[-1] * 1000,
+                )
+            )
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+bench_transforms
+----------------------------------
+
+Micro-benchmark of the template transforms over a synthetic template with
+thousands of services (like a template merged with many modules), applied
+in one traversal by transforms.apply compared with one traversal per
+transform.
+
+    python benchmarks/bench_transforms.py [-n ROUNDS] [-s SERVICES]
+"""
+from __future__ import absolute_import, print_function
+
+import argparse
+import copy
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from zendev import transforms  # noqa: E402
+
+FANOUT = 8
+
+
+def service(i):
+    name = "svc%d" % i
+    if i % 1000 == 1:
+        name = "reader-bigtable"
+    elif i % 1000 == 2:
+        name = "zencatalogservice"
+    return {
+        "Name": name,
+        "Title": name,
+        "Command": "su - zenoss -c 'run %s'" % name,
+        "HealthChecks": {
+            "running": {"Script": "pgrep %s" % name},
+            "catalogservice_answering": {"Script": "true"},
+        },
+        "Prereqs": [
+            {"Name": "zencatalogservice response"},
+            {"Name": "%s ready" % name},
+        ],
+        "Context": {"global.conf.auth0-tenant": "x"},
+        "ConfigFiles": {},
+        "Services": [],
+    }
+
+
+def make_template(count):
+    """
+    A template of count services, each with up to FANOUT children.
+    """
+    services = [service(i) for i in range(count)]
+    for i, svc in enumerate(services[1:], 1):
+        services[(i - 1) // FANOUT]["Services"].append(svc)
+    return {"Services": [services[0]]}
+
+
+def single_pass(template, selected):
+    transforms.apply(template["Services"], selected)
+
+
+def per_transform(template, selected):
+    for transform in selected:
+        transforms.apply(template["Services"], [transform])
+
+
+def timed(func, template, selected, rounds):
+    samples = []
+    for _ in range(rounds):
+        copied = copy.deepcopy(template)
+        start = time.time()
+        func(copied, selected)
+        samples.append(time.time() - start)
+    return sorted(samples)[len(samples) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--rounds", type=int, default=20)
+    parser.add_argument("-s", "--services", type=int, default=5000)
+    args = parser.parse_args()
+
+    # The transforms report what they change; keep that out of the timings
+    transforms.info = lambda msg: None
+    template = make_template(args.services)
+    selected = transforms.select("Zenoss.resmgr")
+    print("%d services, %d transforms" % (args.services, len(selected)))
+    for name, func in (
+        ("per transform", per_transform),
+        ("single pass", single_pass),
+    ):
+        median = timed(func, template, selected, args.rounds)
+        print(
+            "%-14s %8.2fms %8.2fus/service"
+            % (name, median * 1000, median * 1e6 / args.services)
+        )
+
+
+if __name__ == "__main__":
+    main()
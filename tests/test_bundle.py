@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_bundle
+----------------------------------
+
+Tests for `bundle` module.
+"""
+
+import json
+import os
+import tarfile
+import unittest
+
+from zendev.bundle import BundleError, export_environment, import_environment
+from zendev.environment import CONFIG_DIR, ZenDevEnvironment
+from zendev.repo import Repository
+
+from .test_repo import RepoTestCase, commit, git, make_remote
+
+
+class TestRepoBundle(RepoTestCase):
+    def test_round_trip(self):
+        remote = make_remote(self.tempdir, "a")
+        repo = self.clone(remote, "a")
+        git(repo.path, "tag", "v1")
+        git(repo.path, "checkout", "-q", "-b", "feature")
+        commit(repo.path, "feature", "feature")
+        bundle = self.tempdir.join("a.bundle")
+        repo.export_bundle(bundle)
+
+        # Importing mustn't need the remote
+        remote.move(self.tempdir.join("moved.git"))
+        path = self.tempdir.join("imported", "a")
+        imported = Repository(path.strpath, path.strpath, remote.strpath)
+        imported.import_bundle(bundle)
+        self.assertEqual(imported.status().branch, "develop")
+        self.assertEqual(
+            git(path, "rev-parse", "--abbrev-ref", "@{upstream}").strip(),
+            "origin/develop",
+        )
+        self.assertEqual(
+            git(path, "rev-parse", "feature", "v1"),
+            git(repo.path, "rev-parse", "feature", "v1"),
+        )
+        self.assertEqual(
+            git(path, "config", "remote.origin.url").strip(), remote.strpath
+        )
+        self.assertRaises(Exception, imported.import_bundle, bundle)
+
+
+class TestEnvironmentBundle(RepoTestCase):
+    def setUp(self):
+        os.environ["HOME"] = self.tempdir.strpath
+        self.remotes = [make_remote(self.tempdir, n) for n in ("a", "b")]
+        for remote in self.remotes:
+            # git-flow needs a master branch to initialize
+            git(remote, "branch", "master", "develop")
+
+    def environment(self, name):
+        root = self.tempdir.join(name)
+        root.ensure(CONFIG_DIR, dir=True)
+        env = ZenDevEnvironment(path=root)
+        env._repos_file.write(
+            json.dumps([{"repo": r.strpath} for r in self.remotes])
+        )
+        return env
+
+    def test_export_and_import(self):
+        source = self.environment("source")
+        repos = source.repos()
+        for repo in repos:
+            repo.restore()
+        archive = self.tempdir.join("env.tar")
+        results = list(export_environment(source, repos, archive))
+        self.assertEqual([exc for _, exc in results], [None, None])
+
+        target = self.environment("target")
+        target._repos_file.remove()
+        config, results = import_environment(target, archive)
+        imported = sorted(r.path for r, exc in results if exc is None)
+        self.assertEqual(imported, sorted(r.path for r in target.repos()))
+        self.assertEqual(target._repos_file.read(), source._repos_file.read())
+        for repo in target.repos():
+            self.assertEqual(repo.status().branch, "develop")
+            # As initialized as a cloned repo
+            self.assertTrue(repo.is_initialized())
+
+    def test_not_a_bundle(self):
+        archive = self.tempdir.join("env.tar")
+        archive.write("junk")
+        self.assertRaises(
+            BundleError, import_environment, self.environment("t"), archive
+        )
+        with tarfile.open(archive.strpath, "w") as tar:
+            tar.add(self.tempdir.join("t", CONFIG_DIR).strpath, "other")
+        self.assertRaises(
+            BundleError, import_environment, self.environment("u"), archive
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_cache
+----------------------------------
+
+Tests for `cache` module, using purely local remotes.
+"""
+
+import unittest
+
+from zendev.cache import ObjectCache
+from zendev.repo import Repository
+from zendev.restore import restore_repo
+
+from .test_repo import RepoTestCase, commit, git, make_remote
+
+
+class TestObjectCache(RepoTestCase):
+    def test_clone_borrows_from_cache(self):
+        # file:// keeps git from hardlinking objects of local clones
+        url = "file://" + make_remote(self.tempdir, "a").strpath
+        cache = ObjectCache(self.tempdir.join("cache"))
+        mirror = cache.ensure(url)
+        self.assertEqual(cache.mirrors(), [mirror])
+        self.assertEqual(cache.url(mirror), url)
+        self.assertEqual(cache.ensure(url), mirror)
+
+        path = self.tempdir.join("env", "a")
+        repo = Repository(path.strpath, path.strpath, url)
+        repo.reference = mirror
+        self.assertEqual(repo.restore(), "cloned")
+        alternates = path.join(".git", "objects", "info", "alternates")
+        self.assertIn(mirror.join("objects").strpath, alternates.read())
+        self.assertEqual(git(path, "count-objects").split()[0], "0")
+
+    def test_shallow_restore_creates_no_mirror(self):
+        url = "file://" + make_remote(self.tempdir, "a").strpath
+        cache = ObjectCache(self.tempdir.join("cache"))
+        path = self.tempdir.join("env", "a")
+        repo = Repository(path.strpath, path.strpath, url)
+        self.assertEqual(
+            restore_repo(repo, shallow=True, cache=cache), "cloned"
+        )
+        self.assertEqual(cache.mirrors(), [])
+        self.assertEqual(
+            git(path, "rev-parse", "--is-shallow-repository"), "true\n"
+        )
+
+    def test_update(self):
+        remote = make_remote(self.tempdir, "a")
+        cache = ObjectCache(self.tempdir.join("cache"))
+        mirror = cache.ensure(remote.strpath)
+
+        work = self.clone(remote, "work")
+        commit(work.path, "new", "new")
+        git(work.path, "push", "-q", "origin", "develop")
+        head = git(work.path, "rev-parse", "HEAD")
+
+        results = list(cache.update_all())
+        self.assertEqual([(m, e) for m, _, e in results], [(mirror, None)])
+        self.assertEqual(git(mirror, "rev-parse", "develop"), head)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_catalog
+----------------------------------
+
+Tests for `catalog` module.
+"""
+
+import unittest
+
+import py
+
+from zendev.catalog import RepoCatalog
+from zendev.repo import Repository
+
+from .test_repo import RepoTestCase, git, make_remote
+
+
+class TestRepoCatalog(RepoTestCase):
+    def setUp(self):
+        self.srcroot = self.tempdir.join("src")
+        repos = []
+        for name in ("github.com/zenoss/a", "github.com/other/b", "c"):
+            remote = make_remote(self.tempdir, name.replace("/", "-"))
+            repos.append(self.clone(remote, name))
+        path = self.srcroot.join("github.com", "zenoss", "missing")
+        repos.append(Repository(path.strpath, path.strpath, "zenoss/missing"))
+        self.catalog = RepoCatalog(self.srcroot, repos)
+
+    def names(self, entries):
+        return [e.name for e in entries]
+
+    def test_fields(self):
+        entries = self.catalog.entries()
+        self.assertEqual(
+            [(e.name, e.owner, e.depth) for e in entries],
+            [
+                ("c", "", 0),
+                ("github.com/zenoss/a", "zenoss", 2),
+                ("github.com/other/b", "other", 2),
+                ("github.com/zenoss/missing", "zenoss", 2),
+            ],
+        )
+        self.assertEqual(len(self.catalog), 4)
+        self.assertIs(self.catalog.get("c"), entries[0].repo)
+        self.assertIsNone(self.catalog.get("nothing"))
+
+    def test_branch(self):
+        a, missing = self.catalog.entries()[1], self.catalog.entries()[3]
+        self.assertEqual(self.catalog.branch(a), "develop")
+        git(a.path, "checkout", "-q", "-b", "feature/x")
+        self.assertEqual(self.catalog.branch(a), "feature/x")
+        git(a.path, "checkout", "-q", "--detach")
+        self.assertEqual(self.catalog.branch(a), "")
+        self.assertIsNone(self.catalog.branch(missing))
+
+    def test_query(self):
+        a = self.catalog.entries()[1]
+        git(a.path, "checkout", "-q", "-b", "feature/x")
+        a.repo.path.join("new").write("new")
+        query = self.catalog.query
+        self.assertEqual(
+            self.names(query(owner="zenoss", cloned=True)), [a.name]
+        )
+        self.assertEqual(
+            self.names(query(names=["B$", "^.*/c$"])),
+            ["c", "github.com/other/b"],
+        )
+        self.assertEqual(
+            self.names(query(owner="zenoss", branch="feature/*", dirty=True)),
+            [a.name],
+        )
+        self.assertEqual(
+            self.names(query(dirty=False)), ["c", "github.com/other/b"]
+        )
+        self.assertEqual(
+            self.names(query(cloned=False)), ["github.com/zenoss/missing"]
+        )
+
+    def test_dirty_is_current(self):
+        a = self.catalog.entries()[1]
+        self.assertFalse(self.catalog.dirty(a))
+        # Touches neither the index nor HEAD
+        py.path.local(a.path).join("untracked").write("new")
+        self.assertTrue(self.catalog.dirty(a))
+
+    def test_last_fetch(self):
+        a = self.catalog.entries()[1]
+        self.assertIsNone(self.catalog.last_fetch(a))
+        git(a.path, "fetch", "-q")
+        self.assertIsNotNone(self.catalog.last_fetch(a))
+
+    def test_last_prefetch(self):
+        catalog = RepoCatalog(
+            self.srcroot, self.catalog, {"github.com/zenoss/a": 1000}
+        )
+        a = catalog.entries()[1]
+        self.assertEqual(catalog.last_fetch(a), 1000)
+        # Prefetching doesn't leave an mtime that says when it last ran
+        a.repo.prefetch()
+        self.assertEqual(catalog.last_fetch(a), 1000)
+        git(a.path, "fetch", "-q")
+        self.assertGreater(catalog.last_fetch(a), 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
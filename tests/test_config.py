@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_config
+----------------------------------
+
+Tests for `config` module.
+"""
+
+import json
+import tempfile
+import unittest
+
+import py
+
+from zendev import config
+from zendev.config import ZendevConfig
+
+
+class TestZendevConfig(unittest.TestCase):
+    def run(self, *args, **kwargs):
+        self.tempdir = py.path.local(tempfile.mkdtemp())
+        self.path = self.tempdir.join("environments.json")
+        try:
+            super(TestZendevConfig, self).run(*args, **kwargs)
+        finally:
+            self.tempdir.remove()
+
+    def test_save_only_on_change(self):
+        cfg = ZendevConfig(self.path)
+        cfg.save()
+        mtime = self.path.mtime()
+        self.path.setmtime(mtime - 10)
+        cfg.save()
+        self.assertEqual(self.path.mtime(), mtime - 10)
+        cfg.add("foo", self.tempdir.join("foo"))
+        self.assertNotEqual(self.path.mtime(), mtime - 10)
+        self.assertFalse(cfg.dirty)
+
+    def test_concurrent_changes_are_merged(self):
+        ZendevConfig(self.path).save()
+        first = ZendevConfig(self.path)
+        second = ZendevConfig(self.path)
+        first.add("foo", self.tempdir.join("foo"))
+        second.add("bar", self.tempdir.join("bar"))
+        second.current = "bar"
+        data = json.loads(self.path.read())
+        self.assertEqual(set(data["environments"]), set(["foo", "bar"]))
+        self.assertEqual(data["current"], "bar")
+        self.assertEqual(
+            [p.basename for p in self.tempdir.listdir()],
+            [p.basename for p in self.tempdir.listdir("environments.json*")],
+        )
+
+    def test_get_config_is_cached(self):
+        orig = config.CONFIG_DIR
+        config.CONFIG_DIR = self.tempdir.strpath
+        try:
+            self.assertIs(config.get_config(), config.get_config())
+        finally:
+            config.CONFIG_DIR = orig
+            config._configs.clear()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_gitquery
+----------------------------------
+
+Tests for `gitquery` module, using purely local remotes.
+"""
+
+import unittest
+
+from zendev import gitquery
+from zendev.gitquery import GitQuery
+
+from .test_repo import RepoTestCase, commit, git, make_remote
+
+
+class TestGitQuery(RepoTestCase):
+    def setUp(self):
+        self.remote = make_remote(self.tempdir, "a")
+        self.repo = self.clone(self.remote, "a")
+        self.query = GitQuery(self.repo.path)
+
+    def tearDown(self):
+        self.query.close()
+
+    def head(self):
+        return git(self.repo.path, "rev-parse", "HEAD").strip()
+
+    def test_refs(self):
+        self.assertEqual(self.query.branch(), "develop")
+        self.assertEqual(
+            self.query.upstream("develop"), "refs/remotes/origin/develop"
+        )
+        self.assertEqual(self.query.resolve("HEAD"), self.head())
+        self.assertIsNone(self.query.resolve("nonexistent"))
+        git(self.repo.path, "checkout", "-q", "--detach")
+        self.assertEqual(self.query.branch(), "develop")
+        self.query.refresh()
+        self.assertIsNone(self.query.branch())
+        self.assertEqual(self.query.resolve("HEAD"), self.head())
+
+    def test_is_ancestor(self):
+        first = self.head()
+        for i in range(5):
+            commit(self.repo.path, "file%d" % i, str(i))
+        self.query.refresh()
+        self.assertTrue(self.query.is_ancestor(first, "HEAD"))
+        self.assertTrue(self.query.is_ancestor("HEAD", "HEAD"))
+        self.assertFalse(self.query.is_ancestor("HEAD", first))
+        git(self.repo.path, "checkout", "-q", "-b", "other", first)
+        commit(self.repo.path, "other", "other")
+        self.query.refresh()
+        self.assertFalse(self.query.is_ancestor("develop", "other"))
+        self.assertFalse(self.query.is_ancestor("other", "develop"))
+
+    def test_long_walks_fall_back_to_git(self):
+        first = self.head()
+        for i in range(5):
+            commit(self.repo.path, "file%d" % i, str(i))
+        orig = gitquery.MAX_WALK
+        gitquery.MAX_WALK = 2
+        try:
+            self.assertTrue(self.query.is_ancestor(first, "HEAD"))
+            self.assertFalse(self.query.is_ancestor("HEAD", first))
+        finally:
+            gitquery.MAX_WALK = orig
+
+    def test_processes_are_reused(self):
+        self.query.resolve("HEAD^")
+        check = self.query._check
+        self.query.resolve("HEAD~0")
+        self.assertIs(self.query._check, check)
+        self.query.close()
+        self.assertIsNone(self.query._check)
+        self.assertEqual(self.query.resolve("HEAD~0"), self.head())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_maintenance
+----------------------------------
+
+Tests for `maintenance` module, using purely local remotes.
+"""
+
+import unittest
+
+from zendev import maintenance
+from zendev.maintenance import AlreadyRunning, Maintenance, repo_target
+
+from .test_repo import RepoTestCase, commit, git, make_remote
+
+
+class TestMaintenance(RepoTestCase):
+    def setUp(self):
+        self.repo = self.clone(make_remote(self.tempdir, "a"), "a")
+        self.state = Maintenance(self.tempdir.join("maintenance.json"))
+
+    def test_plan_and_run(self):
+        worktree = self.tempdir.join("worktree")
+        git(self.repo.path, "worktree", "add", "-q", "--detach", worktree)
+        targets = [repo_target(self.repo.path), repo_target(worktree)]
+        self.assertEqual(targets[0].key, targets[1].key)
+        with self.state.locked():
+            planned = list(self.state.plan(targets))
+            self.assertEqual(
+                [reason for _, reason in planned], ["never maintained"]
+            )
+            results = list(self.state.run(planned))
+            self.assertIsNone(results[0][2])
+            self.assertEqual(list(self.state.plan(targets)), [])
+            self.assertEqual(len(list(self.state.plan(targets, True))), 1)
+        objects = self.repo.path.join(".git", "objects")
+        self.assertTrue(objects.join("info", "commit-graph").check())
+
+        with Maintenance(self.state._path).locked() as state:
+            self.assertEqual(list(state.plan(targets)), [])
+            target = targets[0]
+            when = state.last_run[target.key]
+            self.assertIsNone(state.needs(target, now=when + 60))
+            self.assertEqual(
+                state.needs(target, now=when + 3 * 86400, interval=86400),
+                "last maintained 3 days ago",
+            )
+
+    def test_loose_objects(self):
+        target = repo_target(self.repo.path)
+        with self.state.locked():
+            self.state.record(target)
+            self.assertIsNone(self.state.needs(target))
+            orig = maintenance.LOOSE_OBJECTS
+            maintenance.LOOSE_OBJECTS = 1
+            try:
+                commit(self.repo.path, "file", "content")
+                self.assertIn("loose objects", self.state.needs(target))
+            finally:
+                maintenance.LOOSE_OBJECTS = orig
+
+    def test_only_one_process(self):
+        with self.state.locked():
+            other = Maintenance(self.state._path)
+            with self.assertRaises(AlreadyRunning):
+                with other.locked():
+                    pass
+
+
+if __name__ == "__main__":
+    unittest.main()
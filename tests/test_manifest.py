@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_manifest
+----------------------------------
+
+Tests for `manifest` module.
+"""
+
+import json
+import unittest
+
+from zendev import manifest
+from zendev.manifest import ManifestCache, RepoIndex
+
+from .test_repo import RepoTestCase, commit, git
+
+
+class TestManifestCache(RepoTestCase):
+    def setUp(self):
+        self.pa = self.tempdir.join("product-assembly")
+        self.pa.ensure(dir=True)
+        git(self.pa, "init", "-q")
+        commit(self.pa, "repos.sh", "echo one")
+        self.cache = ManifestCache(self.tempdir.join("manifests"))
+
+    def test_key(self):
+        key = self.cache.key(self.pa)
+        self.assertEqual(key, self.cache.key(self.pa))
+        self.pa.join("repos.sh").write("echo two")
+        self.assertIsNone(self.cache.key(self.pa))
+        git(self.pa, "commit", "-q", "-am", "two")
+        self.assertNotIn(self.cache.key(self.pa), (None, key))
+
+    def test_put_and_get(self):
+        key = self.cache.key(self.pa)
+        self.assertIsNone(self.cache.get(key))
+        generated = self.tempdir.join(".repos.json")
+        generated.write('[{"repo": "zenoss/a"}]')
+        self.cache.put(key, generated)
+        self.assertEqual(self.cache.get(key).read(), generated.read())
+        self.assertIsNone(self.cache.get(None))
+
+    def test_old_manifests_are_dropped(self):
+        generated = self.tempdir.join(".repos.json")
+        generated.write("[]")
+        for i in range(manifest.KEEP_MANIFESTS + 3):
+            self.cache.put("key%d" % i, generated)
+            self.cache.get("key%d" % i).setmtime(i)
+        self.assertEqual(
+            len(self.cache.root.listdir()), manifest.KEEP_MANIFESTS
+        )
+        self.assertIsNone(self.cache.get("key0"))
+
+
+class TestRepoIndex(RepoTestCase):
+    def test_entries(self):
+        generated = self.tempdir.join(".repos.json")
+        generated.write(
+            json.dumps(
+                [
+                    {"repo": "zenoss/a", "ref": "develop"},
+                    {"repo": "git@github.com:zenoss/b.git"},
+                ]
+            )
+        )
+        indexfile = self.tempdir.join("index.json")
+        index = RepoIndex(generated, indexfile)
+        expected = [
+            ("zenoss/a", "zenoss/a", "develop"),
+            ("github.com/zenoss/b", "git@github.com:zenoss/b.git", None),
+        ]
+        self.assertEqual(index.entries(), expected)
+        self.assertIs(index.entries(), index.entries())
+        self.assertEqual(RepoIndex(generated, indexfile).entries(), expected)
+
+        generated.write('[{"repo": "zenoss/c"}]')
+        generated.setmtime(generated.mtime() + 10)
+        self.assertEqual(index.entries(), [("zenoss/c", "zenoss/c", None)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_prefetch
+----------------------------------
+
+Tests for `prefetch` module.
+"""
+
+import json
+import os
+import unittest
+
+from zendev import prefetch
+from zendev.environment import CONFIG_DIR, ZenDevEnvironment
+from zendev.prefetch import PrefetchState
+
+from .test_repo import RepoTestCase, commit, git, make_remote
+
+
+class TestPrefetch(RepoTestCase):
+    def setUp(self):
+        self.remote = make_remote(self.tempdir, "a")
+        self.repo = self.clone(self.remote, "a")
+        self.seed = self.tempdir.join("seed", "a")
+
+    def push(self, filename):
+        commit(self.seed, filename, filename)
+        git(self.seed, "push", "-q", self.remote.strpath, "develop")
+        return git(self.seed, "rev-parse", "HEAD").strip()
+
+    def rev(self, ref):
+        return git(self.repo.path, "rev-parse", ref).strip()
+
+    def test_prefetch_leaves_remote_branches_alone(self):
+        before = self.rev("origin/develop")
+        head = self.push("new")
+        self.repo.prefetch()
+        self.assertEqual(
+            self.rev("refs/prefetch/remotes/origin/develop"), head
+        )
+        self.assertEqual(self.rev("origin/develop"), before)
+        self.assertFalse(self.repo.path.join("new").check())
+
+    def test_pull_from_prefetched_refs(self):
+        head = self.push("new")
+        self.repo.prefetch()
+        # Make sure the remote isn't contacted
+        git(self.repo.path, "remote", "set-url", "origin", "/nonexistent")
+        self.repo.prefetched = True
+        self.assertEqual(self.repo.pull().outcome, "fast-forwarded")
+        self.assertEqual(self.rev("HEAD"), head)
+
+    def test_newer_remote_branches_stay(self):
+        self.repo.prefetch()
+        # Pushing from this clone moves origin/develop past the prefetch
+        commit(self.repo.path, "mine", "mine")
+        git(self.repo.path, "push", "-q", "origin", "develop")
+        head = self.rev("origin/develop")
+        self.repo.fetch(prefetched=True)
+        self.assertEqual(self.rev("origin/develop"), head)
+
+    def test_restore_falls_back_to_remote(self):
+        self.repo.prefetch()
+        git(self.seed, "tag", "v1")
+        git(self.seed, "push", "-q", self.remote.strpath, "v1")
+        self.repo.ref = "v1"
+        self.repo.prefetched = True
+        self.assertEqual(self.repo.restore(), "checked out")
+        self.assertEqual(self.rev("HEAD"), self.rev("v1"))
+
+
+class TestEnvironmentPrefetch(RepoTestCase):
+    def test_product_assembly(self):
+        os.environ["HOME"] = self.tempdir.strpath
+        root = self.tempdir.join("env")
+        root.ensure(CONFIG_DIR, dir=True)
+        env = ZenDevEnvironment(path=root)
+        env._repos_file.write(json.dumps([]))
+        remote = make_remote(self.tempdir, "product-assembly")
+        git(self.tempdir, "clone", "-q", remote.strpath, env._productAssembly)
+        self.assertFalse(env._ensure_product_assembly().prefetched)
+
+        seed = self.tempdir.join("seed", "product-assembly")
+        commit(seed, "new", "new")
+        git(seed, "push", "-q", remote.strpath, "develop")
+        results = list(env.prefetch())
+        self.assertEqual([exc for _, _, exc in results], [None])
+        self.assertEqual(results[0][0].path, env._productAssembly)
+
+        # restore fast-forwards it without going to the network
+        env = ZenDevEnvironment(path=root)
+        repo = env._ensure_product_assembly()
+        self.assertTrue(repo.prefetched)
+        git(repo.path, "remote", "set-url", "origin", "/nonexistent")
+        repo.fetch()
+        self.assertEqual(
+            git(repo.path, "rev-parse", "origin/develop"),
+            git(seed, "rev-parse", "HEAD"),
+        )
+
+
+class TestPrefetchState(RepoTestCase):
+    def test_fresh(self):
+        path = self.tempdir.join("prefetch.json")
+        state = PrefetchState(path)
+        self.assertFalse(state.fresh("a"))
+        state.interval = 60
+        state.record("a", when=1000)
+        state.save()
+        state = PrefetchState(path)
+        self.assertTrue(state.fresh("a", now=1100))
+        self.assertFalse(state.fresh("a", now=1000 + 60 * 3))
+
+
+class FakeEnv(object):
+    def __init__(self):
+        self.rounds = []
+
+    def prefetch(self, workers, interval):
+        self.rounds.append((workers, interval))
+        return iter([("repo", 0.5, None)])
+
+
+class TestRun(unittest.TestCase):
+    def test_rounds_and_jitter(self):
+        env, waits = FakeEnv(), []
+        results = list(
+            prefetch.run(
+                lambda: env,
+                interval=100,
+                workers=3,
+                jitter=0.5,
+                rounds=3,
+                sleep=waits.append,
+            )
+        )
+        self.assertEqual(results, [(env, "repo", 0.5, None)] * 3)
+        self.assertEqual(env.rounds, [(3, 100)] * 3)
+        self.assertEqual(len(waits), 2)
+        self.assertTrue(all(50 <= w <= 150 for w in waits))
+
+    def test_no_environment(self):
+        waits = []
+        results = prefetch.run(lambda: None, rounds=2, sleep=waits.append)
+        self.assertEqual(list(results), [])
+        self.assertEqual(len(waits), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_readiness
+----------------------------------
+
+Tests for `readiness` module.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import py
+from six.moves.BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+from zendev.cmd.serviced import Serviced
+from zendev.environment import CONFIG_DIR, ZenDevEnvironment
+from zendev.readiness import (
+    READY_HISTORY,
+    NotReady,
+    ReadinessProbe,
+    ReadyHistory,
+)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(self.path)
+        server.clients.add(self.client_address)
+        ready = len(server.requests) > server.unready
+        if self.path in server.down:
+            ready = False
+        self.send_response(200 if ready else 503)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class TestReadinessProbe(unittest.TestCase):
+    def setUp(self):
+        self.server = HTTPServer(("127.0.0.1", 0), Handler)
+        self.server.requests = []
+        self.server.clients = set()
+        self.server.unready = 0
+        self.server.down = ()
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.probe = ReadinessProbe(
+            "http://127.0.0.1:%d/" % self.server.server_port, ["/status"]
+        )
+
+    def tearDown(self):
+        self.probe.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_backoff(self):
+        # The UI answers the fifth probe
+        self.server.unready = 4
+        delays = []
+        secs = self.probe.wait(first_delay=0.01, sleep=delays.append)
+        self.assertGreaterEqual(secs, 0)
+        self.assertEqual(self.probe.probes, 5)
+        self.assertEqual(len(delays), 4)
+        self.assertEqual(delays, sorted(delays))
+        self.assertEqual(delays[0], 0.01)
+        # Every probe went over one connection
+        self.assertEqual(len(self.server.clients), 1)
+
+    def test_checks(self):
+        self.assertTrue(self.probe.check())
+        self.assertEqual(self.server.requests, ["/", "/status"])
+        self.server.down = ("/status",)
+        self.assertFalse(self.probe.check())
+        self.assertIn("/status: 503", self.probe.reason)
+
+    def test_timeout(self):
+        self.server.down = ("/status",)
+        now = [0]
+
+        def sleep(secs):
+            now[0] += secs
+
+        self.assertRaises(
+            NotReady, self.probe.wait, 3, clock=lambda: now[0], sleep=sleep
+        )
+        self.assertLessEqual(now[0], 3)
+
+    def test_not_listening(self):
+        port = self.server.server_port
+        self.server.server_close()
+        probe = ReadinessProbe("http://127.0.0.1:%d" % port)
+        self.assertFalse(probe.check())
+        self.assertIn("ConnectionError", probe.reason)
+
+
+class TestReadyHistory(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = py.path.local(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir.strpath)
+
+    def test_record(self):
+        path = self.tempdir.join("ready.json")
+        history = ReadyHistory(path)
+        self.assertIsNone(history.median())
+        for secs in (3, 1, 2, 10):
+            history.record(secs, 1)
+        history.save()
+        history = ReadyHistory(path)
+        self.assertEqual(len(history.startups), 4)
+        self.assertEqual(history.median(), 2.5)
+        self.assertEqual(history.median(3), 2)
+
+
+class ReadyProbe(object):
+    probes = 1
+
+    def wait(self, timeout, progress=None):
+        return 1.5
+
+
+class TestWaitReady(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = py.path.local(tempfile.mkdtemp())
+        os.environ["HOME"] = self.tempdir.strpath
+        root = self.tempdir.join("env")
+        self.config = root.ensure(CONFIG_DIR, dir=True)
+        self.serviced = Serviced(ZenDevEnvironment(path=root))
+        self.serviced.probe = ReadyProbe()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir.strpath)
+
+    def test_record(self):
+        # serviced was already running, so this says nothing about startup
+        self.assertEqual(self.serviced.wait_ready(10, record=False), 1.5)
+        self.assertFalse(self.config.join(READY_HISTORY).check())
+        self.serviced.wait_ready(10)
+        history = ReadyHistory(self.config.join(READY_HISTORY))
+        self.assertEqual(len(history.startups), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
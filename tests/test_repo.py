@@ -0,0 +1,382 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_repo
+----------------------------------
+
+Tests for `repo` module, using purely local remotes.
+"""
+
+import os
+import subprocess
+import tempfile
+import unittest
+
+import py
+
+from zendev.config import ZendevConfig
+from zendev import repo as repo_module
+from zendev.repo import GitError, Repository, parse_status
+from zendev.utils import LRUCache, is_git_repo, parallel
+
+_GIT_ENV = {
+    "GIT_AUTHOR_NAME": "zendev",
+    "GIT_AUTHOR_EMAIL": "zendev@example.com",
+    "GIT_COMMITTER_NAME": "zendev",
+    "GIT_COMMITTER_EMAIL": "zendev@example.com",
+}
+
+
+def git(cwd, *args):
+    return subprocess.check_output(
+        ("git",) + args, cwd=str(cwd), stderr=subprocess.STDOUT
+    ).decode("utf-8")
+
+
+def make_remote(root, name, branch="develop"):
+    """
+    Create a bare repo with one commit on branch; return its path.
+    """
+    remote = root.join("remotes", name + ".git")
+    work = root.join("seed", name)
+    work.ensure(dir=True)
+    git(work, "init", "-q")
+    git(work, "checkout", "-q", "-b", branch)
+    work.join("README").write(name)
+    git(work, "add", "README")
+    git(work, "commit", "-q", "-m", "initial")
+    git(root, "clone", "-q", "--bare", work.strpath, remote.strpath)
+    return remote
+
+
+def commit(path, filename, content):
+    path.join(filename).write(content)
+    git(path, "add", filename)
+    git(path, "commit", "-q", "-m", "change " + filename)
+
+
+class RepoTestCase(unittest.TestCase):
+    def run(self, *args, **kwargs):
+        self.tempdir = py.path.local(tempfile.mkdtemp())
+        environ = dict(os.environ)
+        os.environ.update(_GIT_ENV)
+        try:
+            super(RepoTestCase, self).run(*args, **kwargs)
+        finally:
+            os.environ.clear()
+            os.environ.update(environ)
+            self.tempdir.remove()
+
+    def clone(self, remote, name):
+        path = self.tempdir.join("src", name)
+        git(self.tempdir, "clone", "-q", remote.strpath, path.strpath)
+        return Repository(path.strpath, path.strpath, remote.strpath)
+
+
+class TestStatus(RepoTestCase):
+    def test_parse_status(self):
+        output = "\n".join(
+            [
+                "# branch.oid 0123456789abcdef",
+                "# branch.head feature/x",
+                "# branch.upstream origin/feature/x",
+                "# branch.ab +2 -3",
+                "1 M. N... 100644 100644 100644 aaa bbb staged file",
+                "1 .M N... 100644 100644 100644 aaa bbb unstaged",
+                "2 R. N... 100644 100644 100644 aaa bbb R100 new\told",
+                "u UU N... 100644 100644 100644 100644 a b c conflict",
+                "? untracked",
+            ]
+        )
+        st = parse_status("repo", output)
+        self.assertEqual(st.branch, "feature/x")
+        self.assertEqual((st.ahead, st.behind), (2, 3))
+        self.assertEqual((st.staged, st.unstaged, st.untracked), (2, 2, 1))
+        self.assertEqual(
+            [f[1] for f in st.files],
+            ["staged file", "unstaged", "new", "conflict", "untracked"],
+        )
+        self.assertTrue(st.changed)
+
+    def test_detached(self):
+        st = parse_status(
+            "repo", "# branch.oid 0123456789\n# branch.head (detached)\n"
+        )
+        self.assertEqual(st.branch, "0123456")
+        self.assertFalse(st.changed)
+
+    def test_status(self):
+        remote = make_remote(self.tempdir, "a")
+        repo = self.clone(remote, "a")
+        self.assertFalse(repo.status().changed)
+        commit(repo.path, "local", "1")
+        repo.path.join("README").write("changed")
+        st = repo.status()
+        self.assertEqual((st.branch, st.ahead, st.unstaged), ("develop", 1, 1))
+
+    def test_not_cloned(self):
+        repo = Repository("/no/such/repo", "/no/such/repo", "x/y")
+        self.assertRaises(GitError, repo.status)
+
+
+class TestPull(RepoTestCase):
+    def push_change(self, remote, filename):
+        name = "%s-%s" % (remote.purebasename, filename)
+        other = self.clone(remote, name)
+        commit(other.path, filename, filename)
+        git(other.path, "push", "-q", "origin", "develop")
+
+    def test_fast_forward(self):
+        remote = make_remote(self.tempdir, "a")
+        repo = self.clone(remote, "a")
+        self.assertEqual(repo.pull().outcome, "up to date")
+        self.push_change(remote, "upstream")
+        result = repo.pull()
+        self.assertEqual(result.outcome, "fast-forwarded")
+        self.assertTrue(result.fetch_time >= 0 and result.merge_time >= 0)
+        self.assertTrue(repo.path.join("upstream").check())
+
+    def test_diverged(self):
+        remote = make_remote(self.tempdir, "a")
+        repo = self.clone(remote, "a")
+        self.push_change(remote, "upstream")
+        commit(repo.path, "local", "local")
+        self.assertEqual(repo.pull().outcome, "diverged")
+        self.assertEqual(repo.pull(rebase=True).outcome, "rebased")
+        self.assertEqual(repo.status().ahead, 1)
+        self.assertEqual(repo.status().behind, 0)
+
+    def test_parallel(self):
+        repos = []
+        for name in "abcd":
+            remote = make_remote(self.tempdir, name)
+            repos.append(self.clone(remote, name))
+            self.push_change(remote, "upstream")
+        results = list(parallel(lambda r: r.pull(), repos, 2))
+        self.assertEqual(len(results), 4)
+        for repo, result, exc in results:
+            self.assertIsNone(exc)
+            self.assertEqual(result.outcome, "fast-forwarded")
+
+
+class TestIsGitRepo(RepoTestCase):
+    def test_layouts(self):
+        remote = make_remote(self.tempdir, "a")
+        repo = self.clone(remote, "a")
+        self.assertTrue(is_git_repo(repo.path))
+        self.assertTrue(is_git_repo(remote))
+        separate = self.tempdir.join("separate")
+        git(
+            self.tempdir,
+            "init",
+            "-q",
+            "--separate-git-dir",
+            self.tempdir.join("separate.git").strpath,
+            separate.strpath,
+        )
+        self.assertTrue(is_git_repo(separate))
+        worktree = self.tempdir.join("worktree")
+        git(repo.path, "worktree", "add", "-q", "--detach", worktree.strpath)
+        self.assertTrue(is_git_repo(worktree))
+        self.assertFalse(is_git_repo(self.tempdir))
+        self.assertFalse(is_git_repo(repo.path.join("README")))
+        self.assertFalse(is_git_repo(self.tempdir.join("missing")))
+
+    def test_cache_follows_changes(self):
+        path = self.tempdir.ensure("a", dir=True)
+        self.assertFalse(is_git_repo(path))
+        git(path, "init", "-q")
+        self.assertTrue(is_git_repo(path))
+        path.join(".git").remove()
+        self.assertFalse(is_git_repo(path))
+
+
+class TestHandles(RepoTestCase):
+    def gitflow_clone(self, name):
+        repo = self.clone(make_remote(self.tempdir, name), name)
+        git(repo.path, "branch", "master")
+        return repo
+
+    def test_branch_follows_checkout(self):
+        repo = self.gitflow_clone("a")
+        self.assertEqual(repo.branch, "develop")
+        git(repo.path, "branch", "feature")
+        repo.checkout("feature")
+        self.assertEqual(repo.branch, "feature")
+        git(repo.path, "checkout", "-q", "develop")
+        self.assertEqual(repo.branch, "feature")
+        repo.invalidate()
+        self.assertEqual(repo.branch, "develop")
+
+    def test_handles_are_bounded(self):
+        closed = []
+        orig = repo_module._handles
+        repo_module._handles = LRUCache(2, on_evict=closed.append)
+        try:
+            repos = [self.gitflow_clone(name) for name in "abc"]
+            handles = [r.repo for r in repos]
+            self.assertEqual(len(repo_module._handles), 2)
+            self.assertEqual(closed, handles[:1])
+            self.assertIs(repos[2].repo, handles[2])
+            repos[2].release()
+            self.assertEqual(len(repo_module._handles), 1)
+        finally:
+            repo_module._handles = orig
+
+    def test_setdefault(self):
+        evicted = []
+        cache = LRUCache(2, on_evict=evicted.append)
+        self.assertEqual(cache.setdefault("a", 1), 1)
+        self.assertEqual(cache.setdefault("a", 2), 1)
+        cache.put("b", 3)
+        # setdefault on an existing key marks it as recently used
+        cache.setdefault("a", 4)
+        cache.put("c", 5)
+        self.assertEqual(evicted, [3])
+        self.assertEqual(cache.get("a"), 1)
+
+    def test_is_initialized(self):
+        repo = self.gitflow_clone("a")
+        self.assertFalse(repo.is_initialized())
+        repo.initialize()
+        self.assertTrue(repo.is_initialized())
+        path = self.tempdir.join("wt")
+        git(repo.path, "worktree", "add", "-q", "--detach", path.strpath)
+        linked = Repository(path.strpath, path.strpath, repo.url)
+        self.assertTrue(linked.is_initialized())
+        git(repo.path, "config", "--unset", "include.path")
+        self.assertFalse(linked.is_initialized())
+
+        # Settings from an included file count
+        names = repo_module.config_names(repo.path)
+        git(repo.path, "config", "--remove-section", "gitflow.branch")
+        self.assertFalse(repo.is_initialized())
+        shared = self.tempdir.join("shared-config")
+        git(repo.path, "config", "-f", shared.strpath, "include.path", "x")
+        for name in ("master", "develop"):
+            git(
+                repo.path,
+                "config",
+                "-f",
+                shared.strpath,
+                "gitflow.branch." + name,
+                name,
+            )
+        git(repo.path, "config", "include.path", shared.strpath)
+        self.assertTrue(repo.is_initialized())
+        self.assertLessEqual(names, repo_module.config_names(repo.path))
+        self.assertEqual(
+            repo_module.config_names(self.tempdir.join("nowhere")), set()
+        )
+
+
+class TestTune(RepoTestCase):
+    def test_tune(self):
+        repo = self.clone(make_remote(self.tempdir, "a"), "a")
+        result = repo.tune()
+        self.assertTrue(result.before >= 0 and result.after >= 0)
+        for key, value in repo_module.TUNED_CONFIG:
+            self.assertEqual(git(repo.path, "config", key).strip(), value)
+        objects = repo.path.join(".git", "objects")
+        self.assertTrue(objects.join("info", "commit-graph").check())
+        self.assertEqual(repo.status().untracked, 0)
+        # A local clone has only loose objects, so there is nothing for a
+        # multi-pack-index to cover until they are packed
+        self.assertFalse(objects.join("pack", "multi-pack-index").check())
+        git(repo.path, "repack", "-q", "-a", "-d")
+        self.assertIsNone(repo.tune(timings=False).after)
+        self.assertTrue(objects.join("pack", "multi-pack-index").check())
+
+
+class TestWorktree(RepoTestCase):
+    def linked(self, base, name, ref="develop"):
+        path = self.tempdir.join("wt", "src", name)
+        repo = Repository(path.strpath, path.strpath, base.url, ref=ref)
+        repo.source = base.path
+        return repo
+
+    def test_branch_in_use_is_detached(self):
+        base = self.clone(make_remote(self.tempdir, "a"), "a")
+        repo = self.linked(base, "a")
+        self.assertEqual(repo.restore(), "linked")
+        self.assertTrue(repo.path.join(".git").check(file=True))
+        head = git(repo.path, "rev-parse", "HEAD")
+        self.assertEqual(head, git(base.path, "rev-parse", "HEAD"))
+        self.assertTrue(head.startswith(repo.status().branch))
+
+    def test_detached_at_remote_branch(self):
+        base = self.clone(make_remote(self.tempdir, "a"), "a")
+        remote = git(base.path, "rev-parse", "origin/develop")
+        commit(base.path, "unpushed", "unpushed")
+        repo = self.linked(base, "a")
+        self.assertEqual(repo.restore(), "linked")
+        self.assertEqual(git(repo.path, "rev-parse", "HEAD"), remote)
+        self.assertFalse(repo.path.join("unpushed").check())
+
+    def test_remote_branch(self):
+        remote = make_remote(self.tempdir, "a")
+        base = self.clone(remote, "a")
+        other = self.clone(remote, "other")
+        git(other.path, "checkout", "-q", "-b", "feature")
+        commit(other.path, "feature", "feature")
+        git(other.path, "push", "-q", "origin", "feature")
+        repo = self.linked(base, "a", ref="feature")
+        self.assertEqual(repo.restore(), "linked")
+        self.assertEqual(repo.status().branch, "feature")
+        self.assertTrue(repo.path.join("feature").check())
+
+    def test_purge_prunes_worktrees(self):
+        base = self.clone(make_remote(self.tempdir, "a"), "a")
+        self.linked(base, "a").restore()
+        self.assertEqual(
+            len(git(base.path, "worktree", "list").split("\n")), 3
+        )
+        cfg = ZendevConfig(self.tempdir.join("environments.json"))
+        cfg.add("base", self.tempdir)
+        cfg.add("wt", self.tempdir.join("wt"), base="base")
+        self.assertEqual(cfg.dependents("base"), ["wt"])
+        cfg.remove("wt", keepdata=False)
+        self.assertFalse(self.tempdir.join("wt").check())
+        self.assertEqual(cfg.dependents("base"), [])
+        self.assertEqual(
+            git(base.path, "worktree", "list").strip().count("\n"), 0
+        )
+
+
+class TestSparse(RepoTestCase):
+    def setUp(self):
+        self.remote = make_remote(self.tempdir, "a")
+        seed = self.tempdir.join("seed", "a")
+        for name in ("docs", "lib", "web"):
+            seed.ensure(name, dir=True)
+            commit(seed, name + "/file", name)
+        git(seed, "push", "-q", self.remote.strpath, "develop")
+
+    def test_clone_with_profile(self):
+        path = self.tempdir.join("src", "a")
+        repo = Repository(path.strpath, path.strpath, self.remote.strpath)
+        repo.sparse = ["lib"]
+        self.assertEqual(repo.restore(), "cloned")
+        self.assertEqual(repo.sparse_dirs(), ["lib"])
+        self.assertTrue(path.join("README").check())
+        self.assertTrue(path.join("lib", "file").check())
+        self.assertFalse(path.join("docs").check())
+
+    def test_toggle_without_cloning(self):
+        repo = self.clone(self.remote, "a")
+        self.assertIsNone(repo.sparse_dirs())
+        repo.sparse = ["web", "docs"]
+        repo.apply_sparse()
+        self.assertEqual(sorted(repo.sparse_dirs()), ["docs", "web"])
+        self.assertFalse(repo.path.join("lib").check())
+        repo.disable_sparse()
+        self.assertIsNone(repo.sparse_dirs())
+        self.assertTrue(repo.path.join("lib", "file").check())
+        repo.sparse = None
+        self.assertEqual(repo.restore(), "checked out")
+        self.assertIsNone(repo.sparse_dirs())
+
+
+if __name__ == "__main__":
+    unittest.main()
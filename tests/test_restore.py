@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_restore
+----------------------------------
+
+Tests for `restore` module, using purely local remotes.
+"""
+
+import json
+import os
+import stat
+import subprocess
+import sys
+import unittest
+
+from zendev.environment import CONFIG_DIR, ZenDevEnvironment
+from zendev.repo import Repository, url_name
+from zendev.restore import (
+    AppliedManifest,
+    RestoreState,
+    at_ref,
+    plan_restore,
+    restore_repos,
+    stream_manifest,
+)
+
+from .test_repo import RepoTestCase, commit, git, make_remote
+
+_WRITER = """
+import sys, time
+with open(sys.argv[1], "w") as f:
+    f.write("[")
+    for i in range(3):
+        f.write(("," if i else "") + '{"repo": "r%d"}' % i)
+        f.flush()
+        time.sleep(0.2)
+    f.write("]")
+"""
+
+
+class TestStreamManifest(RepoTestCase):
+    def test_stream(self):
+        path = self.tempdir.join("repos.json")
+        path.write("stale")
+        cmd = [sys.executable, "-c", _WRITER, path.strpath]
+        entries = stream_manifest(path, cmd, self.tempdir, poll=0.01)
+        first = next(entries)
+        self.assertEqual(first, {"repo": "r0"})
+        # The writer is still going when the first entry arrives
+        self.assertNotIn("]", path.read())
+        self.assertEqual([e["repo"] for e in entries], ["r1", "r2"])
+
+    def test_failure(self):
+        path = self.tempdir.join("repos.json")
+        cmd = [sys.executable, "-c", "raise SystemExit(3)"]
+        entries = stream_manifest(path, cmd, self.tempdir, poll=0.01)
+        self.assertRaises(subprocess.CalledProcessError, list, entries)
+
+
+class TestRestoreRepos(RepoTestCase):
+    def repos(self, names):
+        for name in names:
+            remote = self.tempdir.join("remotes", name + ".git")
+            if not remote.check():
+                remote = make_remote(self.tempdir, name)
+            path = self.tempdir.join("src", name)
+            yield Repository(path.strpath, path.strpath, remote.strpath)
+
+    def test_resume(self):
+        statefile = self.tempdir.join("state.json")
+        state = RestoreState(statefile, "develop")
+        results = list(restore_repos(self.repos("abc"), state, workers=2))
+        self.assertEqual(
+            sorted(outcome for _, outcome, _ in results), ["cloned"] * 3
+        )
+
+        # Simulate a crash while cloning "b": a partial clone is left behind
+        partial = self.tempdir.join("src", "b")
+        partial.remove()
+        partial.ensure("junk")
+        state = RestoreState(statefile, "develop")
+        state.done.discard(partial.strpath)
+        state.cloning.add(partial.strpath)
+
+        results = list(restore_repos(self.repos("abc"), state, retries=0))
+        self.assertEqual(
+            [(r.path.basename, o, e) for r, o, e in results],
+            [("b", "cloned", None)],
+        )
+        self.assertFalse(partial.join("junk").check())
+        self.assertEqual(RestoreState(statefile, "develop").cloning, set())
+
+    def test_other_ref_starts_over(self):
+        statefile = self.tempdir.join("state.json")
+        list(restore_repos(self.repos("a"), RestoreState(statefile, "x")))
+        self.assertEqual(RestoreState(statefile, "y").done, set())
+
+
+class TestPlanRestore(TestRestoreRepos):
+    def apply(self, repos, path):
+        applied = AppliedManifest(path)
+        for repo, action, _ in list(plan_restore(repos, applied)):
+            if action != "unchanged":
+                applied.record(repo, repo.restore() is not None)
+        applied.save()
+        return applied
+
+    def test_only_changed_repos(self):
+        path = self.tempdir.join("applied.json")
+        self.apply(list(self.repos("abc")), path)
+        git(self.tempdir.join("src", "b"), "branch", "feature")
+
+        repos = list(self.repos("abd"))
+        repos[1].ref = "feature"
+        applied = AppliedManifest(path)
+        plan = list(plan_restore(repos, applied))
+        self.assertEqual(
+            [(r.path.basename, a) for r, a, _ in plan],
+            [("a", "unchanged"), ("b", "checkout"), ("d", "clone")],
+        )
+        self.assertEqual(plan[1][2]["ref"], "develop")
+        self.assertEqual(
+            applied.dropped(), [url_name(next(self.repos("c")).url)]
+        )
+        self.assertEqual(
+            [a for _, a, _ in plan_restore(repos, applied, full=True)],
+            ["checkout", "checkout", "clone"],
+        )
+
+        self.apply(repos, path)
+        self.assertEqual(
+            [a for _, a, _ in plan_restore(repos, AppliedManifest(path))],
+            ["unchanged"] * 3,
+        )
+        self.assertEqual(
+            git(repos[1].path, "rev-parse", "--abbrev-ref", "HEAD").strip(),
+            "feature",
+        )
+
+        # A branch switched by hand is checked out again
+        git(repos[1].path, "checkout", "-q", "develop")
+        self.assertEqual(
+            [a for _, a, _ in plan_restore(repos, AppliedManifest(path))],
+            ["unchanged", "checkout", "unchanged"],
+        )
+
+    def test_at_ref_detached(self):
+        repo = next(self.repos("a"))
+        repo.restore()
+        commit(repo.path, "new", "new")
+        head = git(repo.path, "rev-parse", "HEAD").strip()
+        git(repo.path, "checkout", "-q", "--detach", "HEAD")
+        git(repo.path, "tag", "v1")
+        # A tag whose name happens to start HEAD's commit name
+        git(repo.path, "tag", head[:4], "HEAD~1")
+        for ref, expected in (
+            (head[:7], True),
+            (head, True),
+            ("v1", True),
+            (head[:4], False),
+            ("origin/develop", False),
+        ):
+            repo.ref = ref
+            self.assertEqual(at_ref(repo), expected, ref)
+
+    def test_failed_repos_keep_previous_entry(self):
+        path = self.tempdir.join("applied.json")
+        repo = next(self.repos("a"))
+        self.apply([repo], path)
+        applied = AppliedManifest(path)
+        repo.ref = "nonexistent"
+        applied.record(repo, False)
+        applied.save()
+        self.assertEqual(AppliedManifest(path).get(repo)["ref"], "develop")
+
+
+class TestDryRun(RepoTestCase):
+    def test_changes_nothing(self):
+        os.environ["HOME"] = self.tempdir.strpath
+        repo_a = make_remote(self.tempdir, "a")
+        root = self.tempdir.join("env")
+        root.ensure(CONFIG_DIR, dir=True)
+        env = ZenDevEnvironment(path=root)
+
+        seed = make_remote(self.tempdir, "product-assembly")
+        work = self.tempdir.join("pa-work")
+        git(self.tempdir, "clone", "-q", seed.strpath, work.strpath)
+        work.join("repos.sh").write(
+            "#!/bin/sh\necho '%s' > .repos.json\n"
+            % json.dumps([{"repo": repo_a.strpath, "ref": "develop"}])
+        )
+        work.join("repos.sh").chmod(
+            work.join("repos.sh").stat().mode | stat.S_IXUSR
+        )
+        git(work, "add", "repos.sh")
+        git(work, "commit", "-q", "-m", "repos.sh")
+        git(work, "push", "-q", "origin", "develop")
+        pa = env.srcroot.join("github.com", "zenoss", "product-assembly")
+        git(self.tempdir, "clone", "-q", seed.strpath, pa.strpath)
+        git(pa, "reset", "-q", "--hard", "HEAD~1")
+        # Not fetched yet, so not planned from
+        commit(work, "later", "later")
+        git(work, "push", "-q", "origin", "develop")
+
+        head = git(pa, "rev-parse", "HEAD")
+        before = sorted(p.strpath for p in root.visit())
+        output = subprocess.check_output(
+            [
+                sys.executable,
+                "-c",
+                "import sys, py\n"
+                "from zendev.environment import ZenDevEnvironment\n"
+                "env = ZenDevEnvironment(path=py.path.local(sys.argv[1]))\n"
+                "env.restore('develop', dry_run=True)",
+                root.strpath,
+            ],
+            stderr=subprocess.STDOUT,
+        ).decode("utf-8")
+        self.assertIn("1 to clone, 0 to check out, 0 unchanged", output)
+        self.assertEqual(git(pa, "rev-parse", "HEAD"), head)
+        self.assertEqual(sorted(p.strpath for p in root.visit()), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_templates
+----------------------------------
+
+Tests for `templates` module.
+"""
+
+import json
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+import py
+
+from zendev.cmd.serviced import Serviced
+from zendev.environment import CONFIG_DIR, ZenDevEnvironment
+from zendev.templates import (
+    KEEP_TEMPLATES,
+    TemplateCache,
+    sync_tree,
+    tree_digest,
+)
+
+SCRIPT = """#!/bin/sh
+echo run >> "$(dirname "$0")/runs"
+cat "$1/template.json"
+"""
+
+
+def service(name, *children):
+    return {
+        "Name": name,
+        "Command": "runzope" if name == "Zope" else "",
+        "HealthChecks": {},
+        "Prereqs": [],
+        "Context": {},
+        "Services": list(children),
+    }
+
+
+class TestTemplateCache(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = py.path.local(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir.strpath)
+
+    def test_tree_digest(self):
+        tree = self.tempdir.ensure("tree", dir=True)
+        tree.ensure("a", "service.json").write("{}")
+        digest = tree_digest(tree)
+        self.assertEqual(tree_digest(tree), digest)
+        tree.join("a", "service.json").write("[]")
+        self.assertNotEqual(tree_digest(tree), digest)
+        tree.join("a", "service.json").write("{}")
+        tree.join("a").move(tree.join("b"))
+        self.assertNotEqual(tree_digest(tree), digest)
+
+    def test_tree_digest_symlinks(self):
+        tree = self.tempdir.ensure("tree", dir=True)
+        shared = self.tempdir.ensure("shared", dir=True)
+        shared.ensure("service.json").write("{}")
+        self.tempdir.ensure("other", "service.json").write("{}")
+        os.symlink(shared.strpath, tree.join("linked").strpath)
+        os.symlink(".", tree.join("loop").strpath)
+        digest = tree_digest(tree)
+        self.assertEqual(tree_digest(tree), digest)
+
+        # Symlinked directories are walked
+        shared.join("service.json").write("[]")
+        self.assertNotEqual(tree_digest(tree), digest)
+        # Where a symlink points counts, even if the content is the same
+        shared.join("service.json").write("{}")
+        digest = tree_digest(tree)
+        tree.join("linked").remove()
+        os.symlink(
+            self.tempdir.join("other").strpath, tree.join("linked").strpath
+        )
+        self.assertNotEqual(tree_digest(tree), digest)
+
+    def test_sync_tree(self):
+        base = self.tempdir.ensure("base", dir=True)
+        base.ensure("a", "service.json").write("a")
+        base.ensure("b.json").write("b")
+        mod = self.tempdir.ensure("mod", dir=True)
+        mod.ensure("c", "service.json").write("c")
+        target = self.tempdir.join("target")
+        sources = [(base, ""), (mod, "mod")]
+        self.assertEqual(sync_tree(sources, target), (3, 0))
+        self.assertEqual(target.join("mod", "c", "service.json").read(), "c")
+        self.assertEqual(sync_tree(sources, target), (0, 0))
+
+        base.join("b.json").write("bb")
+        mod.join("c").remove()
+        target.ensure("stale.json")
+        self.assertEqual(sync_tree(sources, target), (1, 2))
+        self.assertEqual(target.join("b.json").read(), "bb")
+        self.assertFalse(target.join("mod").check())
+
+    def test_sync_tree_symlinks(self):
+        base = self.tempdir.ensure("base", dir=True)
+        base.ensure("a", "service.json").write("a")
+        base.ensure("b", dir=True)
+        os.symlink("a", base.join("linked").strpath)
+        target = self.tempdir.join("target")
+        self.assertEqual(sync_tree([(base, "")], target), (2, 0))
+        self.assertEqual(target.join("linked").readlink(), "a")
+        self.assertEqual(target.join("linked", "service.json").read(), "a")
+        self.assertEqual(sync_tree([(base, "")], target), (0, 0))
+        self.assertTrue(target.join("linked").islink())
+
+        # Files aren't removed through a symlink that changes
+        base.join("linked").remove()
+        os.symlink("b", base.join("linked").strpath)
+        self.assertEqual(sync_tree([(base, "")], target), (1, 1))
+        self.assertEqual(target.join("linked").readlink(), "b")
+        self.assertTrue(base.join("a", "service.json").check())
+
+    def test_get_and_put(self):
+        cache = TemplateCache(self.tempdir.join("cache"))
+        self.assertIsNone(cache.get(None))
+        self.assertIsNone(cache.get("k0"))
+        for i in range(KEEP_TEMPLATES + 2):
+            cache.put("k%d" % i, "{}")
+            os.utime(cache.get("k%d" % i).strpath, (i, i))
+        self.assertEqual(cache.get("k3").read(), "{}")
+        self.assertIsNone(cache.get("k0"))
+        self.assertEqual(len(cache.root.listdir("*.json")), KEEP_TEMPLATES)
+
+
+class TestCompileTemplate(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = py.path.local(tempfile.mkdtemp())
+        os.environ["HOME"] = self.tempdir.strpath
+        root = self.tempdir.join("env")
+        root.ensure(CONFIG_DIR, dir=True)
+        self.serviced = Serviced(ZenDevEnvironment(path=root))
+        self.servicedir = self.serviced.zenoss_service_dir.ensure(dir=True)
+        script = self.servicedir.join("make_template.sh")
+        script.write(SCRIPT)
+        script.chmod(script.stat().mode | stat.S_IXUSR)
+        self.template = self.servicedir.ensure(
+            "services", "Zenoss.resmgr", dir=True
+        )
+        self.write_template(service("Zope"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir.strpath)
+
+    def write_template(self, *services):
+        self.template.join("template.json").write(
+            json.dumps({"Services": list(services)})
+        )
+
+    def runs(self):
+        runs = self.servicedir.join("runs")
+        return len(runs.readlines()) if runs.check() else 0
+
+    def test_cached(self):
+        compiled = self.serviced.compile_template("Zenoss.resmgr", "img")
+        self.assertIn("zopectl fg", compiled)
+        self.assertEqual(
+            self.serviced.compile_template("Zenoss.resmgr", "img"), compiled
+        )
+        self.assertEqual(self.runs(), 1)
+
+        # A different image, template content or transform set recompiles
+        self.serviced.compile_template("Zenoss.resmgr", "other")
+        self.assertEqual(self.runs(), 2)
+        self.write_template(service("Zope"), service("zencatalogservice"))
+        compiled = self.serviced.compile_template("Zenoss.resmgr", "img")
+        self.assertNotIn("zencatalogservice", compiled)
+        self.assertEqual(self.runs(), 3)
+        # The same template given by its path is the same template
+        self.serviced.compile_template(self.template.strpath, "img")
+        self.assertEqual(self.runs(), 3)
+
+        self.serviced.template_cache = False
+        self.serviced.compile_template("Zenoss.resmgr", "img")
+        self.assertEqual(self.runs(), 4)
+
+    def test_merged(self):
+        moduledir = self.tempdir.ensure("modules", dir=True)
+        moduledir.ensure("mod1", "service.json").write("{}")
+
+        def merge():
+            tpldir, digest = self.serviced.merge_template(
+                "Zenoss.resmgr", ["mod1"], moduledir.strpath
+            )
+            self.serviced.compile_template(
+                tpldir.strpath, "img", content=digest
+            )
+            return tpldir
+
+        tpldir = merge()
+        self.assertTrue(tpldir.join("mod1", "service.json").check())
+        self.assertEqual(self.runs(), 1)
+        mtime = tpldir.join("template.json").mtime()
+
+        # Unchanged modules reuse the merged tree and compiled template
+        self.assertEqual(merge(), tpldir)
+        self.assertEqual(self.runs(), 1)
+        self.assertEqual(tpldir.join("template.json").mtime(), mtime)
+
+        moduledir.join("mod1", "service.json").write('{"x": 1}')
+        self.assertEqual(merge(), tpldir)
+        self.assertEqual(
+            tpldir.join("mod1", "service.json").read(), '{"x": 1}'
+        )
+        self.assertEqual(self.runs(), 2)
+
+    def test_merged_symlink(self):
+        moduledir = self.tempdir.ensure("modules", dir=True)
+        moduledir.ensure("mod1", "shared", "service.json").write("{}")
+        os.symlink("shared", moduledir.join("mod1", "linked").strpath)
+        tpldir, digest = self.serviced.merge_template(
+            "Zenoss.resmgr", ["mod1"], moduledir.strpath
+        )
+        linked = tpldir.join("mod1", "linked")
+        self.assertEqual(linked.readlink(), "shared")
+        self.assertEqual(linked.join("service.json").read(), "{}")
+
+
+if __name__ == "__main__":
+    unittest.main()
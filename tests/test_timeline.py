@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_timeline
+----------------------------------
+
+Tests for `timeline` module.
+"""
+
+import unittest
+
+from six import StringIO
+
+from zendev.timeline import Timeline, percentile, summarize, timed
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Starter(object):
+    def __init__(self, clock):
+        self.clock = clock
+        self.timeline = Timeline(clock)
+
+    @timed("spawn")
+    def spawn(self, secs):
+        self.clock.now += secs
+        return secs
+
+
+class TestTimeline(unittest.TestCase):
+    def test_phases(self):
+        clock = Clock()
+        starter = Starter(clock)
+        self.assertEqual(starter.spawn(2), 2)
+        with starter.timeline.phase("ready"):
+            clock.now += 3
+        self.assertRaises(TypeError, starter.spawn, None)
+        self.assertEqual(
+            starter.timeline.phases,
+            [("spawn", 2), ("ready", 3), ("spawn", 0)],
+        )
+        self.assertEqual(starter.timeline.total(), 5)
+        self.assertEqual(starter.timeline.as_dict()["total"], 5)
+        out = StringIO()
+        starter.timeline.report(out)
+        self.assertIn("ready", out.getvalue())
+
+    def test_percentile(self):
+        values = list(range(1, 21))
+        self.assertEqual(percentile(values, 50), 10)
+        self.assertEqual(percentile(values, 95), 19)
+        self.assertEqual(percentile([7], 95), 7)
+
+    def test_summarize(self):
+        timelines = []
+        for secs in (1, 2, 3, 4):
+            timeline = Timeline(Clock())
+            timeline.phases = [("ready", secs), ("deploy", 1), ("deploy", 1)]
+            timelines.append(timeline)
+        timelines[0].phases.append(("add_host", 5))
+        summary = summarize(timelines)
+        self.assertEqual(
+            summary,
+            [
+                ("ready", 4, 2, 4),
+                ("deploy", 4, 2, 2),
+                ("add_host", 1, 5, 5),
+                ("total", 4, 5, 8),
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
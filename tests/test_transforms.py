@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_transforms
+----------------------------------
+
+Tests for `transforms` module.
+"""
+
+import unittest
+
+from zendev import transforms
+from zendev.transforms import UnknownTransform, apply, registered, select
+
+
+def service(name, *children, **kwargs):
+    svc = {
+        "Name": name,
+        "Command": "",
+        "HealthChecks": {},
+        "Prereqs": [],
+        "Context": {},
+        "Services": list(children),
+    }
+    svc.update(kwargs)
+    return svc
+
+
+def names(services):
+    return [s["Name"] for s in services]
+
+
+class TestTransforms(unittest.TestCase):
+    def test_select(self):
+        self.assertEqual(
+            [t.name for t in select("Zenoss.core")],
+            [n for n in registered() if n != "remove_catalogservice"],
+        )
+        self.assertEqual(
+            [t.name for t in select("Zenoss.resmgr")], registered()
+        )
+        self.assertEqual(
+            [
+                t.name
+                for t in select(None, ["remove_auth0_vars", "zope_debug"])
+            ],
+            ["zope_debug", "remove_auth0_vars"],
+        )
+        self.assertEqual(
+            [t.name for t in select("Zenoss.resmgr", skip=["zope_debug"])],
+            registered()[1:],
+        )
+        self.assertEqual(select(None, []), [])
+        self.assertRaises(UnknownTransform, select, None, ["nope"])
+        self.assertRaises(UnknownTransform, select, None, skip=["nope"])
+
+    def test_adjacent_removals(self):
+        services = [
+            service(
+                "Zenoss.resmgr",
+                service("reader-bigtable", service("child")),
+                service("writer-bigtable"),
+                service("zencatalogservice"),
+                service(
+                    "Zope",
+                    Command="runzope",
+                    Prereqs=[
+                        {"Name": "zencatalogservice response"},
+                        {"Name": "zencatalogservice response"},
+                        {"Name": "mariadb"},
+                    ],
+                ),
+            )
+        ]
+        apply(services, select("Zenoss.resmgr"))
+        self.assertEqual(names(services[0]["Services"]), ["Zope"])
+        zope = services[0]["Services"][0]
+        self.assertEqual(zope["Command"], "zopectl fg")
+        self.assertEqual(names(zope["Prereqs"]), ["mariadb"])
+
+    def test_register(self):
+        seen = []
+
+        @transforms.register("test_seen", applies=lambda template: False)
+        def test_seen(svc):
+            seen.append(svc["Name"])
+            return svc["Name"] == "b"
+
+        try:
+            self.assertNotIn("test_seen", [t.name for t in select("x")])
+            services = [
+                service("a", service("a1")),
+                service("b", service("b1")),
+            ]
+            apply(services, select("x", ["test_seen"]))
+            self.assertEqual(seen, ["a", "a1", "b"])
+            self.assertEqual(names(services), ["a"])
+        finally:
+            del transforms._registry[-1]
+
+
+if __name__ == "__main__":
+    unittest.main()
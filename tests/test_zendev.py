@@ -12,9 +12,12 @@ import unittest
 import tempfile
 import py
 import json
+import subprocess
+import sys
 
 from zendev.environment import init_config_dir, get_config_dir, CONFIG_DIR
 from zendev.environment import NotInitialized, ZenDevEnvironment
+from zendev.environment import get_environment
 
 
 _MANIFEST = json.dumps(
@@ -56,9 +59,51 @@ class TestEnvironment(unittest.TestCase):
         env = ZenDevEnvironment()
         self.assertEquals(self.cfgdir.realpath(), env._config)
 
+    def test_environment_is_lazy(self):
+        init_config_dir()
+        env = get_environment(path=self.tempdir)
+        self.assertIs(env, get_environment(path=self.tempdir))
+        self.assertEqual(env.srcroot, self.tempdir.join("src"))
+        self.assertFalse(env.srcroot.check())
+        self.assertFalse(self.tempdir.join("zenhome").check())
+        env.zenhome
+        self.assertTrue(self.tempdir.join("zenhome").check(dir=True))
+
     def test_manifest(self):
         pass
 
 
+class TestCommandRegistry(unittest.TestCase):
+    def test_parser_does_not_import_commands(self):
+        """
+        Building the parser must not import command implementations.
+        """
+        code = (
+            "import sys\n"
+            "from zendev.zendev import build_argparser\n"
+            "build_argparser()\n"
+            "print(' '.join(m for m in sys.modules if m.startswith("
+            "('zendev.cmd.', 'git', 'requests'))))\n"
+        )
+        out = subprocess.check_output([sys.executable, "-c", code])
+        self.assertEqual(out.strip(), b"")
+
+    def test_export(self):
+        from zendev.zendev import build_argparser
+
+        parser = build_argparser()
+        self.assertEqual(parser.parse_args(["env"]).subparser, "env")
+        args = parser.parse_args(["export", "a", "-j", "2", "a.tar"])
+        self.assertEqual(
+            (args.jobs, args.name, args.archive), (2, "a", "a.tar")
+        )
+
+    def test_functor_resolves(self):
+        from zendev.cmd import lazy
+        from zendev.cmd.tags import restore
+
+        self.assertIs(lazy("tags", "restore").resolve(), restore)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -15,6 +15,12 @@ zendev () {
 
 eval "$(jig bootstrap --cd-command=cdz)"
 
+# Set ZENDEV_PREFETCH=1 to keep the current environment's repos fetched in
+# the background (see 'zendev prefetch')
+if [ -n "${ZENDEV_PREFETCH}" ]; then
+    ${ZENDEV_SCRIPT} prefetch --background > /dev/null 2>&1
+fi
+
 if [ ${BASH_VERSION:0:1} -ge 4 ]; then
     ZENDEV_ARGCOMPLETE=$(mktemp -u /tmp/zd.argcomplete.XXXXX)
     activate-global-python-argcomplete --dest=- > "${ZENDEV_ARGCOMPLETE}"
@@ -0,0 +1,150 @@
+from __future__ import absolute_import, print_function
+
+import json
+import re
+import tarfile
+import tempfile
+
+import py
+
+from .config import get_config
+from .repo import GitError
+from .utils import parallel, DEFAULT_WORKERS
+
+BUNDLE_FORMAT = 1
+INDEX = "bundle.json"
+MANIFEST = "repos.json"
+_BUNDLE_NAME = re.compile(r"^repos/\d+\.bundle$")
+
+
+class BundleError(Exception):
+    pass
+
+
+def export_environment(env, repos, archive, workers=DEFAULT_WORKERS):
+    """
+    Write repos, which must have been cloned, to archive (a tar file) as git
+    bundles, along with env's manifest and config entry.
+
+    Bundles are written on a pool of workers and added to the archive as
+    each one is done.  Yields (Repository, exception) as each repo
+    finishes; a repo that fails is left out of the archive.
+    """
+    tmp = py.path.local(tempfile.mkdtemp())
+    tmp.ensure("repos", dir=True)
+    names = dict(
+        (repo.path, "repos/%d.bundle" % i) for i, repo in enumerate(repos)
+    )
+    index = {
+        "format": BUNDLE_FORMAT,
+        "environment": env.name,
+        "config": dict(
+            (k, v)
+            for k, v in get_config().environments.get(env.name, {}).items()
+            if k not in ("path", "base")
+        ),
+        "repos": [
+            {
+                "path": env.srcroot.bestrelpath(repo.path),
+                "repo": repo.reponame,
+                "ref": repo.ref,
+                "bundle": names[repo.path],
+            }
+            for repo in repos
+        ],
+    }
+    try:
+        with tarfile.open(str(archive), "w") as tar:
+            # The index and manifest go first so the archive can be imported
+            # as it is read
+            indexfile = tmp.join(INDEX)
+            indexfile.write(json.dumps(index, indent=2, sort_keys=True))
+            tar.add(indexfile.strpath, INDEX)
+            tar.add(env._repos_file.strpath, MANIFEST)
+            for repo, _, exc in parallel(
+                lambda repo: repo.export_bundle(tmp.join(names[repo.path])),
+                repos,
+                workers,
+            ):
+                bundle = tmp.join(names[repo.path])
+                if exc is None:
+                    tar.add(bundle.strpath, names[repo.path])
+                if bundle.check():
+                    bundle.remove()
+                yield repo, exc
+    finally:
+        tmp.remove(ignore_errors=True)
+
+
+def import_environment(env, archive, workers=DEFAULT_WORKERS):
+    """
+    Create env's repos from an archive written by export_environment and
+    write its manifest; returns (config entry, results).
+
+    results yields (Repository, exception) as each repo finishes.  Bundles
+    are extracted one at a time and imported on a pool of workers while
+    the rest are being extracted.  Each repo but product-assembly is then
+    initialized, as if it had been cloned.
+    """
+    try:
+        tar = tarfile.open(str(archive), "r")
+    except tarfile.TarError:
+        raise BundleError("%s is not a zendev environment bundle" % archive)
+    try:
+        index = json.loads(tar.extractfile(INDEX).read().decode("utf-8"))
+        manifest = tar.extractfile(MANIFEST).read()
+    except (KeyError, ValueError):
+        tar.close()
+        raise BundleError("%s is not a zendev environment bundle" % archive)
+    if index.get("format") != BUNDLE_FORMAT:
+        tar.close()
+        raise BundleError(
+            "%s has an unsupported bundle format %s"
+            % (archive, index.get("format"))
+        )
+    env._repos_file.write_binary(manifest)
+
+    repos = {}
+    for entry in index["repos"]:
+        repo = env._repo(entry["path"], entry["repo"], entry["ref"])
+        if not _BUNDLE_NAME.match(entry["bundle"]) or not repo.path.relto(
+            env.srcroot
+        ):
+            tar.close()
+            raise BundleError("%s has an invalid entry %r" % (archive, entry))
+        repos[entry["bundle"]] = repo
+    return (
+        index.get("config") or {},
+        _import(tar, repos, workers, env._productAssembly),
+    )
+
+
+def _import(tar, repos, workers, product_assembly):
+    tmp = py.path.local(tempfile.mkdtemp())
+    pending = dict(repos)
+
+    def bundles():
+        for member in tar:
+            if not member.isfile() or member.name not in pending:
+                continue
+            repo = pending.pop(member.name)
+            tar.extract(member, tmp.strpath)
+            yield repo, tmp.join(member.name)
+
+    def work(item):
+        repo, bundle = item
+        try:
+            repo.import_bundle(bundle)
+        finally:
+            bundle.remove()
+        if repo.path != product_assembly:
+            repo.initialize()
+
+    try:
+        for (repo, _), _, exc in parallel(work, bundles(), workers):
+            yield repo, exc
+        for repo in pending.values():
+            yield repo, GitError("%s is missing from the bundle" % repo.name)
+    finally:
+        tar.close()
+        tmp.remove(ignore_errors=True)
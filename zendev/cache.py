@@ -0,0 +1,116 @@
+from __future__ import absolute_import, print_function
+
+import fcntl
+from contextlib import contextmanager
+
+import py
+
+from .config import CONFIG_DIR
+from .repo import run_git, url_name
+from .utils import parallel, DEFAULT_WORKERS
+
+CACHE_DIR = "cache"
+
+
+class ObjectCache(object):
+    """
+    A per-user store of bare mirrors shared by every environment.
+
+    New clones borrow objects from the matching mirror through git
+    alternates (``git clone --reference``), so only objects the mirror
+    doesn't have yet come over the network and each object is stored on
+    disk once.  Because environments depend on the mirrors' objects, the
+    mirrors never prune anything: branches deleted upstream are kept and
+    gc is told never to expire unreachable objects.
+    """
+
+    def __init__(self, root):
+        self.root = py.path.local(root)
+
+    def path_for(self, url):
+        return self.root.join(url_name(url) + ".git")
+
+    @contextmanager
+    def _locked(self, mirror):
+        lockfile = mirror.new(basename=mirror.basename + ".lock")
+        lockfile.dirpath().ensure(dir=True)
+        with open(lockfile.strpath, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def ensure(self, url):
+        """
+        Return the mirror of url, creating it first if necessary.
+        """
+        mirror = self.path_for(url)
+        with self._locked(mirror):
+            if not mirror.join("HEAD").check():
+                if mirror.check():
+                    # Left behind by an interrupted clone
+                    mirror.remove()
+                tmp = mirror.new(basename=mirror.basename + ".tmp")
+                if tmp.check():
+                    tmp.remove()
+                run_git(
+                    ["clone", "--quiet", "--bare", url, tmp.strpath],
+                    name=url,
+                )
+                for key, value in (
+                    ("remote.origin.fetch", "+refs/heads/*:refs/heads/*"),
+                    ("remote.origin.tagOpt", "--tags"),
+                    ("gc.pruneExpire", "never"),
+                    ("gc.reflogExpireUnreachable", "never"),
+                ):
+                    run_git(["config", key, value], cwd=tmp.strpath)
+                tmp.move(mirror)
+        return mirror
+
+    def existing(self, url):
+        """
+        Return the mirror of url if there is one already, or None.
+        """
+        mirror = self.path_for(url)
+        return mirror if mirror.join("HEAD").check() else None
+
+    def update(self, mirror):
+        """
+        Fetch new objects into a mirror.
+        """
+        with self._locked(mirror):
+            run_git(["fetch", "--quiet", "origin"], cwd=mirror.strpath)
+
+    def url(self, mirror):
+        return run_git(
+            ["config", "remote.origin.url"], cwd=mirror.strpath
+        ).strip()
+
+    def mirrors(self):
+        """
+        All mirrors in the cache.
+        """
+        if not self.root.check(dir=True):
+            return []
+        return sorted(
+            self.root.visit(
+                lambda p: p.basename.endswith(".git")
+                and p.join("HEAD").check(),
+                rec=lambda d: d.ext not in (".git", ".tmp"),
+            )
+        )
+
+    def update_all(self, workers=DEFAULT_WORKERS):
+        """
+        Fetch every mirror on a pool of workers.
+
+        Yields (mirror, None, exception) as each one finishes.
+        """
+        return parallel(self.update, self.mirrors(), workers)
+
+
+def get_cache():
+    return ObjectCache(
+        py.path.local(CONFIG_DIR, expanduser=True).join(CACHE_DIR)
+    )
@@ -0,0 +1,169 @@
+from __future__ import absolute_import, print_function
+
+import fnmatch
+import os
+import re
+import threading
+from collections import namedtuple
+
+from .repo import git_dirs
+from .utils import parallel, DEFAULT_WORKERS
+
+RepoEntry = namedtuple("RepoEntry", "name path owner depth repo")
+RepoEntry.__doc__ = """
+A repo of an environment: name is its path under srcroot (e.g.
+github.com/zenoss/zenoss-prodbin), owner the directory above it (zenoss),
+depth the number of directories above it, and repo its Repository.
+"""
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+class RepoCatalog(object):
+    """
+    The repos of an environment with the fields queries need computed once,
+    and their branch cached until the HEAD file git keeps it in changes.
+    prefetched is {name: when it was last prefetched}, as kept by
+    PrefetchState.
+
+    Entries are ordered by depth, shallowest first.
+    """
+
+    def __init__(self, srcroot, repos, prefetched=None):
+        entries = []
+        for repo in repos:
+            name = srcroot.bestrelpath(repo.path)
+            parts = name.split("/")
+            owner = parts[-2] if len(parts) > 1 else ""
+            entries.append(
+                RepoEntry(
+                    name, repo.path.strpath, owner, len(parts) - 1, repo
+                )
+            )
+        entries.sort(key=lambda e: e.depth)
+        self._entries = entries
+        self._by_name = dict((e.name, e) for e in entries)
+        self._prefetched = prefetched or {}
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        return (e.repo for e in self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def entries(self):
+        return list(self._entries)
+
+    def get(self, name):
+        """
+        The Repository named name (its path under srcroot), or None.
+        """
+        entry = self._by_name.get(name)
+        return entry.repo if entry else None
+
+    def _cached(self, entry, attr, signature, compute):
+        key = (entry.path, attr)
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        value = compute()
+        with self._lock:
+            self._cache[key] = (signature, value)
+        return value
+
+    def branch(self, entry):
+        """
+        The branch entry has checked out, "" if HEAD is detached, or None
+        if it hasn't been cloned.
+        """
+        gitdir = git_dirs(entry.path)[0]
+        if gitdir is None:
+            return None
+        head = os.path.join(gitdir, "HEAD")
+
+        def read():
+            with open(head) as f:
+                content = f.read().strip()
+            if content.startswith("ref: refs/heads/"):
+                return content[len("ref: refs/heads/"):]
+            return ""
+
+        return self._cached(entry, "branch", _mtime(head), read)
+
+    def dirty(self, entry):
+        """
+        Whether entry has staged, unstaged or untracked changes; None if
+        it hasn't been cloned.  Not cached: editing a file changes nothing
+        git keeps, so only running git status can tell.
+        """
+        if git_dirs(entry.path)[0] is None:
+            return None
+        return entry.repo.status().changed
+
+    def last_fetch(self, entry):
+        """
+        When entry was last fetched (or prefetched), or None.
+        """
+        gitdir, commondir = git_dirs(entry.path)
+        if gitdir is None:
+            return None
+        # Prefetching doesn't write FETCH_HEAD, and git only rewrites the
+        # refs it changes, so prefetches are timed by the prefetch state
+        times = [
+            _mtime(os.path.join(commondir, "FETCH_HEAD")),
+            self._prefetched.get(entry.name),
+        ]
+        return max([t for t in times if t is not None] or [None])
+
+    def query(
+        self,
+        names=(),
+        owner=None,
+        branch=None,
+        dirty=None,
+        cloned=None,
+        workers=DEFAULT_WORKERS,
+    ):
+        """
+        The entries matching every criterion given: names are regular
+        expressions, any of which may match the repo's path; owner is
+        matched exactly; branch is a shell pattern (e.g. feature/*) the
+        checked-out branch must match; dirty and cloned are True or False.
+
+        Cheap criteria are checked first; whether repos are dirty is only
+        checked for the rest, on a pool of workers.
+        """
+        patterns = [re.compile(n, re.I) for n in names]
+        matched = []
+        for entry in self._entries:
+            if patterns and not any(p.search(entry.path) for p in patterns):
+                continue
+            if owner is not None and entry.owner != owner:
+                continue
+            if cloned is not None or branch is not None or dirty is not None:
+                current = self.branch(entry)
+                if cloned is not None and cloned != (current is not None):
+                    continue
+                if branch is not None and not fnmatch.fnmatchcase(
+                    current or "", branch
+                ):
+                    continue
+                if dirty is not None and current is None:
+                    continue
+            matched.append(entry)
+        if dirty is None:
+            return matched
+        flags = dict(
+            (e.path, flag)
+            for e, flag, exc in parallel(self.dirty, matched, workers)
+            if exc is None
+        )
+        return [e for e in matched if flags.get(e.path) == dirty]
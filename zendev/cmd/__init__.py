@@ -0,0 +1,745 @@
+"""
+Registry of zendev subcommands.
+
+Parsers for every subcommand are declared here using nothing heavier than
+argparse.  The module implementing a command is only imported when that
+command actually runs (or when one of its completers is invoked), so
+``zendev root`` and argcomplete don't pay for GitPython, requests and
+friends.
+"""
+from __future__ import absolute_import, print_function
+
+import argparse
+import importlib
+
+from ..utils import DEFAULT_WORKERS
+
+
+class lazy(object):
+    """
+    A callable standing in for ``zendev.cmd.<module>.<name>``.
+
+    The target is imported on first call and cached afterwards.
+    """
+
+    def __init__(self, module, name):
+        self.module = module
+        self.name = name
+        self._target = None
+
+    def resolve(self):
+        if self._target is None:
+            module = importlib.import_module("." + self.module, __name__)
+            self._target = getattr(module, self.name)
+        return self._target
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self):
+        return "<lazy %s.%s:%s>" % (__name__, self.module, self.name)
+
+
+def add_restore_arguments(parser):
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="number of repos to clone at once (default %(default)s)",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=2,
+        help="times to retry a repo that fails to clone (default "
+        "%(default)s)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        dest="cache",
+        action="store_false",
+        help="don't borrow objects from the shared cache in ~/.zendev",
+    )
+    parser.add_argument(
+        "--tune",
+        action="store_true",
+        help="tune new clones for speed (see 'zendev repos tune')",
+    )
+
+
+def add_query_arguments(parser):
+    parser.add_argument(
+        "--owner",
+        metavar="OWNER",
+        help="only repos of OWNER (e.g. zenoss in github.com/zenoss/...)",
+    )
+    parser.add_argument(
+        "--branch",
+        metavar="PATTERN",
+        help="only repos with a branch matching PATTERN (e.g. 'feature/*') "
+        "checked out",
+    )
+    dirty = parser.add_mutually_exclusive_group()
+    dirty.add_argument(
+        "--dirty",
+        action="store_const",
+        const=True,
+        help="only repos with uncommitted changes",
+    )
+    dirty.add_argument(
+        "--clean",
+        dest="dirty",
+        action="store_const",
+        const=False,
+        help="only repos without uncommitted changes",
+    )
+    parser.add_argument(
+        "repos", nargs="*", metavar="REPO", help="only repos matching REPO"
+    )
+
+
+def add_environment_commands(subparsers):
+    completer = lazy("environment", "EnvironmentCompleter")
+
+    init_parser = subparsers.add_parser(
+        "init", help="Create a new environment"
+    )
+    init_parser.add_argument("path", metavar="PATH")
+    init_parser.add_argument("-t", "--tag", metavar="TAG", required=False)
+    init_parser.add_argument(
+        "-s", "--shallow", action="store_true", required=False
+    )
+    init_parser.add_argument(
+        "--from",
+        dest="base",
+        metavar="ENVIRONMENT",
+        help="check repos out as worktrees of another environment's repos",
+    ).completer = completer
+    init_parser.add_argument(
+        "--from-bundle",
+        dest="bundle",
+        metavar="ARCHIVE",
+        help="import repos from an archive written by 'zendev export' "
+        "instead of cloning them",
+    )
+    add_restore_arguments(init_parser)
+    init_parser.set_defaults(functor=lazy("environment", "init"))
+
+    use_parser = subparsers.add_parser("use", help="Switch to an environment")
+    use_parser.add_argument(
+        "name", metavar="ENVIRONMENT"
+    ).completer = completer
+    use_parser.add_argument("--no-switch", action="store_true")
+    use_parser.set_defaults(functor=lazy("environment", "use"))
+
+    drop_parser = subparsers.add_parser("drop", help="Delete an environment")
+    drop_parser.add_argument(
+        "name", metavar="ENVIRONMENT", default=None
+    ).completer = completer
+    drop_parser.add_argument("--purge", action="store_true")
+    drop_parser.set_defaults(functor=lazy("environment", "drop"))
+
+    which_parser = subparsers.add_parser(
+        "env", help="Print the current environment name"
+    )
+    which_parser.set_defaults(functor=lazy("environment", "env"))
+
+    export_parser = subparsers.add_parser(
+        "export",
+        help="Write an environment's repos to an archive of git bundles "
+        "for 'zendev init --from-bundle'",
+    )
+    export_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="number of repos to bundle at once (default %(default)s)",
+    )
+    export_parser.add_argument(
+        "name", metavar="ENVIRONMENT"
+    ).completer = completer
+    export_parser.add_argument("archive", metavar="ARCHIVE")
+    export_parser.set_defaults(functor=lazy("environment", "export"))
+
+
+def add_tags_commands(subparsers, completer):
+    restore_parser = subparsers.add_parser(
+        "restore", help="Restore repository state to a tag"
+    )
+    restore_parser.add_argument(
+        "--shallow", action="store_true", help="Attempt a shallow clone"
+    )
+    restore_parser.add_argument(
+        "-n",
+        "--dry-run",
+        action="store_true",
+        help="show which repos would be cloned or checked out",
+    )
+    restore_parser.add_argument(
+        "--all",
+        action="store_true",
+        help="check out every repo, even those already at their ref",
+    )
+    add_restore_arguments(restore_parser)
+    a = restore_parser.add_argument("name", metavar="NAME")
+    a.completer = completer
+    restore_parser.set_defaults(functor=lazy("tags", "restore"))
+
+    # TODO: add support for tag and changelog ala zendev v1
+
+
+def add_build_commands(subparsers):
+    build_parser = subparsers.add_parser("build", help="Build Zenoss")
+    build_parser.add_argument(
+        "-c",
+        "--clean",
+        action="store_true",
+        default=False,
+        help="Delete any existing images before building",
+    )
+    build_parser.add_argument(
+        "target_product",
+        metavar="TARGET",
+        help="Name of the target product to build; e.g. core, resmgr, etc",
+    )
+    build_parser.set_defaults(functor=lazy("build", "build"))
+
+
+def add_devimg_commands(subparsers):
+    devimg_parser = subparsers.add_parser(
+        "devimg",
+        help="Build a developer image of Zenoss containing either no "
+        "zenpacks, the set of zenpacks matching one of the standard "
+        "products (core, resmgr, etc), or a custom set of zenpacks",
+    )
+    devimg_parser.add_argument(
+        "-c",
+        "--clean",
+        action="store_true",
+        default=False,
+        help="Delete any existing devimg before building a new one",
+    )
+    zenpacks_parser = devimg_parser.add_mutually_exclusive_group(
+        required=False
+    )
+    zenpacks_parser.add_argument(
+        "-p",
+        "--product",
+        metavar="PRODUCT",
+        required=False,
+        help="Name of a Zenoss product that defines the set of zenpacks "
+        "copied into the image; e.g. core, resmgr, etc",
+    )
+    zenpacks_parser.add_argument(
+        "-f",
+        "--file",
+        help="Path to a zenpacks.json file that defines the set of zenpacks "
+        "copied into the image",
+    )
+    zenpacks_parser.add_argument(
+        "-z",
+        "--zenpacks",
+        metavar="ZENPACKS",
+        required=False,
+        help="Comma-separated list of ZenPack names to copy into the image",
+    )
+
+    devimg_parser.set_defaults(functor=lazy("devimg", "devimg"))
+
+
+def add_impact_devimg_commands(subparsers):
+    impact_devimg_parser = subparsers.add_parser(
+        "impact_devimg", help="Build a developer image for Zenoss Impact "
+    )
+    impact_devimg_parser.add_argument(
+        "--impact-image",
+        help="In an impact-devimg build, the image to use as a source to "
+        "build new image on top of it",
+    )
+
+    impact_devimg_parser.set_defaults(
+        functor=lazy("impact_devimg", "impact_devimg")
+    )
+
+
+def add_test_commands(subparsers):
+    test_parser = subparsers.add_parser(
+        "test", help="Run Zenoss product tests"
+    )
+
+    test_parser.add_argument(
+        "-i",
+        "--interactive",
+        action="store_true",
+        help="Start an interactive shell instead of running the test",
+        default=False,
+    )
+    test_parser.add_argument(
+        "-n",
+        "--no-tty",
+        action="store_true",
+        default=False,
+        dest="no_tty",
+        help="Do not allocate a TTY",
+    )
+    test_parser.add_argument("arguments", nargs=argparse.REMAINDER)
+    test_parser.set_defaults(functor=lazy("test", "test"))
+
+
+def add_repos_commands(subparsers):
+    status_parser = subparsers.add_parser(
+        "status", help="Show the status of current repos"
+    )
+    status_parser.add_argument(
+        "-a",
+        "--all",
+        action="store_true",
+        help="show all repos, not just changed repos",
+    )
+    status_parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        help="list the changed files of each repo",
+    )
+    status_parser.add_argument(
+        "--json",
+        action="store_true",
+        help="print one JSON object per repo as it is checked",
+    )
+    status_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="number of repos to check at once (default %(default)s)",
+    )
+    add_query_arguments(status_parser)
+    status_parser.set_defaults(functor=lazy("repos", "status"))
+
+    pull_parser = subparsers.add_parser(
+        "pull", help="Pull latest changes for all repos"
+    )
+    pull_parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        help="report every repo, not just the ones that changed",
+    )
+    pull_parser.add_argument(
+        "--rebase",
+        action="store_true",
+        help="rebase branches that have diverged from their upstream",
+    )
+    pull_parser.add_argument(
+        "--fetch",
+        action="store_true",
+        help="fetch from the remotes even if 'zendev prefetch' has fetched "
+        "the repos recently",
+    )
+    pull_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="number of repos to pull at once (default %(default)s)",
+    )
+    pull_parser.add_argument(
+        "--slowest",
+        type=int,
+        default=5,
+        metavar="N",
+        help="summarize the N slowest repos (default %(default)s)",
+    )
+    add_query_arguments(pull_parser)
+    pull_parser.set_defaults(functor=lazy("repos", "pull"))
+
+    repos_parser = subparsers.add_parser(
+        "repos", help="Manage the repos of the current environment"
+    )
+    repos_parser.set_defaults(
+        functor=lambda args, env: repos_parser.print_usage()
+    )
+    repos_subparsers = repos_parser.add_subparsers(dest="repos_command")
+
+    ls_parser = repos_subparsers.add_parser(
+        "ls",
+        help="List repos with their branches and when they were last "
+        "fetched",
+    )
+    ls_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="number of repos to check at once with --dirty or --clean "
+        "(default %(default)s)",
+    )
+    add_query_arguments(ls_parser)
+    ls_parser.set_defaults(functor=lazy("repos", "ls"))
+
+    tune_parser = repos_subparsers.add_parser(
+        "tune",
+        help="Enable git's features for big repos and time git status "
+        "before and after",
+    )
+    tune_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="number of repos to tune at once (default %(default)s)",
+    )
+    add_query_arguments(tune_parser)
+    tune_parser.set_defaults(functor=lazy("repos", "tune"))
+
+    sparse_parser = repos_subparsers.add_parser(
+        "sparse",
+        help="Show or change which directories of a repo are checked out",
+    )
+    sparse_mode = sparse_parser.add_mutually_exclusive_group()
+    sparse_mode.add_argument(
+        "--add",
+        action="store_true",
+        help="add DIRs to the repo's directories instead of replacing them",
+    )
+    sparse_mode.add_argument(
+        "--disable",
+        action="store_true",
+        help="check out the whole repo again",
+    )
+    sparse_parser.add_argument(
+        "repo",
+        nargs="?",
+        metavar="REPO",
+        help="the repo; list every sparse repo if omitted",
+    )
+    sparse_parser.add_argument(
+        "dirs",
+        nargs="*",
+        metavar="DIR",
+        help="check out only these top-level directories (and files)",
+    )
+    sparse_parser.set_defaults(functor=lazy("repos", "sparse"))
+
+
+def add_serviced_commands(subparsers):
+    serviced_parser = subparsers.add_parser("serviced", help="Run serviced")
+    serviced_parser.add_argument(
+        "--deploy_ana",
+        action="store_true",
+        help="Add only analytics service definitions and deploy an instance",
+    )
+    serviced_parser.add_argument(
+        "-d",
+        "--deploy",
+        action="store_true",
+        help="Add Zenoss service definitions and deploy an instance",
+    )
+    serviced_parser.add_argument(
+        "-a",
+        "--startall",
+        action="store_true",
+        help="Start all services once deployed",
+    )
+    serviced_parser.add_argument(
+        "-x",
+        "--reset",
+        action="store_true",
+        help="Clean service state and kill running containers first",
+    )
+    serviced_parser.add_argument(
+        "--template",
+        help="Zenoss service template"
+        " file to add or directory to compile and add",
+        default=None,
+    )
+    serviced_parser.add_argument(
+        "--image",
+        help="Zenoss image to use when compiling template",
+        default="zendev/devimg",
+    )
+    serviced_parser.add_argument(
+        "--module",
+        help="Additional service modules" " for the Zenoss service template",
+        nargs="+",
+        default=None,
+    )
+    serviced_parser.add_argument(
+        "--module_dir",
+        help="Directory for additional service modules",
+        default=None,
+    )
+    serviced_parser.add_argument(
+        "--recompile",
+        action="store_true",
+        help="compile the template even if a compiled copy is cached",
+    )
+    serviced_parser.add_argument(
+        "--transforms",
+        metavar="NAMES",
+        help="comma-separated template transforms to apply instead of the "
+        "defaults, e.g. zope_debug,remove_auth0_vars ('' for none)",
+    )
+    serviced_parser.add_argument(
+        "--skip-transform",
+        action="append",
+        default=[],
+        metavar="NAME",
+        help="don't apply the template transform NAME (may be repeated)",
+    )
+    serviced_parser.add_argument(
+        "--no-root",
+        dest="no_root",
+        action="store_true",
+        help="Don't run serviced as root",
+    )
+    serviced_parser.add_argument(
+        "--no-auto-assign-ips",
+        action="store_true",
+        help="Do NOT auto-assign IP addresses to services requiring "
+        "an IP address",
+    )
+    serviced_parser.add_argument(
+        "--with-docker-registry",
+        action="store_true",
+        default=False,
+        help="Use the internal docker registry (necessary for multihost)",
+    )
+    serviced_parser.add_argument(
+        "--skip-ready-wait",
+        action="store_true",
+        default=False,
+        help="don't wait for serviced to be ready",
+    )
+    serviced_parser.add_argument(
+        "--ready-timeout",
+        type=int,
+        default=600,
+        metavar="SECONDS",
+        help="give up waiting for serviced after SECONDS (default 600)",
+    )
+    serviced_parser.add_argument(
+        "--ready-check",
+        action="append",
+        default=[],
+        metavar="PATH",
+        help="also wait for PATH on the UI port to return 200 "
+        "(may be repeated)",
+    )
+    serviced_parser.add_argument(
+        "--timeline",
+        metavar="FILE",
+        help="also write how long each startup phase took to FILE as JSON",
+    )
+    serviced_parser.add_argument(
+        "--bench",
+        type=int,
+        default=0,
+        metavar="N",
+        help="reset and start serviced N times, then report the p50 and "
+        "p95 of each startup phase",
+    )
+    serviced_parser.add_argument(
+        "--cluster-master",
+        action="store_true",
+        default=False,
+        help="run as master for multihost cluster",
+    )
+    serviced_parser.add_argument(
+        "-u", "--uiport", type=int, default=443, help="UI port"
+    )
+    serviced_parser.add_argument("arguments", nargs=argparse.REMAINDER)
+    serviced_parser.set_defaults(functor=lazy("serviced", "run_serviced"))
+
+    attach_parser = subparsers.add_parser(
+        "attach", help="Attach to serviced container"
+    )
+    attach_parser.add_argument(
+        "specifier",
+        metavar="SERVICEID|SERVICENAME|DOCKERID",
+        help="Attach to a container matching SERVICEID|SERVICENAME|DOCKERID "
+        "in service instances",
+    )
+    attach_parser.set_defaults(functor=lazy("serviced", "attach"))
+
+    devshell_parser = subparsers.add_parser(
+        "devshell", help="Start a development shell"
+    )
+    devshell_parser.add_argument(
+        "-d",
+        "--docker",
+        action="store_true",
+        help="docker run instead of serviced shell",
+    )
+    devshell_parser.add_argument(
+        "-s",
+        "--service",
+        default="zope",
+        help="run serviced shell for service",
+    )
+    devshell_parser.add_argument(
+        "--root",
+        action="store_true",
+        default=False,
+        help="Run shell as root instead of zenoss",
+    )
+    devshell_parser.add_argument(
+        "command", nargs=argparse.REMAINDER, metavar="COMMAND"
+    )
+    devshell_parser.set_defaults(functor=lazy("serviced", "devshell"))
+
+
+def add_cache_commands(subparsers):
+    cache_parser = subparsers.add_parser(
+        "cache",
+        help="Manage the git object cache shared by all environments",
+    )
+    cache_parser.set_defaults(
+        functor=lambda args, env: cache_parser.print_usage()
+    )
+    cache_subparsers = cache_parser.add_subparsers(dest="cache_command")
+
+    update_parser = cache_subparsers.add_parser(
+        "update", help="Fetch new objects into every cached repo"
+    )
+    update_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="number of repos to fetch at once (default %(default)s)",
+    )
+    update_parser.set_defaults(functor=lazy("cache", "update"))
+
+    add_parser = cache_subparsers.add_parser(
+        "add", help="Cache every repo of the current environment"
+    )
+    add_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="number of repos to cache at once (default %(default)s)",
+    )
+    add_parser.set_defaults(functor=lazy("cache", "add"))
+
+    ls_parser = cache_subparsers.add_parser("ls", help="List cached repos")
+    ls_parser.set_defaults(functor=lazy("cache", "ls"))
+
+
+def add_maintenance_commands(subparsers):
+    maintenance_parser = subparsers.add_parser(
+        "maintenance",
+        help="Repack and prune the repos of every environment that need it",
+    )
+    maintenance_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=2,
+        help="number of repos to maintain at once (default %(default)s)",
+    )
+    maintenance_parser.add_argument(
+        "--interval",
+        type=float,
+        default=7,
+        metavar="DAYS",
+        help="maintain repos not maintained for this long even if they "
+        "look fine (default %(default)s)",
+    )
+    maintenance_parser.add_argument(
+        "--force", action="store_true", help="maintain every repo"
+    )
+    maintenance_parser.add_argument(
+        "-n",
+        "--dry-run",
+        action="store_true",
+        help="list the repos that need maintenance and why",
+    )
+    maintenance_parser.set_defaults(
+        functor=lazy("maintenance", "maintenance")
+    )
+
+
+def add_prefetch_commands(subparsers):
+    prefetch_parser = subparsers.add_parser(
+        "prefetch",
+        help="Keep fetching the current environment's repos in the "
+        "background so pull and restore don't have to",
+    )
+    prefetch_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=4,
+        help="number of repos to fetch at once (default %(default)s)",
+    )
+    prefetch_parser.add_argument(
+        "--interval",
+        type=float,
+        default=15,
+        metavar="MINUTES",
+        help="time between rounds (default %(default)s)",
+    )
+    prefetch_parser.add_argument(
+        "--jitter",
+        type=float,
+        default=0.2,
+        metavar="FRACTION",
+        help="vary the time between rounds by up to this fraction of it "
+        "(default %(default)s)",
+    )
+    prefetch_parser.add_argument(
+        "--once", action="store_true", help="run one round and exit"
+    )
+    prefetch_parser.add_argument(
+        "--background",
+        action="store_true",
+        help="run as a daemon logging to ~/.zendev/prefetch.log, unless "
+        "one is running already",
+    )
+    prefetch_parser.add_argument(
+        "-v", "--verbose", action="store_true", help="list each repo fetched"
+    )
+    prefetch_parser.set_defaults(functor=lazy("prefetch", "prefetch"))
+
+
+def add_dumpzodb_commands(subparsers):
+    epilog = """
+    To dump clean, updated database files to Products/ZenModel/data,
+    build a core devimg with:
+    zendev devimg --clean
+    and then run:
+    zendev dump-zodb
+    """
+
+    dumpzodb_parser = subparsers.add_parser(
+        "dump-zodb", help="Manage zodb", epilog=epilog
+    )
+    dumpzodb_parser.add_argument(
+        "-z",
+        "--load-from-gz",
+        action="store_true",
+        help="Load data from the .gz file instead of the .xml files",
+        dest="gz",
+        default=False,
+    )
+    dumpzodb_parser.set_defaults(functor=lazy("dumpzodb", "dumpzodb"))
+
+
+def add_commands(subparsers, tags_completer):
+    add_environment_commands(subparsers)
+    add_tags_commands(subparsers, tags_completer)
+    add_build_commands(subparsers)
+    add_devimg_commands(subparsers)
+    add_impact_devimg_commands(subparsers)
+    add_test_commands(subparsers)
+    add_repos_commands(subparsers)
+    add_serviced_commands(subparsers)
+    add_dumpzodb_commands(subparsers)
+    add_cache_commands(subparsers)
+    add_maintenance_commands(subparsers)
+    add_prefetch_commands(subparsers)
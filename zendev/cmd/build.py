@@ -66,20 +66,3 @@ def build(args, env):
     targetDir.chdir()
     print(" ".join(cmdArgs))
     subprocess.check_call(cmdArgs)
-
-
-def add_commands(subparsers):
-    build_parser = subparsers.add_parser("build", help="Build Zenoss")
-    build_parser.add_argument(
-        "-c",
-        "--clean",
-        action="store_true",
-        default=False,
-        help="Delete any existing images before building",
-    )
-    build_parser.add_argument(
-        "target_product",
-        metavar="TARGET",
-        help="Name of the target product to build; e.g. core, resmgr, etc",
-    )
-    build_parser.set_defaults(functor=build)
@@ -0,0 +1,62 @@
+from __future__ import absolute_import, print_function
+
+import sys
+import time
+
+from ..cache import get_cache
+from ..log import error, info
+from ..utils import parallel
+
+
+def update(args, env):
+    """
+    Fetch new objects into every cached repo.
+    """
+    cache = get_cache()
+    start = time.time()
+    updated = failed = 0
+    for mirror, _, exc in cache.update_all(args.jobs):
+        if exc is not None:
+            failed += 1
+            error(str(exc))
+        else:
+            updated += 1
+            info("Updated %s" % cache.root.bestrelpath(mirror))
+    info(
+        "%d cached repos updated, %d failed in %.2fs"
+        % (updated, failed, time.time() - start)
+    )
+    if failed:
+        sys.exit(1)
+
+
+def add(args, env):
+    """
+    Make sure every repo of the current environment is in the cache.
+    """
+    cache = get_cache()
+    failed = 0
+    for repo, mirror, exc in parallel(
+        lambda repo: cache.ensure(repo.url), env().repos(), args.jobs
+    ):
+        if exc is not None:
+            failed += 1
+            error(str(exc))
+        else:
+            info("Cached %s" % cache.root.bestrelpath(mirror))
+    if failed:
+        sys.exit(1)
+
+
+def ls(args, env):
+    """
+    List the cached repos and their size on disk.
+    """
+    cache = get_cache()
+    for mirror in cache.mirrors():
+        size = sum(
+            p.size() for p in mirror.join("objects").visit() if p.isfile()
+        )
+        print(
+            "%-60s %8.1f MB" % (cache.root.bestrelpath(mirror), size / 1e6)
+        )
@@ -105,45 +105,3 @@ def _createZPFile(environ, zenpackList):
             separators=(",", ": "),
         )
     return zenpackManifestFile.strpath
-
-
-def add_commands(subparsers):
-    devimg_parser = subparsers.add_parser(
-        "devimg",
-        help="Build a developer image of Zenoss containing either no "
-        "zenpacks, the set of zenpacks matching one of the standard "
-        "products (core, resmgr, etc), or a custom set of zenpacks",
-    )
-    devimg_parser.add_argument(
-        "-c",
-        "--clean",
-        action="store_true",
-        default=False,
-        help="Delete any existing devimg before building a new one",
-    )
-    zenpacks_parser = devimg_parser.add_mutually_exclusive_group(
-        required=False
-    )
-    zenpacks_parser.add_argument(
-        "-p",
-        "--product",
-        metavar="PRODUCT",
-        required=False,
-        help="Name of a Zenoss product that defines the set of zenpacks "
-        "copied into the image; e.g. core, resmgr, etc",
-    )
-    zenpacks_parser.add_argument(
-        "-f",
-        "--file",
-        help="Path to a zenpacks.json file that defines the set of zenpacks "
-        "copied into the image",
-    )
-    zenpacks_parser.add_argument(
-        "-z",
-        "--zenpacks",
-        metavar="ZENPACKS",
-        required=False,
-        help="Comma-separated list of ZenPack names to copy into the image",
-    )
-
-    devimg_parser.set_defaults(functor=devimg)
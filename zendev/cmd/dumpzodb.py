@@ -21,26 +21,3 @@ def dumpzodb(args, env):
     devimgSrcDir.chdir()
     print(" ".join(cmdArgs))
     subprocess.check_call(cmdArgs)
-
-
-def add_commands(subparsers):
-    epilog = """
-    To dump clean, updated database files to Products/ZenModel/data,
-    build a core devimg with:
-    zendev devimg --clean
-    and then run:
-    zendev dump-zodb
-    """
-
-    dumpzodb_parser = subparsers.add_parser(
-        "dump-zodb", help="Manage zodb", epilog=epilog
-    )
-    dumpzodb_parser.add_argument(
-        "-z",
-        "--load-from-gz",
-        action="store_true",
-        help="Load data from the .gz file instead of the .xml files",
-        dest="gz",
-        default=False,
-    )
-    dumpzodb_parser.set_defaults(functor=dumpzodb)
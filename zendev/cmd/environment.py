@@ -2,9 +2,12 @@ from __future__ import absolute_import, print_function
 
 import py
 import sys
+import time
 
-from ..environment import ZenDevEnvironment, init_config_dir, NotInitialized
+from ..bundle import BundleError
+from ..environment import get_environment, init_config_dir, NotInitialized
 from ..config import get_config
+from ..log import error, info
 
 
 def init(args, _):
@@ -24,19 +27,100 @@ def init(args, _):
         )
         sys.exit(1)
 
-    config.add(name, args.path)
+    base = getattr(args, "base", None)
+    if base and not config.exists(base):
+        error("Environment '%s' is not defined" % base)
+        sys.exit(1)
+    bundle = getattr(args, "bundle", None)
+    if bundle and base:
+        error("--from and --from-bundle can't be used together")
+        sys.exit(1)
+    if bundle:
+        bundle = py.path.local(bundle)
+        if not bundle.check(file=True):
+            error("%s does not exist" % bundle)
+            sys.exit(1)
+
+    config.add(name, args.path, base=base)
     with path.as_cwd():
         try:
-            env = ZenDevEnvironment(name=name, path=path)
+            env = get_environment(name=name, path=path)
         except NotInitialized:
             init_config_dir()
-            env = ZenDevEnvironment(name=name, path=path)
+            env = get_environment(name=name, path=path)
+        if bundle:
+            _import_bundle(env, bundle, args.jobs)
+            if args.tag:
+                env.restore(
+                    args.tag,
+                    shallow=args.shallow,
+                    workers=args.jobs,
+                    retries=args.retries,
+                    cache=args.cache,
+                    tune=args.tune,
+                )
+            env.use()
+            return env
         tag = args.tag or "develop"
-        env.initialize(args.shallow, tag=tag)
+        env.initialize(
+            args.shallow,
+            tag=tag,
+            workers=args.jobs,
+            retries=args.retries,
+            cache=args.cache,
+            tune=args.tune,
+        )
         env.use()
     return env
 
 
+def _import_bundle(env, bundle, workers):
+    start = time.time()
+    imported = failed = 0
+    try:
+        for repo, exc in env.import_bundle(bundle, workers):
+            if exc is not None:
+                failed += 1
+                error(str(exc))
+                continue
+            imported += 1
+            info("Imported %s" % env.srcroot.bestrelpath(repo.path))
+    except BundleError as e:
+        error(str(e))
+        sys.exit(1)
+    info(
+        "%d repos imported, %d failed in %.2fs"
+        % (imported, failed, time.time() - start)
+    )
+    if failed:
+        error(
+            "Run 'zendev restore develop' (or the tag you need) to clone the "
+            "repos that failed."
+        )
+
+
+def export(args, env):
+    """
+    Export an environment's repos to a bundle archive.
+    """
+    env = env(args.name)
+    start = time.time()
+    exported = failed = 0
+    for repo, exc in env.export_bundle(args.archive, args.jobs):
+        if exc is not None:
+            failed += 1
+            error(str(exc))
+            continue
+        exported += 1
+        info("Exported %s" % env.srcroot.bestrelpath(repo.path))
+    info(
+        "%d repos exported to %s, %d failed in %.2fs"
+        % (exported, args.archive, failed, time.time() - start)
+    )
+    if failed:
+        sys.exit(1)
+
+
 def use(args, env):
     """
     Use a zendev environment.
@@ -50,6 +134,13 @@ def drop(args, env):
     """
     config = get_config()
     if args.name:
+        dependents = config.dependents(args.name)
+        if args.purge and dependents:
+            error(
+                "Environments %s have worktrees of %s's repos; drop them "
+                "first." % (", ".join(dependents), args.name)
+            )
+            sys.exit(1)
         config.remove(args.name, not args.purge)
     else:
         config.cleanup()
@@ -66,34 +157,3 @@ def EnvironmentCompleter(prefix, **kwargs):
     return (
         v for v in get_config().environments.keys() if v.startswith(prefix)
     )
-
-
-def add_commands(subparsers):
-    init_parser = subparsers.add_parser(
-        "init", help="Create a new environment"
-    )
-    init_parser.add_argument("path", metavar="PATH")
-    init_parser.add_argument("-t", "--tag", metavar="TAG", required=False)
-    init_parser.add_argument(
-        "-s", "--shallow", action="store_true", required=False
-    )
-    init_parser.set_defaults(functor=init)
-
-    use_parser = subparsers.add_parser("use", help="Switch to an environment")
-    use_parser.add_argument(
-        "name", metavar="ENVIRONMENT"
-    ).completer = EnvironmentCompleter
-    use_parser.add_argument("--no-switch", action="store_true")
-    use_parser.set_defaults(functor=use)
-
-    drop_parser = subparsers.add_parser("drop", help="Delete an environment")
-    drop_parser.add_argument(
-        "name", metavar="ENVIRONMENT", default=None
-    ).completer = EnvironmentCompleter
-    drop_parser.add_argument("--purge", action="store_true")
-    drop_parser.set_defaults(functor=drop)
-
-    which_parser = subparsers.add_parser(
-        "env", help="Print the current environment name"
-    )
-    which_parser.set_defaults(functor=env)
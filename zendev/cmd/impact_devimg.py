@@ -55,16 +55,3 @@ ln -fs $SRC/model-adapters-zenoss/target/model-adapters-zenoss-$VSN.jar $DST/lib
         "docker commit %s %s" % (container_id, impact_dst_image), shell=True
     )
     subprocess.call("docker rm %s" % container_id, shell=True)
-
-
-def add_commands(subparsers):
-    impact_devimg_parser = subparsers.add_parser(
-        "impact_devimg", help="Build a developer image for Zenoss Impact "
-    )
-    impact_devimg_parser.add_argument(
-        "--impact-image",
-        help="In an impact-devimg build, the image to use as a source to "
-        "build new image on top of it",
-    )
-
-    impact_devimg_parser.set_defaults(functor=impact_devimg)
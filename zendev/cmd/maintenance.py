@@ -0,0 +1,72 @@
+from __future__ import absolute_import, print_function
+
+import sys
+import time
+
+from ..cache import get_cache
+from ..config import get_config
+from ..environment import get_environment, NotInitialized
+from ..log import error, info
+from ..maintenance import (
+    AlreadyRunning,
+    Maintenance,
+    Target,
+    lower_priority,
+    repo_target,
+)
+
+
+def _targets():
+    """
+    The object stores of every environment's repos and of the cache.
+    """
+    config = get_config()
+    for name in sorted(config.environments):
+        try:
+            env = get_environment(name)
+        except NotInitialized:
+            error("Environment %s no longer exists; skipping it" % name)
+            continue
+        if not env._repos_file.check():
+            continue
+        for repo in env.repos():
+            if repo.path.check(dir=True):
+                yield repo_target(repo.path)
+    for mirror in get_cache().mirrors():
+        yield Target(mirror.strpath, mirror.strpath)
+
+
+def maintenance(args, env):
+    """
+    Repack, prune and write commit-graphs for the repos that need it.
+    """
+    start = time.time()
+    if not args.dry_run:
+        lower_priority()
+    try:
+        with Maintenance().locked() as state:
+            planned = state.plan(
+                _targets(), force=args.force, interval=args.interval * 86400
+            )
+            if args.dry_run:
+                for target, reason in planned:
+                    print("%-70s %s" % (target.path, reason))
+                return
+            done = failed = 0
+            for (target, reason), took, exc in state.run(planned, args.jobs):
+                if exc is not None:
+                    failed += 1
+                    error(str(exc))
+                    continue
+                done += 1
+                print("%-70s %-28s %6.1fs" % (target.path, reason, took))
+                sys.stdout.flush()
+    except AlreadyRunning:
+        info("Maintenance is already running; nothing to do")
+        return
+    info(
+        "%d repos maintained, %d failed in %.2fs"
+        % (done, failed, time.time() - start)
+    )
+    if failed:
+        sys.exit(1)
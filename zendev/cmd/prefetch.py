@@ -0,0 +1,93 @@
+from __future__ import absolute_import, print_function
+
+import os
+import sys
+import time
+
+import py
+
+from ..config import CONFIG_DIR, ZendevConfig
+from ..environment import get_environment, NotInitialized
+from ..log import error, info
+from ..maintenance import lower_priority
+from ..prefetch import AlreadyRunning, locked, run
+
+PREFETCH_LOG = "prefetch.log"
+
+
+def _current_env():
+    """
+    The current environment, read afresh so the prefetcher follows
+    'zendev use', or None if there isn't one with repos.
+    """
+    home = py.path.local(CONFIG_DIR, expanduser=True)
+    config = ZendevConfig(home.join("environments.json").strpath)
+    name = config.current
+    if not name or name not in config.environments:
+        return None
+    try:
+        env = get_environment(name, config.environments[name]["path"])
+    except NotInitialized:
+        return None
+    return env if env._repos_file.check() else None
+
+
+def _daemonize(logfile):
+    """
+    Detach from the terminal, writing output to logfile; returns in the
+    daemon only.
+    """
+    if os.fork():
+        os._exit(0)
+    os.setsid()
+    if os.fork():
+        os._exit(0)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    with open(os.devnull) as devnull:
+        os.dup2(devnull.fileno(), 0)
+    with open(logfile, "a") as log:
+        os.dup2(log.fileno(), 1)
+        os.dup2(log.fileno(), 2)
+
+
+def prefetch(args, env):
+    """
+    Fetch the current environment's repos into refs/prefetch periodically.
+    """
+    try:
+        lock = locked()
+    except AlreadyRunning:
+        if not args.background:
+            info("The prefetcher is already running")
+        return
+    if args.background:
+        # The daemon inherits the lock
+        _daemonize(
+            py.path.local(CONFIG_DIR, expanduser=True)
+            .join(PREFETCH_LOG)
+            .strpath
+        )
+    lower_priority()
+    with lock:
+        start, fetched, failed = time.time(), 0, 0
+        for env, repo, took, exc in run(
+            _current_env,
+            interval=args.interval * 60,
+            workers=args.jobs,
+            jitter=args.jitter,
+            rounds=1 if args.once else None,
+        ):
+            name = "%s:%s" % (env.name, env.srcroot.bestrelpath(repo.path))
+            if exc is not None:
+                failed += 1
+                error("%s %s" % (time.strftime("%Y-%m-%d %H:%M:%S"), exc))
+            else:
+                fetched += 1
+                if args.verbose:
+                    print("%-60s %6.2fs" % (name, took))
+            sys.stdout.flush()
+    info(
+        "%d repos prefetched, %d failed in %.2fs"
+        % (fetched, failed, time.time() - start)
+    )
@@ -1,41 +1,243 @@
 from __future__ import absolute_import, print_function
 
-import subprocess
+import json
+import sys
+import time
+
+from ..environment import STATUS_HEADERS
+from ..log import error, info
+from ..utils import colored
+
+
+def _select(env, args):
+    """
+    The repos matching the query arguments (see add_query_arguments).
+    """
+    entries = env.catalog().query(
+        names=args.repos,
+        owner=args.owner,
+        branch=args.branch,
+        dirty=args.dirty,
+        workers=args.jobs,
+    )
+    return [e.repo for e in entries]
+
+
+def _format_branch(status):
+    branch = status.branch
+    if status.ahead:
+        branch += " +%d" % status.ahead
+    if status.behind:
+        branch += " -%d" % status.behind
+    return branch
+
+
+def _age(seconds):
+    if seconds is None:
+        return "never"
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size:
+            return "%d%s ago" % (seconds // size, unit)
+    return "just now"
+
+
+def ls(args, env):
+    env = env()
+    catalog = env.catalog()
+    entries = catalog.query(
+        names=args.repos,
+        owner=args.owner,
+        branch=args.branch,
+        dirty=args.dirty,
+        workers=args.jobs,
+    )
+    width = max([len("Path")] + [len(e.name) for e in entries])
+    row = "{0:<%d}  {1:<30} {2}" % width
+    print(row.format("Path", "Branch", "Fetched"))
+    now = time.time()
+    for entry in entries:
+        branch = catalog.branch(entry)
+        fetched = catalog.last_fetch(entry)
+        print(
+            row.format(
+                entry.name,
+                "(not cloned)" if branch is None else branch or "(detached)",
+                _age(None if fetched is None else now - fetched),
+            )
+        )
 
 
 def status(args, env):
     env = env()
-    jigCmd = ["jig", "status"]
-    if args.all:
-        jigCmd.append("-a")
-    if args.verbose:
-        jigCmd.append("-v")
-    subprocess.check_call(jigCmd)
+    start = time.time()
+    repos = _select(env, args)
+    relpath = env.srcroot.bestrelpath
+    width = max(
+        [len(STATUS_HEADERS[0])] + [len(relpath(r.path)) for r in repos]
+    )
+    row = "{0:<%d}  {1:<30} {2:>7} {3:>9} {4:>10}" % width
+    if not args.json:
+        print(row.format(*STATUS_HEADERS))
+
+    checked = changed = failed = 0
+    for repo, st, exc in env.status(repos, args.jobs):
+        checked += 1
+        if exc is not None:
+            failed += 1
+            if args.json:
+                print(json.dumps({"name": repo.name, "error": str(exc)}))
+            else:
+                error(str(exc))
+            continue
+        changed += st.changed
+        if not (args.all or st.changed):
+            continue
+        if args.json:
+            print(json.dumps(dict(st._asdict(), changed=st.changed)))
+        else:
+            print(
+                row.format(
+                    relpath(repo.path),
+                    _format_branch(st),
+                    st.staged or "",
+                    st.unstaged or "",
+                    st.untracked or "",
+                ).rstrip()
+            )
+            if args.verbose:
+                for code, path in st.files:
+                    print("    " + colored("%s %s" % (code, path), "red"))
+        sys.stdout.flush()
+
+    if not args.json:
+        info(
+            "%d repos checked, %d changed, %d failed in %.2fs"
+            % (checked, changed, failed, time.time() - start)
+        )
 
 
 def pull(args, env):
     env = env()
-    jigCmd = ["jig", "pull"]
-    if args.verbose:
-        jigCmd.append("-v")
-    subprocess.check_call(jigCmd)
+    start = time.time()
+    repos = _select(env, args)
+    if args.fetch:
+        for repo in repos:
+            repo.prefetched = False
+    prefetched = sum(1 for r in repos if r.prefetched)
+    relpath = env.srcroot.bestrelpath
+    width = max([0] + [len(relpath(r.path)) for r in repos])
+    row = "{0:<%d}  {1:<15} fetch {2:6.2f}s  merge {3:6.2f}s" % width
 
+    results, failed = [], 0
+    for repo, result, exc in env.pull(repos, args.jobs, args.rebase):
+        if exc is not None:
+            failed += 1
+            error(str(exc))
+            continue
+        results.append((repo, result))
+        if args.verbose or result.outcome != "up to date":
+            print(
+                row.format(
+                    relpath(repo.path),
+                    result.outcome,
+                    result.fetch_time,
+                    result.merge_time,
+                )
+            )
+            sys.stdout.flush()
 
-def add_commands(subparsers):
-    status_parser = subparsers.add_parser(
-        "status", help="Show the status of current repos"
-    )
-    status_parser.add_argument(
-        "-a",
-        "--all",
-        action="store_true",
-        help="show all repos, not just changed repos",
+    if args.slowest and results:
+        info("Slowest repos:")
+        results.sort(key=lambda r: r[1].fetch_time + r[1].merge_time)
+        for repo, result in reversed(results[-args.slowest:]):
+            print(
+                row.format(
+                    relpath(repo.path),
+                    result.outcome,
+                    result.fetch_time,
+                    result.merge_time,
+                )
+            )
+    info(
+        "%d repos pulled, %d failed in %.2fs"
+        % (len(results), failed, time.time() - start)
     )
-    status_parser.add_argument("-v", "--verbose", action="store_true")
-    status_parser.set_defaults(functor=status)
+    if prefetched:
+        info(
+            "%d repos were updated from 'zendev prefetch' instead of their "
+            "remotes; use --fetch to fetch them" % prefetched
+        )
+    if failed:
+        sys.exit(1)
+
 
-    pull_parser = subparsers.add_parser(
-        "pull", help="Pull latest changes for all repos"
+def tune(args, env):
+    env = env()
+    start = time.time()
+    repos = _select(env, args)
+    relpath = env.srcroot.bestrelpath
+    width = max([len("Path")] + [len(relpath(r.path)) for r in repos])
+    row = "{0:<%d}  {1:>9} {2:>9}" % width
+    print(row.format("Path", "Before", "After"))
+
+    before = after = 0.0
+    tuned = failed = 0
+    for repo, result, exc in env.tune(repos, args.jobs):
+        if exc is not None:
+            failed += 1
+            error(str(exc))
+            continue
+        tuned += 1
+        before += result.before
+        after += result.after
+        print(
+            row.format(
+                relpath(repo.path),
+                "%.1fms" % (result.before * 1000),
+                "%.1fms" % (result.after * 1000),
+            )
+        )
+        sys.stdout.flush()
+    info(
+        "%d repos tuned, %d failed in %.2fs; git status took %.1fms in "
+        "total before and %.1fms after"
+        % (tuned, failed, time.time() - start, before * 1000, after * 1000)
     )
-    pull_parser.add_argument("-v", "--verbose", action="store_true")
-    pull_parser.set_defaults(functor=pull)
+    if failed:
+        sys.exit(1)
+
+
+def sparse(args, env):
+    env = env()
+    relpath = env.srcroot.bestrelpath
+    if not args.repo:
+        for name, dirs in sorted(env.sparse_profiles().items()):
+            print("%s  %s" % (name, " ".join(dirs)))
+        return
+    catalog = env.catalog()
+    repos = [catalog.get(args.repo)]
+    if repos[0] is None:
+        repos = [e.repo for e in catalog.query(names=[args.repo])]
+    if len(repos) != 1:
+        error(
+            "%s matches %d repos; give its path under %s"
+            % (args.repo, len(repos), env.srcroot)
+        )
+        sys.exit(1)
+    repo = repos[0]
+    if args.disable:
+        dirs = None
+    elif args.add:
+        dirs = (repo.sparse or []) + args.dirs
+    elif args.dirs:
+        dirs = args.dirs
+    else:
+        print(" ".join(repo.sparse) if repo.sparse else "(not sparse)")
+        return
+    env.set_sparse(repo, dirs)
+    if dirs is None:
+        info("%s: checked out in full" % relpath(repo.path))
+    else:
+        info(
+            "%s: checked out %s" % (relpath(repo.path), " ".join(repo.sparse))
+        )
@@ -1,6 +1,6 @@
 from __future__ import absolute_import, print_function
 
-import argparse
+import hashlib
 import json
 import os
 import re
@@ -10,10 +10,24 @@ import time
 import urllib3
 
 import py.path
-import requests
 
 from ..devimage import DevImage
 from ..log import error, info
+from ..readiness import (
+    NotReady,
+    ReadinessProbe,
+    ReadyHistory,
+    READY_HISTORY,
+    RECENT,
+)
+from .. import templates, transforms
+from ..timeline import (
+    Timeline,
+    report_summary,
+    summarize,
+    timed,
+    write_json,
+)
 from ..utils import get_ip_address, get_tmux_name, rename_tmux_window
 
 
@@ -24,18 +38,28 @@ class Serviced(object):
 
     env = None
     proc = None
+    template_cache = True
+    # Names of the template transforms to apply (None for the defaults),
+    # and of those to leave out
+    transform_names = None
+    skip_transforms = ()
 
-    def __init__(self, env, uiport=443):
+    def __init__(self, env, uiport=443, ready_checks=()):
         self.env = env
         self.serviced = self.env.gopath.join("bin/serviced").strpath
         self.uiport = uiport
         self.dev_image = DevImage(env)
+        self.probe = ReadinessProbe(
+            "https://localhost:%d" % uiport, ready_checks
+        )
+        self.timeline = Timeline()
 
     def get_zenoss_image(self, zenoss_image):
         if zenoss_image != "zendev/devimg":
             return zenoss_image
         return self.dev_image.get_image_name()
 
+    @timed("reset")
     def reset(self):
         info("Stopping any running serviced")
         subprocess.call(["sudo", "pkill", "serviced"])
@@ -98,13 +122,14 @@ class Serviced(object):
 
         # In serviced 1.1 and later, use subcommand 'server' to
         # request serviced be started
-        servicedVersion = str(
-            subprocess.check_output(
-                "%s version | awk '/^Version:/ { print $NF; exit }'"
-                % self.serviced,
-                shell=True,
-            ).strip()
-        )
+        with self.timeline.phase("version"):
+            servicedVersion = str(
+                subprocess.check_output(
+                    "%s version | awk '/^Version:/ { print $NF; exit }'"
+                    % self.serviced,
+                    shell=True,
+                ).strip()
+            )
         if (
             not servicedVersion.startswith("1.0.")
             and servicedVersion != "1.1.0"
@@ -113,54 +138,91 @@ class Serviced(object):
         if not servicedVersion.startswith("1.0."):
             args.extend(["server"])
 
-        # Make sure etc is present and contains copies of config files
-        etc = self.env.servicedhome.ensure("etc", dir=True)
-        pkg = self.env.servicedsrc.join("pkg")
-        for filename in (
-            "logconfig-server.yaml",
-            "logconfig-cli.yaml",
-            "logconfig-controller.yaml",
-        ):
-            source = pkg.join(filename)
-            target = etc.join(filename)
-            if not target.check():
-                try:
-                    source.copy(target)
-                except Exception:
-                    pass
-
-        # Symlink in isvcs/resources
-        isvcs = self.env.servicedhome.ensure("isvcs", dir=True)
-        linkpath = isvcs.join("resources")
-        if not linkpath.check(exists=True):
-            linkpath.mksymlinkto(
-                self.env.servicedsrc.join("isvcs", "resources")
-            )
+        with self.timeline.phase("etc_isvcs"):
+            # Make sure etc is present and contains copies of config files
+            etc = self.env.servicedhome.ensure("etc", dir=True)
+            pkg = self.env.servicedsrc.join("pkg")
+            for filename in (
+                "logconfig-server.yaml",
+                "logconfig-cli.yaml",
+                "logconfig-controller.yaml",
+            ):
+                source = pkg.join(filename)
+                target = etc.join(filename)
+                if not target.check():
+                    try:
+                        source.copy(target)
+                    except Exception:
+                        pass
+
+            # Symlink in isvcs/resources
+            isvcs = self.env.servicedhome.ensure("isvcs", dir=True)
+            linkpath = isvcs.join("resources")
+            if not linkpath.check(exists=True):
+                linkpath.mksymlinkto(
+                    self.env.servicedsrc.join("isvcs", "resources")
+                )
 
-        # Symlink in the web UI
-        web = self.env.servicedhome.ensure("share", "web", dir=True)
-        linkpath = web.join("static")
-        if not linkpath.check(exists=True):
-            linkpath.mksymlinkto(
-                self.env.servicedsrc.join("web", "ui", "build")
-            )
+            # Symlink in the web UI
+            web = self.env.servicedhome.ensure("share", "web", dir=True)
+            linkpath = web.join("static")
+            if not linkpath.check(exists=True):
+                linkpath.mksymlinkto(
+                    self.env.servicedsrc.join("web", "ui", "build")
+                )
 
         info("Running command: %s" % args)
-        self.proc = subprocess.Popen(args)
+        with self.timeline.phase("spawn"):
+            self.proc = subprocess.Popen(args)
 
     def is_ready(self):
-        try:
-            response = requests.get(
-                "https://localhost:%d" % self.uiport, verify=False
+        return self.probe.check()
+
+    @timed("ready")
+    def wait_ready(self, timeout, record=True):
+        """
+        Wait for serviced to be ready and, if record is True, record how
+        long it took in the environment's history; raises NotReady after
+        timeout seconds.  Only pass record=True if serviced was just
+        started, or the history won't tell how long startup takes.
+        """
+        seconds = self.probe.wait(
+            timeout,
+            progress=lambda secs, probe: info(
+                "Waiting for serviced to be ready (%s)" % probe.reason
+            ),
+        )
+        if not record:
+            info("serviced is ready after %.1fs" % seconds)
+            return seconds
+        history = ReadyHistory(self.env._config.join(READY_HISTORY))
+        median = history.median()
+        recent = min(len(history.startups), RECENT)
+        history.record(seconds, self.probe.probes)
+        history.save()
+        if median is None:
+            info("serviced is ready after %.1fs" % seconds)
+        else:
+            info(
+                "serviced is ready after %.1fs (median of the last %d: %.1fs)"
+                % (seconds, recent, median)
             )
-        except Exception:
-            return False
-        return response.status_code == 200
+        return seconds
 
     def wait(self):
         if self.proc is not None:
             sys.exit(self.proc.wait())
 
+    def shutdown(self):
+        """
+        Stop serviced, even if it was run as root, and wait for it to exit.
+        """
+        self.stop()
+        if self.proc is not None:
+            subprocess.call(["sudo", "pkill", "serviced"])
+            self.proc.wait()
+            self.proc = None
+
     def stop(self):
         if self.proc is not None:
             try:
@@ -170,6 +232,7 @@ class Serviced(object):
                 # Let's assume it'll die on its own.
                 pass
 
+    @timed("add_host")
     def add_host(self, host="172.17.42.1:4979", pool="default"):
         info("Adding host %s" % host)
         hostid = None
@@ -241,6 +304,7 @@ class Serviced(object):
                 error(err)
             return []
 
+    @timed("deploy")
     def deploy(
         self, template, pool="default", svcname="HBase", noAutoAssignIpFlag=""
     ):
@@ -256,77 +320,6 @@ class Serviced(object):
         info("Deployed templates:")
         subprocess.call([self.serviced, "template", "list"])
 
-    def remove_catalogservice(self, services, svc):
-        if svc["Name"] and svc["Name"] == "zencatalogservice":
-            services.remove(svc)
-            info("Removed zencatalogservice from resmgr template")
-            return
-
-        if (
-            svc["HealthChecks"]
-            and "catalogservice_answering" in svc["HealthChecks"]
-        ):
-            svc["HealthChecks"].pop("catalogservice_answering", None)
-        if svc["Prereqs"]:
-            for prereq in svc["Prereqs"]:
-                if prereq["Name"] == "zencatalogservice response":
-                    svc["Prereqs"].remove(prereq)
-
-    def remove_otsdb_bigtable(self, services, svc):
-        if svc["Name"] and svc["Name"] in (
-            "reader-bigtable",
-            "writer-bigtable",
-        ):
-            services.remove(svc)
-            info("Removed %s from resmgr template" % svc["Name"])
-            return
-
-    def zope_debug(self, services, svc):
-        if svc["Name"] and svc["Name"] == "Zope":
-            info("Set Zope to debug in template")
-            svc["Command"] = svc["Command"].replace("runzope", "zopectl fg")
-
-            if svc["HealthChecks"]:
-                for _, hc in list(svc["HealthChecks"].items()):
-                    if "runzope" in hc["Script"]:
-                        hc["Script"] = hc["Script"].replace(
-                            "runzope", "zopectl"
-                        )
-
-    def zproxy_debug(self, services, svc):
-        title = svc.get("Title", None)
-        if title and title.lower() == "zproxy":
-            configs = svc.get("ConfigFiles", {})
-            config = configs.get(
-                "/opt/zenoss/zproxy/conf/zproxy-nginx.conf", None
-            )
-            if config:
-                config["Content"] = config["Content"].replace(
-                    "pagespeed on", "pagespeed off"
-                )
-                info("Disabled pagespeed in zproxy template")
-
-    def remove_auth0_vars(self, services, svc):
-        if svc["Name"] and svc["Name"] == "Zenoss.cse":
-            for var in (
-                "auth0-audience",
-                "auth0-emailkey",
-                "auth0-tenant",
-                "auth0-tenantkey",
-                "auth0-whitelist",
-            ):
-                key = "global.conf.%s" % var
-                if svc["Context"].get(key, None):
-                    svc["Context"][key] = ""
-
-    def walk_services(self, services, visitor):
-        if not services:
-            return
-
-        for svc in services:
-            visitor(services, svc)
-            self.walk_services(svc["Services"], visitor)
-
     def get_template_path(self, template=None):
         if template is None:
             tplpath = self.zenoss_service_dir.join("services", "Zenoss.core")
@@ -342,10 +335,38 @@ class Serviced(object):
     def zenoss_service_dir(self):
         return self.env.srcroot.join("github.com/zenoss/zenoss-service/")
 
-    def compile_template(self, template, image):
+    def template_transforms(self, template):
+        """
+        The transforms applied to template once compiled, in order.
+        """
+        return transforms.select(
+            template, self.transform_names, self.skip_transforms
+        )
+
+    @timed("compile_template")
+    def compile_template(self, template, image, content=None):
+        """
+        Compile template and apply its transforms, or return the copy cached
+        for it; content is a digest of template's files, if already known.
+        """
         tplpath = self.get_template_path(template).strpath
-        info("Compiling template %s" % tplpath)
         mk_template_cmd = self.zenoss_service_dir.join("make_template.sh")
+        selected = self.template_transforms(template)
+        key = None
+        if self.template_cache:
+            key = self.env._templates.key(
+                tplpath,
+                mk_template_cmd,
+                image,
+                [t.name for t in selected],
+                content,
+            )
+            cached = self.env._templates.get(key)
+            if cached is not None:
+                info("Using the compiled template cached for %s" % tplpath)
+                return cached.read()
+
+        info("Compiling template %s" % tplpath)
         popenArgs = [mk_template_cmd.strpath, tplpath]
         proc = subprocess.Popen(
             popenArgs, stdout=subprocess.PIPE, stderr=subprocess.PIPE
@@ -362,27 +383,15 @@ class Serviced(object):
         info("Compiled new template")
 
         compiled = json.loads(stdout)
-        self.walk_services(compiled["Services"], self.zope_debug)
-        # disable pagespeed in zproxy to avoid
-        # obfuscating javascript
-        self.walk_services(compiled["Services"], self.zproxy_debug)
-        if template and (
-            "ucspm" in template
-            or "resmgr" in template
-            or "nfvimon" in template
-        ):
-            self.walk_services(
-                compiled["Services"], self.remove_catalogservice
-            )
-        self.walk_services(compiled["Services"], self.remove_otsdb_bigtable)
-
-        self.walk_services(compiled["Services"], self.remove_auth0_vars)
+        transforms.apply(compiled["Services"], selected)
 
         stdout = json.dumps(
             compiled, sort_keys=True, indent=4, separators=(",", ": ")
         )
+        self.env._templates.put(key, stdout)
         return stdout
 
+    @timed("add_template")
     def add_template(self, template=None):
         info("Adding template")
         addtpl = subprocess.Popen(
@@ -395,6 +404,7 @@ class Serviced(object):
         info("Added template %s" % tplid)
         return tplid
 
+    @timed("startall")
     def startall(self):
         p = subprocess.Popen(
             "%s service list | awk '/Zenoss/ {print $2; exit}'"
@@ -407,7 +417,19 @@ class Serviced(object):
 
     MERGED_TEMPLATE_SUFFIX = "_with_modules"
 
-    def add_template_module(self, baseTemplate, modules, moduleDir, image):
+    # How many merged templates to keep in zenhome/.zentemplate
+    KEEP_MERGED_TEMPLATES = 3
+
+    @timed("merge_template")
+    def merge_template(self, baseTemplate, modules, moduleDir):
+        """
+        Merge modules from moduleDir into a copy of baseTemplate; returns
+        the merged template's directory and a digest of its content.
+
+        Each combination of base template and modules has its own copy,
+        which is reused as it is if nothing changed, and otherwise updated
+        by copying only the files that did.
+        """
         baseTemplatePath = self.get_template_path(baseTemplate)
         if baseTemplatePath.check(dir=True):
             info("Using base template: {0} ".format(baseTemplatePath))
@@ -416,130 +438,205 @@ class Serviced(object):
                 "Cannot locate base template {} ".format(baseTemplatePath)
             )
         info("With additional services: {}".format(modules))
-
-        modHash = hash(tuple(modules))
+        moduleDirs = []
+        for mod in modules:
+            mdir = py.path.local(moduleDir).join(mod)
+            if not mdir.check(dir=True):
+                raise Exception("Cannot locate module: {0} ".format(mdir))
+            moduleDirs.append((mod, mdir))
+
+        # The merged template's name identifies the base template and the
+        # modules; the digest its content
+        ident = hashlib.sha256(
+            "\0".join([baseTemplatePath.strpath] + modules).encode("utf-8")
+        ).hexdigest()[:16]
         tplName = baseTemplate + self.MERGED_TEMPLATE_SUFFIX
-        tplHash = tplName + "_{}_".format(str(modHash))
         temppath = self.env.zenhome.join(".zentemplate").ensure(dir=True)
+        tplroot = temppath.join("{}_{}".format(tplName, ident))
+        tpldir = tplroot.join(tplName)
+        stamp = tplroot.join("digest")
+        digest = templates.merged_digest(baseTemplatePath, moduleDirs)
+
+        if tpldir.check(dir=True) and stamp.check() and stamp.read() == digest:
+            info("Reusing merged template: {}".format(tpldir))
+        else:
+            info("Updating merged template: {}".format(tpldir))
+            if stamp.check():
+                stamp.remove()
+            copied, removed = templates.sync_tree(
+                [(baseTemplatePath, "")]
+                + [(mdir, mod) for mod, mdir in moduleDirs],
+                tpldir.ensure(dir=True),
+            )
+            info("Copied {} files, removed {}".format(copied, removed))
+            with tplroot.join("Contents").open(mode="w") as f:
+                f.write("Adding base template: {0}\n".format(baseTemplatePath))
+                for mod, mdir in moduleDirs:
+                    f.write("Adding service: {0} \n".format(mdir))
+            stamp.write(digest)
+        tplroot.setmtime()
+
+        # Keep the most recently used merged templates
+        merged = sorted(temppath.listdir(), key=lambda p: p.lstat().mtime)
+        for old in merged[: -self.KEEP_MERGED_TEMPLATES]:
+            old.remove(ignore_errors=True)
+        return tpldir, digest
 
-        # Create a temporary dir to hold the merged template. Three older
-        # dir versions are kept, with the oldest ones removed as necessary.
-        # The module hash helps identify the merged template as being
-        # applicable to the specific combination of additional services.
-        tplroot = temppath.make_numbered_dir(
-            prefix=tplHash, rootdir=temppath, keep=3
+    def add_template_module(self, baseTemplate, modules, moduleDir, image):
+        tpldir, digest = self.merge_template(baseTemplate, modules, moduleDir)
+        return self.add_template(
+            self.compile_template(tpldir.strpath, image, content=digest)
+        )
+
+
+def _bring_up(args, environ, _serviced):
+    """Add the host, then deploy and start services as args ask."""
+    # opt_serviced/var/isvcs needs 755 perms
+    var_isvcs = environ.servicedhome.join("var", "isvcs").__str__()
+    if subprocess.call(["sudo", "chmod", "755", var_isvcs]):
+        error(
+            "Could not set appropriate permissions for %s. "
+            "Continuing anyway." % var_isvcs
         )
-        tpldir = tplroot.join(tplName).ensure(dir=True)
-        info("Creating merged template: {}".format(tpldir))
 
-        tplReadme = tplroot.join("Contents")
+    # Add host
+    if "SERVICED_HOST_IP" in os.environ:
+        host = os.environ.get("SERVICED_HOST_IP")
+        ipAddr, port = host.split(":")
+    else:
+        ipAddr = get_ip_address() or "172.17.42.1"
+        port = "4979"
+    existing_hosts = _serviced.get_hosts()
+    if all(host["IPAddr"] != ipAddr for host in existing_hosts):
+        _serviced.add_host(host="{}:{}".format(ipAddr, port))
+
+    if args.deploy or args.deploy_ana:
+
+        if args.deploy_ana:
+            args.template = environ.srcroot.join(
+                "/analytics/pkg/service/Zenoss.analytics"
+            ).strpath
+
+        deploymentId = "zendev-zenoss" if not args.deploy_ana else "ana"
+
+        zenoss_image = _serviced.get_zenoss_image(args.image)
+        tplid = None
+        if args.module:
+            tplid = _serviced.add_template_module(
+                args.template, args.module, args.module_dir, zenoss_image
+            )
+        else:
+            # Assume that a file is compiled json;
+            # directory needs to be compiled
+            if py.path.local(args.template).isfile():
+                template = open(py.path.local(args.template).strpath).read()
+            else:
+                template = _serviced.compile_template(
+                    args.template, zenoss_image
+                )
+
+            if template:
+                tplid = _serviced.add_template(template)
+
+        if tplid is None:
+            error("Failed to deploy %s. Continuing anyway." % template)
+        else:
+            kwargs = dict(template=tplid, svcname=deploymentId)
+            if args.no_auto_assign_ips:
+                kwargs["noAutoAssignIpFlag"] = "--manual-assign-ips"
 
-        with tplReadme.open(mode="w") as f:
-            f.write("Adding base template: {0}\n".format(baseTemplatePath))
-            baseTemplatePath.copy(tpldir)
-            for mod in modules:
-                mdir = py.path.local(moduleDir).join(mod)
-                if mdir.check(dir=True):
-                    modMsg = "Adding service: {0} \n".format(mdir)
-                    f.write(modMsg)
-                    info(modMsg)
-                    targetdir = tpldir.join(mod).ensure(dir=True)
-                    mdir.copy(targetdir)
-                else:
-                    raise Exception("Cannot locate module: {0} ".format(mdir))
+            _serviced.deploy(**kwargs)
 
-        return self.add_template(self.compile_template(tpldir.strpath, image))
+    if args.startall:
+        _serviced.startall()
+        info("Starting all services")
+
+
+def _bench(args, environ, _serviced):
+    """
+    Reset, start and bring up serviced args.bench times, then report the
+    p50 and p95 of each phase.
+    """
+    timelines = []
+    try:
+        for run in range(args.bench):
+            info("Benchmark run %d of %d" % (run + 1, args.bench))
+            _serviced.timeline = Timeline()
+            _serviced.reset()
+            _serviced.start(not args.no_root, args.arguments, args.image)
+            try:
+                _serviced.wait_ready(args.ready_timeout)
+            except NotReady as e:
+                error("Timed out waiting for serviced! %s" % e)
+                sys.exit(1)
+            _bring_up(args, environ, _serviced)
+            _serviced.shutdown()
+            _serviced.timeline.report()
+            timelines.append(_serviced.timeline)
+    finally:
+        _serviced.shutdown()
+
+    summary = summarize(timelines)
+    info("serviced startup over %d runs:" % len(timelines))
+    report_summary(summary)
+    if args.timeline:
+        write_json(
+            args.timeline,
+            {
+                "runs": [t.as_dict() for t in timelines],
+                "summary": [
+                    {"name": name, "runs": runs, "p50": p50, "p95": p95}
+                    for name, runs, p50, p95 in summary
+                ],
+            },
+        )
 
 
 def run_serviced(args, env):
     old_name = get_tmux_name()
-    timeout = 600
     environ = env()
-    _serviced = Serviced(environ, args.uiport)
-    if args.reset:
-        _serviced.reset()
+    _serviced = Serviced(environ, args.uiport, args.ready_check)
+    _serviced.template_cache = not args.recompile
+    if args.transforms is not None:
+        _serviced.transform_names = [
+            n for n in args.transforms.split(",") if n
+        ]
+    else:
+        _serviced.transform_names = environ.template_transforms
+    _serviced.skip_transforms = args.skip_transform
+    try:
+        _serviced.template_transforms(args.template)
+    except transforms.UnknownTransform as e:
+        error(str(e))
+        sys.exit(1)
     if args.arguments and args.arguments[0] == "--":
         args.arguments = args.arguments[1:]
+    if args.bench:
+        try:
+            _bench(args, environ, _serviced)
+        finally:
+            rename_tmux_window(old_name)
+        return
 
-    if not _serviced.is_ready():
+    if args.reset:
+        _serviced.reset()
+    started = not _serviced.is_ready()
+    if started:
         _serviced.start(not args.no_root, args.arguments, args.image)
     try:
-        wait_for_ready = not args.skip_ready_wait
-        while wait_for_ready and not _serviced.is_ready():
-            if not timeout:
-                error("Timed out waiting for serviced!")
+        if not args.skip_ready_wait:
+            try:
+                # Time startup only if this run started serviced
+                _serviced.wait_ready(args.ready_timeout, record=started)
+            except NotReady as e:
+                error("Timed out waiting for serviced! %s" % e)
                 sys.exit(1)
-            # log every 5 attempts
-            if not timeout % 5:
-                info("Waiting for serviced to be ready")
-            time.sleep(1)
-            timeout -= 1
 
-        if wait_for_ready:
-            info("serviced is ready!")
+        _bring_up(args, environ, _serviced)
 
-        # opt_serviced/var/isvcs needs 755 perms
-        var_isvcs = environ.servicedhome.join("var", "isvcs").__str__()
-        if subprocess.call(["sudo", "chmod", "755", var_isvcs]):
-            error(
-                "Could not set appropriate permissions for %s. "
-                "Continuing anyway." % var_isvcs
-            )
-
-        # Add host
-        if "SERVICED_HOST_IP" in os.environ:
-            host = os.environ.get("SERVICED_HOST_IP")
-            ipAddr, port = host.split(":")
-        else:
-            ipAddr = get_ip_address() or "172.17.42.1"
-            port = "4979"
-        existing_hosts = _serviced.get_hosts()
-        if all(host["IPAddr"] != ipAddr for host in existing_hosts):
-            _serviced.add_host(host="{}:{}".format(ipAddr, port))
-
-        if args.deploy or args.deploy_ana:
-
-            if args.deploy_ana:
-                args.template = environ.srcroot.join(
-                    "/analytics/pkg/service/Zenoss.analytics"
-                ).strpath
-
-            deploymentId = "zendev-zenoss" if not args.deploy_ana else "ana"
-
-            zenoss_image = _serviced.get_zenoss_image(args.image)
-            tplid = None
-            if args.module:
-                tplid = _serviced.add_template_module(
-                    args.template, args.module, args.module_dir, zenoss_image
-                )
-            else:
-                # Assume that a file is compiled json;
-                # directory needs to be compiled
-                if py.path.local(args.template).isfile():
-                    template = open(
-                        py.path.local(args.template).strpath
-                    ).read()
-                else:
-                    template = _serviced.compile_template(
-                        args.template, zenoss_image
-                    )
-
-                if template:
-                    tplid = _serviced.add_template(template)
-
-            if tplid is None:
-                error("Failed to deploy %s. Continuing anyway." % template)
-            else:
-                kwargs = dict(template=tplid, svcname=deploymentId)
-                if args.no_auto_assign_ips:
-                    kwargs["noAutoAssignIpFlag"] = "--manual-assign-ips"
-
-                _serviced.deploy(**kwargs)
-
-        if args.startall:
-            _serviced.startall()
-            info("Starting all services")
-            # Join the subprocess
+        _serviced.timeline.report()
+        if args.timeline:
+            write_json(args.timeline, _serviced.timeline.as_dict())
 
         # subtle hint that zenoss is ready to use
         print(
@@ -668,124 +765,3 @@ def devshell(args, env):
         subprocess.call(cmd, shell=True)
     finally:
         rename_tmux_window(old_name)
-
-
-def add_commands(subparsers):
-    serviced_parser = subparsers.add_parser("serviced", help="Run serviced")
-    serviced_parser.add_argument(
-        "--deploy_ana",
-        action="store_true",
-        help="Add only analytics service definitions and deploy an instance",
-    )
-    serviced_parser.add_argument(
-        "-d",
-        "--deploy",
-        action="store_true",
-        help="Add Zenoss service definitions and deploy an instance",
-    )
-    serviced_parser.add_argument(
-        "-a",
-        "--startall",
-        action="store_true",
-        help="Start all services once deployed",
-    )
-    serviced_parser.add_argument(
-        "-x",
-        "--reset",
-        action="store_true",
-        help="Clean service state and kill running containers first",
-    )
-    serviced_parser.add_argument(
-        "--template",
-        help="Zenoss service template"
-        " file to add or directory to compile and add",
-        default=None,
-    )
-    serviced_parser.add_argument(
-        "--image",
-        help="Zenoss image to use when compiling template",
-        default="zendev/devimg",
-    )
-    serviced_parser.add_argument(
-        "--module",
-        help="Additional service modules" " for the Zenoss service template",
-        nargs="+",
-        default=None,
-    )
-    serviced_parser.add_argument(
-        "--module_dir",
-        help="Directory for additional service modules",
-        default=None,
-    )
-    serviced_parser.add_argument(
-        "--no-root",
-        dest="no_root",
-        action="store_true",
-        help="Don't run serviced as root",
-    )
-    serviced_parser.add_argument(
-        "--no-auto-assign-ips",
-        action="store_true",
-        help="Do NOT auto-assign IP addresses to services requiring "
-        "an IP address",
-    )
-    serviced_parser.add_argument(
-        "--with-docker-registry",
-        action="store_true",
-        default=False,
-        help="Use the internal docker registry (necessary for multihost)",
-    )
-    serviced_parser.add_argument(
-        "--skip-ready-wait",
-        action="store_true",
-        default=False,
-        help="don't wait for serviced to be ready",
-    )
-    serviced_parser.add_argument(
-        "--cluster-master",
-        action="store_true",
-        default=False,
-        help="run as master for multihost cluster",
-    )
-    serviced_parser.add_argument(
-        "-u", "--uiport", type=int, default=443, help="UI port"
-    )
-    serviced_parser.add_argument("arguments", nargs=argparse.REMAINDER)
-    serviced_parser.set_defaults(functor=run_serviced)
-
-    attach_parser = subparsers.add_parser(
-        "attach", help="Attach to serviced container"
-    )
-    attach_parser.add_argument(
-        "specifier",
-        metavar="SERVICEID|SERVICENAME|DOCKERID",
-        help="Attach to a container matching SERVICEID|SERVICENAME|DOCKERID "
-        "in service instances",
-    )
-    attach_parser.set_defaults(functor=attach)
-
-    devshell_parser = subparsers.add_parser(
-        "devshell", help="Start a development shell"
-    )
-    devshell_parser.add_argument(
-        "-d",
-        "--docker",
-        action="store_true",
-        help="docker run instead of serviced shell",
-    )
-    devshell_parser.add_argument(
-        "-s",
-        "--service",
-        default="zope",
-        help="run serviced shell for service",
-    )
-    devshell_parser.add_argument(
-        "--root",
-        action="store_true",
-        default=False,
-        help="Run shell as root instead of zenoss",
-    )
-    devshell_parser.add_argument(
-        "command", nargs=argparse.REMAINDER, metavar="COMMAND"
-    )
-    devshell_parser.set_defaults(functor=devshell)
@@ -1,6 +1,5 @@
 from __future__ import absolute_import, print_function
 
-import argparse
 import os
 import subprocess
 import sys
@@ -90,27 +89,3 @@ def _old_test(args, env):
     print(" ".join(cmd))
     if subprocess.call(cmd):
         sys.exit(1)
-
-
-def add_commands(subparsers):
-    test_parser = subparsers.add_parser(
-        "test", help="Run Zenoss product tests"
-    )
-
-    test_parser.add_argument(
-        "-i",
-        "--interactive",
-        action="store_true",
-        help="Start an interactive shell instead of running the test",
-        default=False,
-    )
-    test_parser.add_argument(
-        "-n",
-        "--no-tty",
-        action="store_true",
-        default=False,
-        dest="no_tty",
-        help="Do not allocate a TTY",
-    )
-    test_parser.add_argument("arguments", nargs=argparse.REMAINDER)
-    test_parser.set_defaults(functor=test)
@@ -1,30 +1,121 @@
 from __future__ import absolute_import, print_function
 
+import copy
+import fcntl
 import json
 import os
+import tempfile
+from contextlib import contextmanager
+
 import py
 
 from .log import info, error
+from .repo import GitError, linked_worktrees, run_git, worktree_common_dir
 
 CONFIG_DIR = "~/.zendev"
 ZENDEV_VERSION = "v2"
 
+_MISSING = object()
+
+
+def _dumps(data):
+    return json.dumps(data, indent=4)
+
+
+def _merge(base, ours, theirs):
+    """
+    Three-way merge of two dicts that both started out as base.
+
+    Keys we changed win; everything else comes from theirs.  Nested dicts
+    are merged recursively so that two processes adding different
+    environments don't clobber each other.
+    """
+    merged = dict(theirs)
+    for key in set(base) | set(ours):
+        b = base.get(key, _MISSING)
+        o = ours.get(key, _MISSING)
+        if o == b:
+            continue
+        t = theirs.get(key, _MISSING)
+        if o is _MISSING:
+            merged.pop(key, None)
+        elif isinstance(o, dict) and isinstance(t, dict):
+            merged[key] = _merge(b if isinstance(b, dict) else {}, o, t)
+        else:
+            merged[key] = o
+    return merged
+
 
 class ZendevConfig(object):
+    """
+    The user's zendev configuration (~/.zendev/environments.json).
+
+    The file is read once.  save() only touches the disk when the data
+    actually changed, and then writes a temp file and renames it over the
+    original while holding an advisory lock, merging in anything another
+    zendev process saved in the meantime.
+    """
+
     def __init__(self, path):
         self._path = py.path.local(path)
+        self._lockpath = self._path.new(basename=self._path.basename + ".lock")
+        self._saved = None
+        self._data = self._read()
+        self._base = copy.deepcopy(self._data)
+
+    def _read(self):
         if self._path.check():
             with self._path.open() as f:
-                try:
-                    self._data = json.load(f)
-                except ValueError as e:
-                    print("File %s has invalid JSON data: %s" % (f, e))
-                    self._data = {"environments": {}}
-        else:
-            self._data = {"environments": {}}
+                content = f.read()
+            try:
+                data = json.loads(content)
+            except ValueError as e:
+                print("File %s has invalid JSON data: %s" % (self._path, e))
+            else:
+                self._saved = content
+                return data
+        return {"environments": {}}
+
+    @contextmanager
+    def _locked(self):
+        with open(self._lockpath.strpath, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    @property
+    def dirty(self):
+        return self._saved is None or _dumps(self._data) != self._saved
 
     def save(self):
-        self._path.write(json.dumps(self._data, indent=4))
+        if not self.dirty:
+            return
+        with self._locked():
+            base, ours = self._base, self._data
+            theirs = self._read()
+            if _dumps(theirs) != _dumps(base):
+                self._data = _merge(base, ours, theirs)
+            content = _dumps(self._data)
+            fd, tmp = tempfile.mkstemp(
+                prefix=".environments.", dir=self._path.dirname
+            )
+            mode = 0o644
+            if self._path.check():
+                mode = self._path.stat().mode & 0o777
+            try:
+                os.chmod(tmp, mode)
+                with os.fdopen(fd, "w") as f:
+                    f.write(content)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.rename(tmp, self._path.strpath)
+            except Exception:
+                os.unlink(tmp)
+                raise
+            self._saved = content
+            self._base = copy.deepcopy(self._data)
 
     @property
     def environments(self):
@@ -42,15 +133,29 @@ class ZendevConfig(object):
     def exists(self, name):
         return name in self.environments
 
-    def add(self, name, path):
+    def add(self, name, path, base=None):
+        """
+        Add an environment, optionally linked to the base environment whose
+        repos its repos are worktrees of.
+        """
         path = py.path.local(path)
         if not self.exists(name):
             self.environments[name] = {
                 "path": path.strpath,
                 "version": ZENDEV_VERSION,
             }
+            if base:
+                self.environments[name]["base"] = base
             self.save()
 
+    def dependents(self, name):
+        """
+        Names of the environments whose repos are worktrees of name's.
+        """
+        return sorted(
+            k for k, v in self.environments.items() if v.get("base") == name
+        )
+
     def remove(self, name, keepdata=True):
         env = self.environments.pop(name, None)
         if env:
@@ -61,6 +166,7 @@ class ZendevConfig(object):
                     "Data still lives at {path}.".format(**locals())
                 )
             else:
+                shared = _shared_git_dirs(py.path.local(path))
                 try:
                     py.path.local(env.get("path")).remove()
                     info(
@@ -72,6 +178,12 @@ class ZendevConfig(object):
                         "Environment {name} removed, but unable to remove "
                         "data at {path}.".format(**locals())
                     )
+                for gitdir in shared:
+                    # Forget the worktrees that were just removed
+                    try:
+                        run_git(["worktree", "prune"], cwd=gitdir.strpath)
+                    except GitError as e:
+                        error(str(e))
             self.save()
 
     def validate(self, envName):
@@ -104,11 +216,35 @@ class ZendevConfig(object):
         self.save()
 
 
-def get_config():
-    zendevhome = py.path.local(CONFIG_DIR, expanduser=True).ensure(dir=True)
-    config = ZendevConfig(zendevhome.join("environments.json"))
+def _shared_git_dirs(root):
+    """
+    The git directories of other repos that root's worktrees belong to.
+    """
+    shared = set()
+    for worktree in linked_worktrees(root.join("src")):
+        try:
+            gitdir = worktree_common_dir(worktree)
+        except GitError:
+            continue
+        if gitdir is not None and not gitdir.relto(root):
+            shared.add(gitdir)
+    return sorted(shared)
+
+
+_configs = {}
 
-    config.save()
+
+def get_config():
+    """
+    Return the process-wide ZendevConfig, loading it on first use.
+    """
+    zendevhome = py.path.local(CONFIG_DIR, expanduser=True)
+    path = zendevhome.join("environments.json").strpath
+    config = _configs.get(path)
+    if config is None:
+        zendevhome.ensure(dir=True)
+        config = _configs[path] = ZendevConfig(path)
+        config.save()
     return config
 
 
@@ -1,10 +1,14 @@
 from __future__ import absolute_import, print_function
 
+import atexit
+import io
 import json
 import os
 import py
 import subprocess
 import sys
+import tarfile
+import tempfile
 
 try:
     # Python 2
@@ -13,12 +17,33 @@ except ImportError:
     # Python 3
     pass
 
+from .bundle import export_environment, import_environment
+from .catalog import RepoCatalog
 from .log import info, error
+from .cache import get_cache
 from .config import get_config
-from .repo import Repository
-from .utils import is_git_repo, here
+from .manifest import INDEX_FILE, MANIFEST_DIR, ManifestCache, RepoIndex
+from .prefetch import (
+    INTERVAL as PREFETCH_INTERVAL,
+    PREFETCH_FILE,
+    PREFETCH_WORKERS,
+    PrefetchState,
+)
+from .repo import GitError, Repository, run_git, url_name
+from .restore import (
+    APPLIED_FILE,
+    STATE_FILE,
+    AppliedManifest,
+    RestoreState,
+    plan_restore,
+    restore_repos,
+    stream_manifest,
+)
+from .templates import TEMPLATE_DIR, TemplateCache
+from .utils import is_git_repo, here, parallel, DEFAULT_WORKERS
 
 CONFIG_DIR = ".zendev"
+SPARSE_FILE = "sparse.json"
 STATUS_HEADERS = ["Path", "Branch", "Staged", "Unstaged", "Untracked"]
 
 
@@ -54,7 +79,52 @@ def get_config_dir(path=None):
     return cfgdir
 
 
+_channel = None
+
+
+def _control_channel():
+    """
+    The file the zendev shell function sources after every command.
+
+    Opened on first use and shared by every environment in the process.
+    """
+    global _channel
+    if _channel is None:
+        _channel = open(os.environ.get("ZDCTLCHANNEL", os.devnull), "w")
+        atexit.register(_channel.close)
+    return _channel
+
+
+_environments = {}
+
+
+def get_environment(name=None, path=None):
+    """
+    Return the ZenDevEnvironment for name/path, creating it on first use.
+    """
+    if path:
+        path = py.path.local(path)
+    elif name:
+        path = py.path.local(get_config().environments.get(name).get("path"))
+    else:
+        path = py.path.local()
+    key = (name, path.strpath)
+    env = _environments.get(key)
+    if env is None:
+        env = _environments[key] = ZenDevEnvironment(name=name, path=path)
+    return env
+
+
 class ZenDevEnvironment(object):
+    """
+    A zendev environment rooted at the parent of a .zendev directory.
+
+    Construction is cheap: directories are only created when the property
+    that needs them is first used, and nothing is written to the shell's
+    control channel until bash() is called.  Use get_environment() to share
+    one instance per environment across a process.
+    """
+
     def __init__(self, name=None, path=None):
         if path:
             path = py.path.local(path)
@@ -68,23 +138,35 @@ class ZenDevEnvironment(object):
         self.name = name
         self._config = cfg_dir
         self._repos_file = self._config.join(".repos.json")
+        self._manifests = ManifestCache(self._config.join(MANIFEST_DIR))
+        self._templates = TemplateCache(self._config.join(TEMPLATE_DIR))
+        self._index = RepoIndex(
+            self._repos_file, self._config.join(INDEX_FILE)
+        )
+        self._sparse_file = self._config.join(SPARSE_FILE)
+        self._sparse = None
+        self._prefetch_file = self._config.join(PREFETCH_FILE)
+        self._prefetched = None
+        self._catalog = None
+        self._catalog_source = None
         self._root = py.path.local(cfg_dir.dirname)
-        self._srcroot = self._root.ensure("src", dir=True)
+        self._srcroot = self._root.join("src")
         self.gopath = self._root
-        self.servicedhome = self._root.ensure("opt_serviced", dir=True)
+        self._servicedhome = self._root.join("opt_serviced")
         self.servicedsrc = self._srcroot.join(
             "github.com", "control-center", "serviced"
         )
         self._prodbinsrc = self._srcroot.join(
             "github.com", "zenoss", "zenoss-prodbin"
         )
-        self._zenhome = self._root.ensure("zenhome", dir=True)
-        self._var_zenoss = self._root.ensure("var_zenoss", dir=True)
+        self._zenhome = self._root.join("zenhome")
+        self._var_zenoss = self._root.join("var_zenoss")
         self._productAssembly = self._srcroot.join(
             "github.com", "zenoss", "product-assembly"
         )
-        self._bash = open(os.environ.get("ZDCTLCHANNEL", os.devnull), "w")
-        self._export_env()
+        self._ensured = set()
+        self._exported = False
+        os.environ.update(self.envvars())
 
     def envvars(self):
         origpath = os.environ.get("PATH")
@@ -98,16 +180,35 @@ class ZenDevEnvironment(object):
             "JIGROOT": self._srcroot.strpath,
             "GOPATH": self.gopath.strpath,
             "ZD_PATH_MOD": newMod,
-            "SERVICED_HOME": self.servicedhome.strpath,
+            "SERVICED_HOME": self._servicedhome.strpath,
             "PATH": "%s%s" % (newMod, origpath),
         }
 
     def _export_env(self):
+        self._exported = True
         envvars = self.envvars()
         for k, v in envvars.items():
             self.bash('export %s="%s"' % (k, v))
         os.environ.update(envvars)
 
+    def _ensure(self, path):
+        if path.strpath not in self._ensured:
+            path.ensure(dir=True)
+            self._ensured.add(path.strpath)
+        return path
+
+    def ensure_dirs(self):
+        """
+        Create the standard directories of the environment.
+        """
+        for path in (
+            self._srcroot,
+            self._servicedhome,
+            self._zenhome,
+            self._var_zenoss,
+        ):
+            self._ensure(path)
+
     @property
     def srcroot(self):
         return self._srcroot
@@ -120,13 +221,17 @@ class ZenDevEnvironment(object):
     def root(self):
         return self._root
 
+    @property
+    def servicedhome(self):
+        return self._ensure(self._servicedhome)
+
     @property
     def var_zenoss(self):
-        return self._var_zenoss
+        return self._ensure(self._var_zenoss)
 
     @property
     def zenhome(self):
-        return self._zenhome
+        return self._ensure(self._zenhome)
 
     @property
     def zendev(self):
@@ -141,9 +246,32 @@ class ZenDevEnvironment(object):
         return self._prodbinsrc
 
     def bash(self, command):
-        print(command, file=self._bash)
+        if not self._exported:
+            self._export_env()
+        print(command, file=_control_channel())
+
+    @property
+    def base(self):
+        """
+        The environment whose repos this one's are worktrees of, if any.
+        """
+        return (get_config().environments.get(self.name) or {}).get("base")
+
+    @property
+    def template_transforms(self):
+        """
+        The names of the transforms to apply to service templates, from
+        the environment's "transforms" setting, or None for the defaults.
+        """
+        return (get_config().environments.get(self.name) or {}).get(
+            "transforms"
+        )
+
+    def _base_srcroot(self):
+        base = get_config().environments.get(self.base) if self.base else None
+        return py.path.local(base["path"]).join("src") if base else None
 
-    def _ensure_product_assembly(self):
+    def _ensure_product_assembly(self, cache=None, base=None, ref=None):
         if self._productAssembly.check() and not is_git_repo(
             self._productAssembly
         ):
@@ -153,21 +281,35 @@ class ZenDevEnvironment(object):
             )
             sys.exit(1)
         else:
-            repo = Repository(
-                self._productAssembly.strpath,
-                self._productAssembly.strpath,
-                "zenoss/product-assembly",
-            )
+            repo = self._product_assembly_repo()
             if not self._productAssembly.check(dir=True):
-                info("Cloning product-assembly repository")
                 github_zenoss = self.srcroot.ensure(
                     "github.com", "zenoss", dir=True
                 )
                 github_zenoss.chdir()
+                source = self._linkable(repo, base)
+                if source is not None:
+                    info("Linking product-assembly repository")
+                    repo.source, repo.ref = source, ref or repo.ref
+                else:
+                    info("Cloning product-assembly repository")
+                    if cache is not None:
+                        repo.reference = cache.ensure(repo.url)
                 repo.clone()
                 subprocess.check_call(["jig", "add", "product-assembly"])
             return repo
 
+    def _product_assembly_repo(self):
+        repo = Repository(
+            self._productAssembly.strpath,
+            self._productAssembly.strpath,
+            "zenoss/product-assembly",
+        )
+        repo.prefetched = self._prefetch_state().fresh(
+            self._srcroot.bestrelpath(self._productAssembly)
+        )
+        return repo
+
     def _ensure_prodbin(self):
         if self._prodbinsrc.check() and not is_git_repo(self._prodbinsrc):
             error(
@@ -192,15 +334,61 @@ class ZenDevEnvironment(object):
             return repo
 
     def _initializeJig(self):
-        self._srcroot.chdir()
+        self._ensure(self._srcroot).chdir()
         if not self._srcroot.join(".jig").check():
             subprocess.check_call(["jig", "init"])
 
-    def initialize(self, shallow=False, tag="develop"):
+    def initialize(self, shallow=False, tag="develop", **kwargs):
+        self.ensure_dirs()
         # Clone product-assembly directory
         self._initializeJig()
         # Initialize the env with the specified tag
-        self.restore(tag, shallow=shallow)
+        self.restore(tag, shallow=shallow, **kwargs)
+
+    def export_bundle(self, archive, workers=DEFAULT_WORKERS):
+        """
+        Write product-assembly and every repo that has been cloned to
+        archive (see bundle.export_environment).
+
+        Yields (Repository, exception) tuples as each repo finishes.
+        """
+        path = self._productAssembly.strpath
+        url = run_git(["config", "remote.origin.url"], cwd=path).strip()
+        pa = Repository(path, path, url)
+        pa.ref = pa.query.branch() or pa.query.resolve("HEAD")
+        repos = [pa] + [r for r in self.repos() if r.path.check(dir=True)]
+        return export_environment(self, repos, archive, workers)
+
+    def import_bundle(self, archive, workers=DEFAULT_WORKERS):
+        """
+        Initialize the environment from an archive written by export_bundle
+        instead of cloning: product-assembly, the repos and the manifest
+        come from the archive, and nothing is fetched.
+
+        Yields (Repository, exception) tuples as each repo finishes.
+        """
+        self.ensure_dirs()
+        self._initializeJig()
+        entry, results = import_environment(self, archive, workers)
+        config = get_config()
+        if self.name in config.environments:
+            for key, value in entry.items():
+                config.environments[self.name].setdefault(key, value)
+            config.save()
+
+        applied = AppliedManifest(self._config.join(APPLIED_FILE))
+        added = []
+        for repo, exc in results:
+            if repo.path != self._productAssembly:
+                applied.record(repo, exc is None)
+            if exc is None:
+                added.append(self._srcroot.bestrelpath(repo.path))
+            yield repo, exc
+        applied.save()
+
+        self._srcroot.chdir()
+        for path in added:
+            subprocess.check_call(["jig", "add", path])
 
     def generateRepoJSON(self):
         repos_sh = self._productAssembly.join("repos.sh")
@@ -208,9 +396,8 @@ class ZenDevEnvironment(object):
             error("%s does not exist" % repos_sh.strpath)
             sys.exit(1)
         else:
-            # run from _config dir so that repos.json is created there
-            self._config.chdir()
-            subprocess.check_call([repos_sh.strpath])
+            for _ in self._manifest_entries(repos_sh):
+                pass
             if not self._repos_file.check():
                 error("%s does not exist" % self._repos_file.strpath)
                 sys.exit(1)
@@ -231,51 +418,384 @@ class ZenDevEnvironment(object):
         if switch_dir:
             self.bash('cd "%s"' % self.root.strpath)
 
-    def restore(self, ref, shallow=False):
-        repo = self._ensure_product_assembly()
+    def restore(
+        self,
+        ref,
+        shallow=False,
+        workers=DEFAULT_WORKERS,
+        retries=2,
+        cache=True,
+        full=False,
+        dry_run=False,
+        tune=False,
+    ):
+        """
+        Restore the repos product-assembly lists for ref.
+
+        Only repos whose URL or ref differ from the last restore (or all
+        of them, if full is True) are touched.  With dry_run, print what
+        would be done, as of product-assembly's last fetch, without
+        changing anything.  With tune, new clones are tuned
+        (see Repository.tune) as they are initialized.
+        """
+        base = self._base_srcroot()
+        if dry_run:
+            return self._plan_only(ref, base, full)
+        cache = get_cache() if cache else None
+        repo = self._ensure_product_assembly(cache, base, ref)
         info("Checking out '%s' for product-assembly ..." % ref)
         repo.checkout(ref)
         repo.fetch()
         repo.merge_from_remote()
-        info("Generating list of github repos and versions ...")
-        repos_json = self.generateRepoJSON()
+        repos_sh = self._productAssembly.join("repos.sh")
+        if not repos_sh.check():
+            error("%s does not exist" % repos_sh.strpath)
+            sys.exit(1)
 
-        info("Checking out github repos defined by %s" % repos_json.strpath)
-        self._srcroot.chdir()
-        args = ["jig", "restore"]
-        if shallow:
-            args.append("--shallow")
-        args += [repos_json.strpath]
-        subprocess.check_call(args)
+        info(
+            "Checking out github repos as %s lists them ..." % repos_sh.strpath
+        )
+        entries = self._manifest_entries(repos_sh)
+        applied = AppliedManifest(self._config.join(APPLIED_FILE))
+        plan = plan_restore(
+            (self._repo_from_entry(e, base) for e in entries), applied, full
+        )
+        state = RestoreState(self._config.join(STATE_FILE), ref)
+        unchanged = []
+
+        def changed():
+            for repo, action, _ in plan:
+                if action == "unchanged":
+                    unchanged.append(repo)
+                elif action == "checkout" and repo.name in state.done:
+                    # Restored by an interrupted run that didn't get to
+                    # save the applied manifest
+                    applied.record(repo)
+                else:
+                    yield repo
+
+        results = restore_repos(
+            changed(),
+            state,
+            shallow=shallow,
+            workers=workers,
+            retries=retries,
+            cache=cache,
+        )
+        added, failed = [], 0
+        for repo, outcome, exc in results:
+            applied.record(repo, exc is None)
+            if exc is not None:
+                failed += 1
+                error(str(exc))
+                continue
+            info(
+                "%s %s"
+                % (outcome.capitalize(), self._srcroot.bestrelpath(repo.path))
+            )
+            if outcome in ("cloned", "linked"):
+                if outcome == "cloned" and not shallow:
+                    repo.initialize(tune=tune)
+                added.append(self._srcroot.bestrelpath(repo.path))
+
+        applied.save()
+        if unchanged:
+            info("%d repos already at their refs" % len(unchanged))
+
+        self._ensure(self._srcroot).chdir()
+        for path in added:
+            subprocess.check_call(["jig", "add", path])
         subprocess.check_call(
             ["jig", "add", "github.com/zenoss/product-assembly"]
         )
+        if failed:
+            error(
+                "Failed to restore %d repos; run 'zendev restore %s' again "
+                "to retry them." % (failed, ref)
+            )
+            sys.exit(1)
+        state.clear()
+
+    def _plan_only(self, ref, base, full):
+        """
+        Print what restoring ref would do without changing anything: the
+        manifest product-assembly's ref generates, as of its last fetch, is
+        compared with the repos as they are.
+        """
+        entries = self._manifest_at(ref)
+        applied = AppliedManifest(self._config.join(APPLIED_FILE))
+        plan = plan_restore(
+            (self._repo_from_entry(e, base) for e in entries), applied, full
+        )
+        return self._print_plan(plan, applied)
+
+    def _manifest_at(self, ref):
+        """
+        The entries of the manifest product-assembly generates at ref,
+        without checking ref out or writing .repos.json.
+        """
+        if not is_git_repo(self._productAssembly):
+            error(
+                "product-assembly hasn't been cloned; can't tell what %s "
+                "lists" % ref
+            )
+            sys.exit(1)
+        cwd = self._productAssembly.strpath
+        commit = None
+        for name in ("origin/" + ref, ref):
+            try:
+                commit = run_git(
+                    ["rev-parse", "--verify", "--quiet", name + "^{commit}"],
+                    cwd=cwd,
+                ).strip()
+                break
+            except GitError:
+                pass
+        if commit is None:
+            error("product-assembly has no %s; fetch it first" % ref)
+            sys.exit(1)
+        info(
+            "Planning from product-assembly %s (as of its last fetch)"
+            % commit[:10]
+        )
+        cached = self._manifests.get(
+            self._manifests.commit_key(self._productAssembly, commit)
+        )
+        if cached is not None:
+            return json.loads(cached.read())
+        tmp = py.path.local(tempfile.mkdtemp())
+        try:
+            archive = subprocess.check_output(
+                ["git", "archive", "--format=tar", commit], cwd=cwd
+            )
+            with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+                tar.extractall(tmp.join("product-assembly").strpath)
+            repos_sh = tmp.join("product-assembly", "repos.sh")
+            if not repos_sh.check():
+                error("%s has no repos.sh" % ref)
+                sys.exit(1)
+            # repos.sh writes the manifest in its working directory
+            return list(
+                stream_manifest(
+                    tmp.join(self._repos_file.basename),
+                    [repos_sh.strpath],
+                    tmp,
+                )
+            )
+        finally:
+            tmp.remove(ignore_errors=True)
+
+    def _print_plan(self, plan, applied):
+        counts = {}
+        for repo, action, previous in plan:
+            counts[action] = counts.get(action, 0) + 1
+            if action == "unchanged":
+                continue
+            change = repo.ref
+            if previous and previous["ref"] != repo.ref:
+                change = "%s -> %s" % (previous["ref"], repo.ref)
+            if previous and previous["url"] != repo.url:
+                change += " (from %s)" % previous["url"]
+            print(
+                "%-9s %s %s"
+                % (action, self._srcroot.bestrelpath(repo.path), change)
+            )
+        for key in applied.dropped():
+            print("%-9s %s" % ("unlisted", key))
+        print(
+            "%d to clone, %d to check out, %d unchanged"
+            % tuple(
+                counts.get(a, 0) for a in ("clone", "checkout", "unchanged")
+            )
+        )
+
+    def _manifest_entries(self, repos_sh):
+        """
+        Yield the entries of the manifest repos_sh generates in .repos.json,
+        reusing the cached copy if product-assembly hasn't changed.
+        """
+        key = self._manifests.key(self._productAssembly)
+        cached = self._manifests.get(key)
+        if cached is not None:
+            info(
+                "Using the manifest cached for product-assembly %s"
+                % key[:10]
+            )
+            cached.copy(self._repos_file)
+            for entry in json.loads(cached.read()):
+                yield entry
+            return
+        # run from _config dir so that repos.json is created there
+        for entry in stream_manifest(
+            self._repos_file, [repos_sh.strpath], self._config
+        ):
+            yield entry
+        self._manifests.put(key, self._repos_file)
+
+    def _linkable(self, repo, base):
+        """
+        The repo in base srcroot that repo can be a worktree of, if any.
+        """
+        if base is None:
+            return None
+        source = base.join(self._srcroot.bestrelpath(repo.path))
+        return source if source.join(".git").check() else None
+
+    def _repo_from_entry(self, item, base=None):
+        """
+        Make a Repository for an entry of .repos.json.
+
+        If base is the srcroot of another environment that has the repo,
+        the new Repository is set up to be a worktree of it.
+        """
+        repo = self._repo(
+            url_name(item["repo"]), item["repo"], item.get("ref")
+        )
+        repo.source = self._linkable(repo, base)
+        return repo
+
+    def _repo(self, name, url, ref):
+        repopath = self._srcroot.join(name)
+        repo = Repository(
+            repopath.strpath, repopath.strpath, str(url), ref=ref or "develop"
+        )
+        relpath = self._srcroot.bestrelpath(repopath)
+        repo.sparse = self.sparse_profiles().get(relpath)
+        repo.prefetched = self._prefetch_state().fresh(relpath)
+        return repo
+
+    def _prefetch_state(self):
+        """
+        The PrefetchState of this environment, as read when first needed.
+        """
+        if self._prefetched is None:
+            self._prefetched = PrefetchState(self._prefetch_file)
+        return self._prefetched
+
+    def sparse_profiles(self):
+        """
+        {repo path under srcroot: [directory, ...]} for each repo that is
+        checked out sparsely in this environment.
+        """
+        if self._sparse is None:
+            self._sparse = {}
+            if self._sparse_file.check():
+                self._sparse = json.loads(self._sparse_file.read())
+        return self._sparse
 
-    def _repos(self):
+    def set_sparse(self, repo, dirs):
+        """
+        Limit repo's working tree to dirs from now on, or check all of it
+        out again if dirs is None, and apply that to the repo if it has
+        been cloned.
+        """
+        profiles = self.sparse_profiles()
+        name = self._srcroot.bestrelpath(repo.path)
+        if dirs is None:
+            profiles.pop(name, None)
+        else:
+            profiles[name] = sorted(set(dirs))
+        tmp = self._sparse_file.new(basename=SPARSE_FILE + ".tmp")
+        tmp.write(json.dumps(profiles, indent=2, sort_keys=True))
+        os.rename(tmp.strpath, self._sparse_file.strpath)
+        repo.sparse = profiles.get(name)
+        if is_git_repo(repo.path.strpath):
+            if repo.sparse is None:
+                repo.disable_sparse()
+            else:
+                repo.apply_sparse()
+
+    def catalog(self):
+        """
+        The RepoCatalog of the repos in the manifest.  It is shared by
+        everything that goes through the repos in this process, and only
+        rebuilt when the manifest changes.
+        """
         if not self._repos_file.check():
             error("%s does not exist" % self._repos_file.strpath)
             sys.exit(1)
-
-        with self._repos_file.open() as f:
-            repos_list = json.load(f)
-        for item in repos_list:
-            name = str(item["repo"])
-            if name.startswith("git@"):
-                name = name[len("git@"):]
-                name = name.replace(":", "/")
-            elif name.startswith("https://"):
-                name = name[len("https://"):]
-            if name.endswith(".git"):
-                name = name[0: len(name) - len(".git")]
-            repopath = self._srcroot.join(name)
-            repo = Repository(repopath.strpath, repopath.strpath, name)
-            yield repo
+        entries = self._index.entries()
+        if self._catalog is None or self._catalog_source is not entries:
+            self._catalog = RepoCatalog(
+                self._srcroot,
+                (self._repo(*e) for e in entries),
+                self._prefetch_state().repos,
+            )
+            self._catalog_source = entries
+        return self._catalog
 
     def repos(self, filter_=None, key=None):
         """
-        Get Repository objects for all repos in the system.
+        Get Repository objects for all repos in the system, shallowest
+        first unless key says otherwise.
+        """
+        repos = filter(filter_, self.catalog())
+        return sorted(repos, key=key) if key else list(repos)
+
+    def status(self, repos=None, workers=DEFAULT_WORKERS):
+        """
+        Check the status of repos (default: all) using a pool of workers.
+
+        Yields (Repository, RepoStatus, exception) tuples as each repo
+        finishes, so the whole sweep takes about as long as the slowest
+        repo rather than the sum of all of them.
+        """
+        return parallel(
+            lambda repo: repo.status(),
+            self.repos() if repos is None else repos,
+            workers,
+        )
+
+    def tune(self, repos=None, workers=DEFAULT_WORKERS):
+        """
+        Tune repos (default: all) for speed using a pool of workers.
+
+        Yields (Repository, TuneResult, exception) tuples as each repo
+        finishes.
+        """
+        return parallel(
+            lambda repo: repo.tune(),
+            self.repos() if repos is None else repos,
+            workers,
+        )
+
+    def prefetch(
+        self, repos=None, workers=PREFETCH_WORKERS, interval=PREFETCH_INTERVAL
+    ):
+        """
+        Prefetch repos (default: product-assembly and all the repos that
+        have been cloned) using a pool of workers, and record that they
+        were, so pull and restore fetch from refs/prefetch for the next few
+        intervals.
+
+        Yields (Repository, seconds, exception) tuples as each repo
+        finishes.
+        """
+        state = PrefetchState(self._prefetch_file)
+        state.interval = interval
+        if repos is None:
+            repos = [r for r in self.repos() if r.path.check(dir=True)]
+            if is_git_repo(self._productAssembly):
+                repos.insert(0, self._product_assembly_repo())
+        try:
+            for repo, took, exc in parallel(
+                lambda repo: repo.prefetch(), repos, workers
+            ):
+                if exc is None:
+                    state.record(self._srcroot.bestrelpath(repo.path))
+                yield repo, took, exc
+        finally:
+            state.save()
+
+    def pull(self, repos=None, workers=DEFAULT_WORKERS, rebase=False):
+        """
+        Fetch and fast-forward repos (default: all) using a pool of workers.
+
+        Yields (Repository, PullResult, exception) tuples as each repo
+        finishes.
         """
-        return sorted(
-            filter(filter_, self._repos()),
-            key=key or (lambda r: r.name.count("/")),
+        return parallel(
+            lambda repo: repo.pull(rebase=rebase),
+            self.repos() if repos is None else repos,
+            workers,
         )
@@ -0,0 +1,231 @@
+from __future__ import absolute_import, print_function
+
+import atexit
+import subprocess
+import threading
+from collections import deque
+
+from .repo import GitError, run_git
+from .utils import LRUCache
+
+MAX_OPEN_QUERIES = 64
+# Commits to walk looking for an ancestor before asking git merge-base
+MAX_WALK = 1000
+
+
+class _CatFile(object):
+    """
+    A long-running git cat-file --batch or --batch-check process.
+    """
+
+    def __init__(self, path, mode):
+        self._mode = mode
+        self._proc = subprocess.Popen(
+            ["git", "cat-file", mode],
+            cwd=path,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+
+    def query(self, name):
+        """
+        Return (sha, type, content) for name, or None if it doesn't exist.
+        content is None for --batch-check.
+        """
+        self._proc.stdin.write(name.encode("utf-8") + b"\n")
+        self._proc.stdin.flush()
+        header = self._proc.stdout.readline().decode("utf-8").split()
+        if len(header) != 3:
+            if not header:
+                raise GitError("git cat-file exited unexpectedly")
+            return None
+        sha, kind, size = header
+        content = None
+        if self._mode == "--batch":
+            content = self._proc.stdout.read(int(size) + 1)[:-1]
+        return sha, kind, content
+
+    def close(self):
+        try:
+            self._proc.stdin.close()
+        except (IOError, OSError):
+            pass
+        self._proc.wait()
+
+
+class GitQuery(object):
+    """
+    Answers questions about a repository's refs and history from
+    long-running git processes instead of a fork per question.
+
+    Object names are resolved by a git cat-file --batch-check process,
+    history is walked by reading commits from a git cat-file --batch
+    process, and branches and their upstreams come from a single git
+    for-each-ref run that is reused until refresh() is called.  Safe to
+    share between threads.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.RLock()
+        self._check = None
+        self._batch = None
+        self._refs = None
+
+    def _cat(self, mode, name):
+        attr = "_check" if mode == "--batch-check" else "_batch"
+        with self._lock:
+            if getattr(self, attr) is None:
+                setattr(self, attr, _CatFile(self.path, mode))
+            return getattr(self, attr).query(name)
+
+    def refs(self):
+        """
+        {refname: (sha, upstream refname or "")} for every branch and
+        remote branch, plus the branch HEAD points at under None.
+        """
+        with self._lock:
+            if self._refs is None:
+                output = run_git(
+                    [
+                        "for-each-ref",
+                        "--format=%(HEAD)%00%(refname)%00%(objectname)"
+                        "%00%(upstream)",
+                        "refs/heads",
+                        "refs/remotes",
+                    ],
+                    cwd=self.path,
+                )
+                refs = {None: None}
+                for line in output.splitlines():
+                    head, name, sha, upstream = line.split("\0")
+                    refs[name] = (sha, upstream)
+                    if head == "*":
+                        refs[None] = name
+                self._refs = refs
+            return self._refs
+
+    def refresh(self):
+        """
+        Forget the refs read so far; call after anything moves them.
+        """
+        with self._lock:
+            self._refs = None
+            # cat-file may have cached refs too
+            if self._check is not None:
+                self._check.close()
+                self._check = None
+
+    def branch(self):
+        """
+        The name of the branch HEAD points at, or None if it is detached.
+        """
+        head = self.refs()[None]
+        return head[len("refs/heads/"):] if head else None
+
+    def upstream(self, branch):
+        """
+        The refname of branch's upstream, or None.
+        """
+        entry = self.refs().get("refs/heads/" + branch)
+        return entry[1] or None if entry else None
+
+    def resolve(self, name):
+        """
+        The commit name refers to, or None.  Branches and HEAD are
+        answered from the refs read by refs().
+        """
+        refs = self.refs()
+        if name == "HEAD" and refs[None]:
+            name = refs[None]
+        if name in refs:
+            return refs[name][0]
+        found = self._cat("--batch-check", name + "^{commit}")
+        return found[0] if found else None
+
+    def _parents(self, sha):
+        found = self._cat("--batch", sha)
+        if found is None:
+            # Beyond the edge of a shallow clone
+            return []
+        parents = []
+        for line in found[2].split(b"\n"):
+            if not line:
+                break
+            if line.startswith(b"parent "):
+                parents.append(line[len(b"parent "):].decode("ascii"))
+        return parents
+
+    def _ancestors(self, sha):
+        seen = set([sha])
+        queue = deque([sha])
+        while queue:
+            for parent in self._parents(queue.popleft()):
+                if parent not in seen:
+                    seen.add(parent)
+                    queue.append(parent)
+                    yield parent
+
+    def is_ancestor(self, ancestor, descendant):
+        """
+        Whether ancestor is descendant or one of its ancestors.
+
+        Walks back from both commits at once: finding ancestor behind
+        descendant proves it, and finding descendant behind ancestor
+        disproves it.  Only when neither settles it within MAX_WALK commits
+        is git merge-base run.
+        """
+        a, b = self.resolve(ancestor), self.resolve(descendant)
+        if a is None or b is None:
+            return False
+        if a == b:
+            return True
+        down, up = self._ancestors(b), self._ancestors(a)
+        for _ in range(MAX_WALK):
+            sha = next(down, None)
+            if sha == a:
+                return True
+            if sha is None:
+                return False
+            if up is not None:
+                sha = next(up, None)
+                if sha == b:
+                    return False
+                if sha is None:
+                    up = None
+        try:
+            run_git(["merge-base", "--is-ancestor", a, b], cwd=self.path)
+        except GitError:
+            return False
+        return True
+
+    def close(self):
+        with self._lock:
+            for attr in ("_check", "_batch"):
+                if getattr(self, attr) is not None:
+                    getattr(self, attr).close()
+                    setattr(self, attr, None)
+
+
+_queries = LRUCache(MAX_OPEN_QUERIES, on_evict=GitQuery.close)
+
+
+def get_query(path):
+    """
+    Return the shared GitQuery for the repository at path.
+    """
+    path = str(path)
+    query = _queries.get(path)
+    if query is None:
+        new = GitQuery(path)
+        query = _queries.setdefault(path, new)
+        if query is not new:
+            # Another thread added one first
+            new.close()
+    return query
+
+
+@atexit.register
+def _close_all():
+    for query in _queries.clear():
+        query.close()
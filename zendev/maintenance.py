@@ -0,0 +1,168 @@
+from __future__ import absolute_import, print_function
+
+import fcntl
+import json
+import os
+import subprocess
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+import py
+
+from .config import CONFIG_DIR
+from .repo import GitError, run_git, worktree_common_dir
+from .utils import parallel
+
+MAINTENANCE_FILE = "maintenance.json"
+MAINTENANCE_WORKERS = 2
+# A repo needs maintenance once it has more loose objects or packs than
+# this, or when it was last maintained longer ago than the interval
+LOOSE_OBJECTS = 2000
+PACKS = 30
+INTERVAL = 7 * 24 * 60 * 60
+
+Target = namedtuple("Target", "key path")
+Target.__doc__ = """
+A git object store to maintain: key is its git directory and path is
+where to run git.
+"""
+
+
+class AlreadyRunning(Exception):
+    pass
+
+
+def lower_priority():
+    """
+    Run this process, and the git processes it starts, at the lowest CPU
+    and IO priority.
+    """
+    os.nice(19)
+    ionice = py.path.local.sysfind("ionice")
+    if ionice is not None:
+        with open(os.devnull, "w") as devnull:
+            subprocess.call(
+                [ionice.strpath, "-c", "3", "-p", str(os.getpid())],
+                stdout=devnull,
+                stderr=devnull,
+            )
+
+
+def repo_target(path):
+    """
+    The Target for a working tree; worktrees of the same repo share one.
+    """
+    path = py.path.local(path)
+    gitdir = worktree_common_dir(path) or path.join(".git")
+    return Target(gitdir.strpath, path.strpath)
+
+
+def maintain(target):
+    """
+    Repack, prune and write the commit-graph of target; return how long
+    it took.
+    """
+    start = time.time()
+    run_git(["gc", "--quiet"], cwd=target.path)
+    run_git(["commit-graph", "write", "--reachable"], cwd=target.path)
+    return time.time() - start
+
+
+def object_counts(target):
+    output = run_git(["count-objects", "-v"], cwd=target.path)
+    return dict(line.split(": ", 1) for line in output.splitlines())
+
+
+class Maintenance(object):
+    """
+    When each object store was last maintained, kept in
+    ~/.zendev/maintenance.json.  Only one process at a time may hold it.
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            path = py.path.local(CONFIG_DIR, expanduser=True).join(
+                MAINTENANCE_FILE
+            )
+        self._path = path
+        self.last_run = {}
+
+    @contextmanager
+    def locked(self):
+        """
+        Hold the maintenance lock; raise AlreadyRunning if another process
+        has it.
+        """
+        self._path.dirpath().ensure(dir=True)
+        lockfile = self._path.new(basename=self._path.basename + ".lock")
+        with open(lockfile.strpath, "a") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except (IOError, OSError):
+                raise AlreadyRunning()
+            try:
+                if self._path.check():
+                    try:
+                        self.last_run = json.loads(self._path.read())
+                    except ValueError:
+                        self.last_run = {}
+                yield self
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def needs(self, target, now=None, interval=INTERVAL):
+        """
+        Why target needs maintenance, or None if it doesn't.
+        """
+        now = time.time() if now is None else now
+        counts = object_counts(target)
+        if int(counts.get("count", 0)) > LOOSE_OBJECTS:
+            return "%s loose objects" % counts["count"]
+        if int(counts.get("packs", 0)) > PACKS:
+            return "%s packs" % counts["packs"]
+        last = self.last_run.get(target.key)
+        if last is None:
+            return "never maintained"
+        if now - last > interval:
+            return "last maintained %d days ago" % ((now - last) // 86400)
+        return None
+
+    def record(self, target, when=None):
+        self.last_run[target.key] = time.time() if when is None else when
+        tmp = self._path.new(basename=self._path.basename + ".tmp")
+        tmp.write(json.dumps(self.last_run, indent=2, sort_keys=True))
+        os.rename(tmp.strpath, self._path.strpath)
+
+    def plan(self, targets, force=False, interval=INTERVAL):
+        """
+        Yield (target, reason) for each of targets that needs maintenance
+        (all of them if force is True).  Duplicate targets are dropped.
+        """
+        seen = set()
+        for target in targets:
+            if target.key in seen:
+                continue
+            seen.add(target.key)
+            try:
+                reason = (
+                    "forced"
+                    if force
+                    else self.needs(target, interval=interval)
+                )
+            except GitError:
+                continue
+            if reason:
+                yield target, reason
+
+    def run(self, planned, workers=MAINTENANCE_WORKERS):
+        """
+        Maintain planned targets on a pool of workers, recording each one
+        that succeeds.  Yields ((target, reason), seconds, exception).
+        """
+        for item, took, exc in parallel(
+            lambda item: maintain(item[0]), planned, workers
+        ):
+            if exc is None:
+                self.record(item[0])
+            yield item, took, exc
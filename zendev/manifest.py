@@ -0,0 +1,127 @@
+from __future__ import absolute_import, print_function
+
+import hashlib
+import json
+import os
+import subprocess
+
+from .repo import GitError, run_git, url_name
+
+MANIFEST_DIR = "manifests"
+INDEX_FILE = "repos-index.json"
+KEEP_MANIFESTS = 20
+
+
+def _write(path, content):
+    tmp = path.new(basename=path.basename + ".tmp")
+    tmp.write(content)
+    os.rename(tmp.strpath, path.strpath)
+
+
+class ManifestCache(object):
+    """
+    Repo manifests generated by product-assembly's repos.sh, keyed by the
+    product-assembly commit and the content of repos.sh they came from.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def key(self, product_assembly):
+        """
+        The key of the manifest product_assembly would generate, or None if
+        it has uncommitted changes (repos.sh may read any file in it).
+        """
+        cwd = product_assembly.strpath
+        try:
+            if run_git(["status", "--porcelain", "-uno"], cwd=cwd).strip():
+                return None
+            head = run_git(["rev-parse", "HEAD"], cwd=cwd).strip()
+        except GitError:
+            return None
+        script = product_assembly.join("repos.sh").read_binary()
+        return self._key(head, script)
+
+    def commit_key(self, product_assembly, commit):
+        """
+        The key of the manifest product_assembly would generate with commit
+        checked out, or None if commit has no repos.sh.
+        """
+        try:
+            script = subprocess.check_output(
+                ["git", "cat-file", "blob", commit + ":repos.sh"],
+                cwd=product_assembly.strpath,
+                stderr=subprocess.PIPE,
+            )
+        except subprocess.CalledProcessError:
+            return None
+        return self._key(commit, script)
+
+    @staticmethod
+    def _key(commit, script):
+        return "%s-%s" % (commit, hashlib.sha1(script).hexdigest()[:16])
+
+    def get(self, key):
+        """
+        The cached manifest for key, or None.
+        """
+        if key is None:
+            return None
+        path = self.root.join(key + ".json")
+        return path if path.check() else None
+
+    def put(self, key, manifest):
+        """
+        Cache a copy of manifest under key, dropping the oldest entries.
+        """
+        if key is None:
+            return
+        self.root.ensure(dir=True)
+        _write(self.root.join(key + ".json"), manifest.read())
+        cached = sorted(self.root.listdir("*.json"), key=lambda p: p.mtime())
+        for path in cached[:-KEEP_MANIFESTS]:
+            path.remove()
+
+
+class RepoIndex(object):
+    """
+    The entries of a manifest as compact (name, repo, ref) tuples.
+
+    The tuples are kept in memory and in a file next to the manifest, and
+    are only rebuilt when the manifest's size or mtime changes.
+    """
+
+    def __init__(self, manifest, path):
+        self._manifest = manifest
+        self._path = path
+        self._source = None
+        self._entries = None
+
+    def entries(self):
+        st = self._manifest.stat()
+        source = [st.mtime, st.size]
+        if source == self._source:
+            return self._entries
+        entries = self._load(source)
+        if entries is None:
+            with self._manifest.open() as f:
+                entries = [
+                    (url_name(e["repo"]), str(e["repo"]), e.get("ref"))
+                    for e in json.load(f)
+                ]
+            _write(
+                self._path, json.dumps({"source": source, "repos": entries})
+            )
+        self._source, self._entries = source, entries
+        return entries
+
+    def _load(self, source):
+        if not self._path.check():
+            return None
+        try:
+            data = json.loads(self._path.read())
+        except ValueError:
+            return None
+        if data.get("source") != source:
+            return None
+        return [tuple(e) for e in data["repos"]]
@@ -0,0 +1,116 @@
+from __future__ import absolute_import, print_function
+
+import fcntl
+import json
+import os
+import random
+import time
+
+import py
+
+from .config import CONFIG_DIR
+
+PREFETCH_FILE = "prefetch.json"
+PREFETCH_LOCK = "prefetch.lock"
+PREFETCH_WORKERS = 4
+# Seconds between rounds, and how far each wait may stray from it
+INTERVAL = 15 * 60
+JITTER = 0.2
+# A repo's prefetched refs are used for this many intervals
+FRESH_INTERVALS = 2
+
+
+class AlreadyRunning(Exception):
+    pass
+
+
+class PrefetchState(object):
+    """
+    When each repo of an environment was last prefetched, and how often
+    the prefetcher runs.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        data = {}
+        if path.check():
+            try:
+                data = json.loads(path.read())
+            except ValueError:
+                pass
+        self.interval = data.get("interval", INTERVAL)
+        self.repos = data.get("repos", {})
+
+    def fresh(self, name, now=None):
+        """
+        Whether name was prefetched recently enough to fetch from.
+        """
+        last = self.repos.get(name)
+        if last is None:
+            return False
+        now = time.time() if now is None else now
+        return now - last < self.interval * FRESH_INTERVALS
+
+    def record(self, name, when=None):
+        self.repos[name] = time.time() if when is None else when
+
+    def save(self):
+        tmp = self._path.new(basename=self._path.basename + ".tmp")
+        tmp.write(
+            json.dumps(
+                {"interval": self.interval, "repos": self.repos},
+                indent=2,
+                sort_keys=True,
+            )
+        )
+        os.rename(tmp.strpath, self._path.strpath)
+
+
+def wait_time(interval=INTERVAL, jitter=JITTER):
+    """
+    How long to wait for the next round: interval give or take jitter (a
+    fraction of it), so prefetchers started together drift apart.
+    """
+    return interval * random.uniform(1 - jitter, 1 + jitter)
+
+
+def locked(path=None):
+    """
+    Take the prefetcher's lock (~/.zendev/prefetch.lock) for the life of
+    this process; raise AlreadyRunning if another process has it.
+    """
+    if path is None:
+        path = py.path.local(CONFIG_DIR, expanduser=True).join(PREFETCH_LOCK)
+    path.dirpath().ensure(dir=True)
+    lock = open(path.strpath, "a")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except (IOError, OSError):
+        lock.close()
+        raise AlreadyRunning()
+    return lock
+
+
+def run(
+    current_env,
+    interval=INTERVAL,
+    workers=PREFETCH_WORKERS,
+    jitter=JITTER,
+    rounds=None,
+    sleep=time.sleep,
+):
+    """
+    Prefetch the repos of the environment current_env() returns (None to
+    skip a round) every interval seconds, rounds times or forever.
+
+    Yields (env, Repository, seconds, exception) as each repo finishes.
+    """
+    done = 0
+    while rounds is None or done < rounds:
+        env = current_env()
+        if env is not None:
+            for item in env.prefetch(workers=workers, interval=interval):
+                yield (env,) + item
+        done += 1
+        if rounds is None or done < rounds:
+            sleep(wait_time(interval, jitter))
@@ -0,0 +1,154 @@
+from __future__ import absolute_import, print_function
+
+import json
+import os
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+READY_HISTORY = "serviced-ready.json"
+# How many startups the history keeps, and how many the report compares with
+HISTORY_SIZE = 50
+RECENT = 10
+# Seconds to wait for serviced to be ready, for each connection and each
+# response, and between probes (starting at FIRST_DELAY, growing by BACKOFF
+# up to MAX_DELAY)
+READY_TIMEOUT = 600
+CONNECT_TIMEOUT = 0.5
+READ_TIMEOUT = 5
+FIRST_DELAY = 0.02
+MAX_DELAY = 1.0
+BACKOFF = 1.5
+
+
+class NotReady(Exception):
+    pass
+
+
+class ReadinessProbe(object):
+    """
+    Checks whether serviced is answering at url: its UI must return 200,
+    and so must each of the paths in checks (e.g. status endpoints of
+    serviced's API).
+
+    Probes share one keep-alive session, and connections that can't be made
+    give up after CONNECT_TIMEOUT.
+    """
+
+    def __init__(
+        self,
+        url,
+        checks=(),
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+    ):
+        self.url = url.rstrip("/")
+        self.checks = list(checks)
+        self.timeout = (connect_timeout, read_timeout)
+        self.probes = 0
+        self.reason = None
+        self._session = requests.Session()
+        self._session.verify = False
+        self._session.mount("http://", HTTPAdapter(pool_maxsize=1))
+        self._session.mount("https://", HTTPAdapter(pool_maxsize=1))
+
+    def check(self):
+        """
+        Probe serviced once; if it isn't ready, why is left in reason.
+        """
+        self.probes += 1
+        urls = [self.url + "/" + path.lstrip("/") for path in self.checks]
+        for url in [self.url] + urls:
+            try:
+                response = self._session.get(url, timeout=self.timeout)
+            except requests.RequestException as e:
+                self.reason = "%s: %s" % (url, e.__class__.__name__)
+                return False
+            if response.status_code != 200:
+                self.reason = "%s: %d" % (url, response.status_code)
+                return False
+        self.reason = None
+        return True
+
+    def wait(
+        self,
+        timeout=READY_TIMEOUT,
+        first_delay=FIRST_DELAY,
+        max_delay=MAX_DELAY,
+        progress=None,
+        clock=time.time,
+        sleep=time.sleep,
+    ):
+        """
+        Probe until serviced is ready, waiting first_delay after the first
+        probe and BACKOFF times longer after each one up to max_delay.
+        progress(seconds, probe) is called about every five seconds while
+        waiting.
+
+        Returns how many seconds it took; raises NotReady after timeout.
+        """
+        start = clock()
+        delay = first_delay
+        reported = start
+        while not self.check():
+            now = clock()
+            if now - start >= timeout:
+                raise NotReady(
+                    "serviced wasn't ready after %ds (%s)"
+                    % (timeout, self.reason)
+                )
+            if progress is not None and now - reported >= 5:
+                progress(now - start, self)
+                reported = now
+            sleep(min(delay, max(timeout - (now - start), 0)))
+            delay = min(delay * BACKOFF, max_delay)
+        return clock() - start
+
+    def close(self):
+        self._session.close()
+
+
+class ReadyHistory(object):
+    """
+    How long serviced took to be ready in the last HISTORY_SIZE startups of
+    an environment.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self.startups = []
+        if path.check():
+            try:
+                self.startups = json.loads(path.read()).get("startups", [])
+            except ValueError:
+                pass
+
+    def median(self, count=RECENT):
+        """
+        The median time to ready of the last count startups, or None.
+        """
+        recent = sorted(s["seconds"] for s in self.startups[-count:])
+        if not recent:
+            return None
+        middle = len(recent) // 2
+        if len(recent) % 2:
+            return recent[middle]
+        return (recent[middle - 1] + recent[middle]) / 2.0
+
+    def record(self, seconds, probes, when=None):
+        self.startups.append(
+            {
+                "time": time.time() if when is None else when,
+                "seconds": round(seconds, 3),
+                "probes": probes,
+            }
+        )
+        del self.startups[:-HISTORY_SIZE]
+
+    def save(self):
+        tmp = self._path.new(basename=self._path.basename + ".tmp")
+        tmp.write(
+            json.dumps({"startups": self.startups}, indent=2, sort_keys=True)
+        )
+        os.rename(tmp.strpath, self._path.strpath)
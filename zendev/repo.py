@@ -1,18 +1,273 @@
 from __future__ import absolute_import, print_function
 
+import os
 import re
-import sys
+import subprocess
+import threading
+import time
+from collections import namedtuple
 
-import gitflow.core
 import py
 
-from git.exc import GitCommandError
-
-from .utils import is_git_repo, memoize
+from .utils import is_git_repo, LRUCache
 
 is_github = re.compile(r"^[^\/\s@]+\/[^\/\s]+$").match
 
 
+class GitError(Exception):
+    pass
+
+
+class RepoStatus(
+    namedtuple(
+        "RepoStatus",
+        "name branch ahead behind staged unstaged untracked files",
+    )
+):
+    """
+    The working tree state of a repository, as reported by git status.
+    """
+
+    @property
+    def changed(self):
+        return bool(
+            self.ahead
+            or self.behind
+            or self.staged
+            or self.unstaged
+            or self.untracked
+        )
+
+
+TuneResult = namedtuple("TuneResult", "name before after")
+TuneResult.__doc__ = """
+How long git status took in a repository before and after tuning it.
+"""
+
+# Settings that make git faster on big working trees
+TUNED_CONFIG = (
+    ("core.untrackedCache", "true"),
+    ("feature.manyFiles", "true"),
+    ("core.splitIndex", "true"),
+    ("fetch.writeCommitGraph", "true"),
+)
+
+PullResult = namedtuple("PullResult", "name outcome fetch_time merge_time")
+PullResult.__doc__ = """
+What pull() did to a repository and how long fetching and merging took.
+"""
+
+
+MAX_OPEN_REPOS = 64
+PREFETCH_REFS = "refs/prefetch/remotes/"
+
+
+def _close(handle):
+    if handle.repo is not None:
+        handle.repo.close()
+
+
+# Open GitFlow handles by repo path.  Each holds GitPython's long-running
+# git processes, so only the most recently used ones are kept.
+_handles = LRUCache(MAX_OPEN_REPOS, on_evict=_close)
+
+# gitflow init runs with the process's stdout and stderr captured, so only
+# one thread may do it at a time, and nothing else should write to them
+# meanwhile
+output_lock = threading.Lock()
+
+# The settings Repository.initialize() makes sure are there
+INITIALIZED_SETTINGS = (
+    "gitflow.branch.master",
+    "gitflow.branch.develop",
+    "gitflow.prefix.feature",
+    "gitflow.prefix.release",
+    "gitflow.prefix.hotfix",
+    "gitflow.prefix.support",
+    "gitflow.prefix.versiontag",
+    "include.path",
+)
+
+
+def url_name(url):
+    """
+    The path, relative to a source root, at which url is checked out.
+
+    e.g. git@github.com:zenoss/foo.git -> github.com/zenoss/foo
+    """
+    name = str(url)
+    if name.startswith("git@"):
+        name = name[len("git@"):]
+        name = name.replace(":", "/")
+    elif "://" in name:
+        name = name.split("://", 1)[1]
+        host, sep, path = name.partition("/")
+        name = host.split("@")[-1] + sep + path
+    if name.endswith(".git"):
+        name = name[0: len(name) - len(".git")]
+    return name
+
+
+def run_git(args, cwd=None, name=None):
+    """
+    Run git with args and return its output, raising GitError on failure.
+    """
+    proc = subprocess.Popen(
+        ["git"] + list(args),
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    out, err = proc.communicate()
+    if proc.returncode:
+        raise GitError(
+            "git %s failed in %s: %s"
+            % (args[0], name or cwd or ".", err.decode("utf-8").strip())
+        )
+    return out.decode("utf-8")
+
+
+def worktree_common_dir(path):
+    """
+    Return the git directory shared by the worktree at path, or None if
+    path isn't a linked worktree.
+    """
+    path = py.path.local(path)
+    if not path.join(".git").check(file=True):
+        return None
+    common = run_git(["rev-parse", "--git-common-dir"], cwd=path.strpath)
+    return path.join(common.strip(), abs=True)
+
+
+def git_dirs(path):
+    """
+    The git directory of the working tree at path and the one it shares
+    with other worktrees (the same for a plain clone), found without
+    running git.  (None, None) if path has no .git.
+    """
+    gitdir = os.path.join(str(path), ".git")
+    if os.path.isfile(gitdir):
+        with open(gitdir) as f:
+            line = f.readline().strip()
+        if not line.startswith("gitdir:"):
+            return None, None
+        gitdir = os.path.join(str(path), line.split(":", 1)[1].strip())
+    elif not os.path.isdir(gitdir):
+        return None, None
+    commondir = os.path.join(gitdir, "commondir")
+    if os.path.isfile(commondir):
+        with open(commondir) as f:
+            return gitdir, os.path.join(gitdir, f.read().strip())
+    return gitdir, gitdir
+
+
+def _config_file(path):
+    """
+    The config file of the repository at path, found without running git.
+    """
+    commondir = git_dirs(path)[1]
+    if commondir is None:
+        return None
+    config = os.path.join(commondir, "config")
+    return config if os.path.isfile(config) else None
+
+
+# How deep includes are followed, as in git
+MAX_INCLUDE_DEPTH = 10
+
+
+def config_names(path):
+    """
+    The names (e.g. gitflow.branch.develop) of the settings in the config
+    file of the repository at path, and in the files it includes with
+    include.path, read directly rather than through git.  Conditional
+    includes (includeIf) are not followed.
+    """
+    config = _config_file(str(path))
+    names = set()
+    if config is not None:
+        _read_config_names(config, names, 0)
+    return names
+
+
+def _read_config_names(config, names, depth):
+    section = ""
+    includes = []
+    with open(config) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line[0] in "#;":
+                continue
+            if line.startswith("["):
+                header, _, line = line[1:].partition("]")
+                name, _, sub = header.strip().partition(" ")
+                section = name.lower()
+                if sub:
+                    section += "." + sub.strip().strip('"')
+                line = line.strip()
+                if not line or line[0] in "#;":
+                    continue
+            key = re.split(r"[\s=]", line, 1)[0].lower()
+            names.add(section + "." + key)
+            if section + "." + key == "include.path" and "=" in line:
+                includes.append(line.split("=", 1)[1].strip().strip('"'))
+    for include in includes:
+        # Relative to the file that includes it
+        include = os.path.join(
+            os.path.dirname(config), os.path.expanduser(include)
+        )
+        if depth < MAX_INCLUDE_DEPTH and os.path.isfile(include):
+            _read_config_names(include, names, depth + 1)
+
+
+def linked_worktrees(root):
+    """
+    Yield the linked worktrees under root, without descending into repos.
+    """
+    root = py.path.local(root)
+    if not root.check(dir=True):
+        return iter(())
+    return root.visit(
+        lambda p: p.join(".git").check(file=True),
+        rec=lambda d: not d.join(".git").check(),
+    )
+
+
+def parse_status(name, output):
+    """
+    Build a RepoStatus from ``git status --porcelain=v2 --branch`` output.
+    """
+    head = oid = None
+    ahead = behind = staged = unstaged = untracked = 0
+    files = []
+    for line in output.splitlines():
+        if line.startswith("# branch.head "):
+            head = line.split(" ", 2)[2]
+        elif line.startswith("# branch.oid "):
+            oid = line.split(" ", 2)[2]
+        elif line.startswith("# branch.ab "):
+            a, b = line.split(" ")[2:4]
+            ahead, behind = int(a), -int(b)
+        elif line.startswith("? "):
+            untracked += 1
+            files.append(("??", line[2:]))
+        elif line[:2] in ("1 ", "2 ", "u "):
+            xy = line[2:4]
+            if line[0] == "u":
+                unstaged += 1
+            else:
+                staged += xy[0] != "."
+                unstaged += xy[1] != "."
+            # The path is the last field; renames add a tab-separated origin
+            path = line.split(" ", {"1": 8, "2": 9, "u": 10}[line[0]])[-1]
+            files.append((xy.replace(".", " "), path.split("\t")[0]))
+    if head == "(detached)" or head is None:
+        head = (oid or "")[:7]
+    return RepoStatus(
+        name, head, ahead, behind, staged, unstaged, untracked, files
+    )
+
+
 class Repository(object):
     """
     A repository.
@@ -25,7 +280,36 @@ class Repository(object):
         self.url = self._proper_url(repo)
         self.ref = ref
         self.progress = None
-        self._repo = None
+        # A local repo to borrow objects from when cloning (see cache.py)
+        self.reference = None
+        # A local repo to check this one out as a worktree of, instead of
+        # cloning
+        self.source = None
+        # The directories to limit the working tree to (a cone-mode sparse
+        # checkout), or None to leave it as it is
+        self.sparse = None
+        # Whether refs/prefetch is recent enough to fetch from instead of
+        # the remotes
+        self.prefetched = False
+
+    def _git(self, *args):
+        """
+        Run a git command in this repository and return its output.
+        """
+        return run_git(args, cwd=self.path.strpath, name=self.name)
+
+    def status(self):
+        """
+        Return the RepoStatus of the working tree.
+
+        Unlike most methods here this doesn't initialize gitflow, so it is
+        safe to call on many repositories at once.
+        """
+        if not self.path.check(dir=True):
+            raise GitError("%s is not cloned" % self.name)
+        return parse_status(
+            self.name, self._git("status", "--porcelain=v2", "--branch")
+        )
 
     def _proper_url(self, url):
         if is_github(url):
@@ -33,79 +317,473 @@ class Repository(object):
         return url
 
     @property
-    @memoize
+    def query(self):
+        """
+        The GitQuery shared by everything that asks about this repository.
+        """
+        from .gitquery import get_query
+
+        return get_query(self.path.strpath)
+
+    @property
     def branch(self):
-        try:
-            return self.repo.repo.active_branch.name
-        except TypeError:
-            head = self.repo.repo.head
-            sha, target = head._get_ref_info(head.repo, head.path)
-            return sha
+        """
+        The checked out branch, or the commit if HEAD is detached.
+
+        Cached until invalidate() is called; methods here that move HEAD
+        call it themselves.
+        """
+        return self.query.branch() or self.query.resolve("HEAD")
 
     @property
-    @memoize
     def repo(self):
-        self.initialize()
-        return self._repo
+        """
+        The GitFlow handle of the repository, initializing gitflow first.
+        """
+        handle = _handles.get(self.path.strpath)
+        if handle is None:
+            handle = self.initialize()
+        return handle
+
+    def invalidate(self):
+        """
+        Forget what is cached about HEAD and the refs.
+        """
+        self.query.refresh()
+
+    def release(self):
+        """
+        Close the repository's GitFlow handle, if it is open.
+        """
+        handle = _handles.pop(self.path.strpath)
+        if handle is not None:
+            _close(handle)
+        self.invalidate()
 
     def checkout(self, ref):
+        if self.path.join(".git").check(file=True):
+            return self._checkout(ref)
         if ref != self.branch:
-            self.repo.repo.git.checkout(ref)
+            try:
+                self.repo.repo.git.checkout(ref)
+            finally:
+                self.invalidate()
 
     def clone(self, shallow=False):
-        kwargs = {}
-        if shallow:
-            kwargs["depth"] = 1
-        if self.ref:
-            kwargs["branch"] = self.ref
         if self.path.check():
             raise Exception(
                 "Something already exists at %s. "
                 "Remove it first." % self.path
             )
-        else:
-            self.path.dirpath().ensure(dir=True)
+        self._clone(shallow)
+        # Worktrees share their source's config, gitflow's included
+        if not shallow and self.source is None:
+            self.initialize()
+
+    def _clone(self, shallow=False):
+        """
+        Clone the repository and check out self.ref using plain git.
+        """
+        self.path.dirpath().ensure(dir=True)
+        if self.source is not None:
+            self._add_worktree()
+            return self.apply_sparse()
+        args = ["clone", "--quiet"]
+        if self.reference:
+            args.extend(["--reference-if-able", str(self.reference)])
+        if self.sparse is not None:
+            # Check out only the top-level files until the cone is set
+            args.append("--sparse")
+        target = [self.url, self.path.strpath]
+        depth = ["--depth", "1"] if shallow else []
+        try:
+            branch = ["--branch", self.ref] if self.ref else []
+            run_git(args + depth + branch + target, name=self.name)
+        except GitError:
+            if not self.ref:
+                raise
+            # Can't clone a hash, so clone the entire repo and check out
+            # the ref
+            if self.path.check():
+                self.path.remove()
+            run_git(args + target, name=self.name)
+            self._git("checkout", "--quiet", self.ref)
+        self.apply_sparse()
+
+    def sparse_dirs(self):
+        """
+        The directories the working tree is limited to, or None if it
+        isn't a sparse checkout.
+        """
+        try:
+            enabled = self._git("config", "--bool", "core.sparseCheckout")
+        except GitError:
+            # Not set
+            return None
+        if enabled.strip() != "true":
+            return None
+        return self._git("sparse-checkout", "list").splitlines()
+
+    def apply_sparse(self):
+        """
+        Limit the working tree to the directories in self.sparse, unless
+        self.sparse is None or it is limited to them already.
+        """
+        if self.sparse is None:
+            return
+        if sorted(self.sparse_dirs() or ()) != sorted(self.sparse):
+            self._git("sparse-checkout", "set", "--cone", *self.sparse)
+
+    def disable_sparse(self):
+        """
+        Check out the whole working tree again.
+        """
+        if self.sparse_dirs() is not None:
+            self._git("sparse-checkout", "disable")
+
+    def _add_worktree(self):
+        """
+        Check out self.ref as a new worktree of self.source.
+
+        A branch can only be checked out in one worktree at a time, so if
+        self.ref is in use elsewhere the worktree is detached at its remote
+        branch instead (or at self.ref, if there is no remote branch).
+        """
+        source = str(self.source)
+        try:
+            run_git(
+                ["rev-parse", "--verify", "--quiet", self.ref + "^{commit}"],
+                cwd=source,
+                name=self.name,
+            )
+        except GitError:
+            # Unknown ref; a remote branch of that name is checked out as
+            # a new tracking branch
+            run_git(["fetch", "--all", "--quiet"], cwd=source, name=self.name)
+        # Forget worktrees whose directories are gone, such as the remains
+        # of an interrupted restore
+        run_git(["worktree", "prune"], cwd=source, name=self.name)
+        args = ["worktree", "add", "--quiet"]
+        target = [self.path.strpath, self.ref]
+        try:
+            run_git(args + target, cwd=source, name=self.name)
+        except GitError as e:
+            # Newer gits say "is already used by worktree"
+            if not any(
+                msg in str(e)
+                for msg in ("already checked out", "already used by worktree")
+            ):
+                raise
+            # Not source's copy of the branch, which may be behind or have
+            # commits that haven't been pushed
+            remote = "origin/" + self.ref
             try:
-                gitrepo = gitflow.core.Repo.clone_from(
-                    self.url, str(self.path), progress=self.progress, **kwargs
+                run_git(
+                    ["rev-parse", "--verify", "--quiet", remote + "^{commit}"],
+                    cwd=source,
+                    name=self.name,
                 )
-            except GitCommandError:
-                # Can't clone a hash, so clone the entire repo and check out
-                # the ref
-                gitrepo = gitflow.core.Repo.clone_from(
-                    self.url, str(self.path), progress=self.progress
+                target[1] = remote
+            except GitError:
+                pass
+            run_git(args + ["--detach"] + target, cwd=source, name=self.name)
+
+    def export_bundle(self, bundle):
+        """
+        Write the branches, remote branches and tags of the repository to a
+        git bundle.
+        """
+        shallow = self._git("rev-parse", "--is-shallow-repository")
+        if shallow.strip() == "true":
+            raise GitError(
+                "%s is a shallow clone; can't bundle it" % self.name
+            )
+        self._git(
+            "bundle",
+            "create",
+            "--quiet",
+            str(bundle),
+            "--branches",
+            "--remotes",
+            "--tags",
+        )
+
+    def import_bundle(self, bundle):
+        """
+        Create the repository from a bundle written by export_bundle and
+        check out self.ref, all without going to the network.
+        """
+        if self.path.check():
+            raise GitError("%s already exists" % self.path)
+        self.path.ensure(dir=True)
+        self._git("init", "--quiet")
+        self._git(
+            "fetch",
+            "--quiet",
+            "--update-head-ok",
+            str(bundle),
+            "+refs/heads/*:refs/heads/*",
+            "+refs/remotes/origin/*:refs/remotes/origin/*",
+            "+refs/tags/*:refs/tags/*",
+        )
+        self._git("remote", "add", "origin", self.url)
+        refs = self._git(
+            "for-each-ref", "--format=%(refname)", "refs/heads", "refs/remotes"
+        ).split()
+        # Branches track their remote branches again
+        for ref in refs:
+            branch = ref[len("refs/heads/"):]
+            if ref.startswith("refs/heads/") and (
+                "refs/remotes/origin/" + branch in refs
+            ):
+                self._git(
+                    "branch",
+                    "--quiet",
+                    "--set-upstream-to=origin/" + branch,
+                    branch,
                 )
-                gitrepo.git.checkout(self.ref)
-            self._repo = gitflow.core.GitFlow(gitrepo)
-            if not shallow:
-                self.initialize()
+        self._checkout(self.ref)
+        self.apply_sparse()
 
-    def merge_from_remote(self):
+    def _checkout(self, ref):
+        try:
+            self._git("checkout", "--quiet", ref)
+        except GitError:
+            if not self.path.join(".git").check(file=True):
+                raise
+            # A worktree can't check out a branch that another worktree of
+            # the same repo has checked out
+            self._git("checkout", "--quiet", "--detach", ref)
+        finally:
+            self.invalidate()
+
+    def restore(self, shallow=False):
+        """
+        Clone the repository at self.ref, or check out self.ref if it has
+        already been cloned.
+
+        Only plain git is used, so this is safe to call on many
+        repositories at once; returns "cloned", "linked" (for a new
+        worktree of self.source) or "checked out".
+        """
+        if not self.path.check():
+            self._clone(shallow)
+            return "cloned" if self.source is None else "linked"
+        if self._git("config", "remote.origin.url").strip() != self.url:
+            self._git("remote", "set-url", "origin", self.url)
+        self.fetch()
         try:
-            active_branch = self.repo.repo.active_branch
-        except TypeError:
+            self._checkout(self.ref)
+        except GitError:
+            if not self.prefetched:
+                raise
+            # A tag, or a branch newer than the last prefetch
+            self.fetch(prefetched=False)
+            self._checkout(self.ref)
+        self.apply_sparse()
+        if self.fast_forward() == "diverged":
+            raise GitError(
+                "%s has diverged from its upstream; not updating"
+                % self.name
+            )
+        return "checked out"
+
+    def merge_from_remote(self):
+        local_name = self.query.branch()
+        if local_name is None:
             # We're detached
             return
-        local_name = active_branch.name
-        tracking = active_branch.tracking_branch()
-        remote_name = tracking.name if tracking else local_name
+        tracking = self.query.upstream(local_name)
+        remote_name = (
+            tracking[len("refs/remotes/"):] if tracking else local_name
+        )
 
-        if self.repo.is_merged_into(remote_name, local_name):
+        if self.query.is_ancestor(tracking or local_name, "HEAD"):
             # Nothing to do
             return
         print(
             "Changes found in %s:%s! Rebasing %s..."
             % (self.name, remote_name, local_name)
         )
-        self.repo.git.rebase(remote_name, output_stream=sys.stderr)
-
-    def fetch(self):
-        self.repo.git.fetch(all=True)
-
-    def initialize(self):
-        if not self._repo and is_git_repo(self.path):
-            self._repo = gitflow.core.GitFlow(self.path.strpath)
-        if self._repo and not self._repo.is_initialized():
-            py.io.StdCaptureFD.call(self._repo.init)
-        if self._repo and not self._repo.get("include.path", ""):
-            self._repo.set("include.path", "../gitflow-branch-config")
+        try:
+            self._git("rebase", remote_name)
+        finally:
+            self.invalidate()
+
+    def fetch(self, prefetched=None):
+        """
+        Fetch all remotes, or, if prefetched (default: self.prefetched),
+        fast-forward the remote branches to refs/prefetch without touching
+        the network.
+        """
+        if prefetched is None:
+            prefetched = self.prefetched
+        try:
+            if prefetched:
+                self._fast_forward_remotes()
+            else:
+                self._git("fetch", "--all", "--quiet")
+        finally:
+            self.invalidate()
+
+    def _fast_forward_remotes(self):
+        """
+        Move each remote branch to its prefetched commit if that is a
+        descendant of it.  A remote branch that is newer than the prefetch
+        (say, it was pushed to since) or has diverged from it is left
+        alone.
+        """
+        query = self.query
+        output = self._git(
+            "for-each-ref",
+            "--format=%(refname)%00%(objectname)",
+            PREFETCH_REFS,
+        )
+        for line in output.splitlines():
+            name, sha = line.split("\0")
+            ref = "refs/remotes/" + name[len(PREFETCH_REFS):]
+            current = query.resolve(ref)
+            if current == sha:
+                continue
+            if current is None:
+                self._git("update-ref", "-m", "prefetch", ref, sha)
+            elif query.is_ancestor(current, sha):
+                # Only if it hasn't moved since it was read
+                self._git("update-ref", "-m", "prefetch", ref, sha, current)
+
+    def prefetch(self):
+        """
+        Fetch the branches of every remote into refs/prefetch, leaving the
+        remote branches, tags and working tree alone, so it is safe to run
+        in the background.  Returns how long it took.
+        """
+        if not self.path.check(dir=True):
+            raise GitError("%s is not cloned" % self.name)
+        start = time.time()
+        for remote in self._git("remote").split():
+            self._git(
+                "fetch",
+                "--quiet",
+                "--prune",
+                "--no-tags",
+                "--no-write-fetch-head",
+                # Don't update the remote branches as a side effect
+                "--refmap=",
+                remote,
+                "+refs/heads/*:%s%s/*" % (PREFETCH_REFS, remote),
+            )
+        return time.time() - start
+
+    def fast_forward(self, rebase=False):
+        """
+        Bring the current branch up to date with its upstream.
+
+        Fast-forwards when possible.  A branch that has diverged is rebased
+        onto its upstream if rebase is True and otherwise left alone.
+        Returns a short description of what happened.
+        """
+        query = self.query
+        branch = query.branch()
+        if branch is None:
+            return "detached"
+        upstream = query.upstream(branch)
+        if upstream is None:
+            return "no upstream"
+        if query.is_ancestor(upstream, "HEAD"):
+            return "up to date"
+        if query.is_ancestor("HEAD", upstream):
+            try:
+                self._git("merge", "--ff-only", "--quiet", upstream)
+            finally:
+                self.invalidate()
+            return "fast-forwarded"
+        if not rebase:
+            return "diverged"
+        try:
+            self._git("rebase", "--autostash", upstream)
+        except GitError:
+            self._git("rebase", "--abort")
+            raise
+        finally:
+            self.invalidate()
+        return "rebased"
+
+    def pull(self, rebase=False):
+        """
+        Fetch all remotes (see fetch()) and fast-forward (or rebase) the
+        current branch.
+
+        Safe to call on many repositories at once; returns a PullResult.
+        """
+        if not self.path.check(dir=True):
+            raise GitError("%s is not cloned" % self.name)
+        start = time.time()
+        self.fetch()
+        fetched = time.time()
+        outcome = self.fast_forward(rebase=rebase)
+        return PullResult(
+            self.name, outcome, fetched - start, time.time() - fetched
+        )
+
+    def _time_status(self, runs=2):
+        best = None
+        for _ in range(runs):
+            start = time.time()
+            self._git("status", "--porcelain")
+            elapsed = time.time() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def tune(self, timings=True):
+        """
+        Turn on git's features for big working trees (TUNED_CONFIG) and
+        write the commit-graph and multi-pack-index.
+
+        Safe to call on many repositories at once; returns a TuneResult
+        with the best of two git status runs before and after, or Nones if
+        timings is False.
+        """
+        if not self.path.check(dir=True):
+            raise GitError("%s is not cloned" % self.name)
+        before = self._time_status() if timings else None
+        for key, value in TUNED_CONFIG:
+            self._git("config", key, value)
+        # Convert the index now instead of on the next command to write it
+        self._git("update-index", "--split-index", "--untracked-cache")
+        self._git("commit-graph", "write", "--reachable")
+        counts = dict(
+            line.split(": ", 1)
+            for line in self._git("count-objects", "-v").splitlines()
+        )
+        if int(counts.get("packs", 0)):
+            self._git("multi-pack-index", "write")
+        after = None
+        if timings:
+            # The first status after enabling the untracked cache fills it
+            self._git("status", "--porcelain")
+            after = self._time_status()
+        return TuneResult(self.name, before, after)
+
+    def is_initialized(self):
+        """
+        Whether initialize() has nothing left to do, answered from the
+        repository's config file without starting git.
+        """
+        return set(INITIALIZED_SETTINGS) <= config_names(self.path)
+
+    def initialize(self, tune=False):
+        import gitflow.core
+
+        handle = _handles.get(self.path.strpath)
+        if handle is None and is_git_repo(self.path):
+            handle = _handles.put(
+                self.path.strpath, gitflow.core.GitFlow(self.path.strpath)
+            )
+        if handle and not handle.is_initialized():
+            with output_lock:
+                py.io.StdCaptureFD.call(handle.init)
+        if handle and not handle.get("include.path", ""):
+            handle.set("include.path", "../gitflow-branch-config")
+        if handle and tune:
+            self.tune(timings=False)
+        return handle
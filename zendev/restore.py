@@ -0,0 +1,292 @@
+from __future__ import absolute_import, print_function
+
+import json
+import os
+import re
+import subprocess
+import threading
+import time
+
+from .repo import GitError, git_dirs, run_git, url_name
+from .utils import parallel, DEFAULT_WORKERS
+
+STATE_FILE = "restore-state.json"
+APPLIED_FILE = "applied-manifest.json"
+
+
+def stream_manifest(path, args, cwd, poll=0.1):
+    """
+    Run args in cwd and yield the entries of the JSON list it writes to
+    path.
+
+    Entries are yielded as soon as they are complete in the file, so work
+    on the first repos can start before the whole list has been generated.
+    Raises CalledProcessError if the command fails.
+    """
+    if path.check():
+        path.remove()
+    proc = subprocess.Popen(args, cwd=str(cwd))
+    decoder = json.JSONDecoder()
+    pos, opened = 0, False
+    while True:
+        running = proc.poll() is None
+        content = path.read() if path.check() else ""
+        while True:
+            while pos < len(content) and content[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(content):
+                break
+            if not opened:
+                if content[pos] != "[":
+                    break
+                opened, pos = True, pos + 1
+                continue
+            if content[pos] == "]":
+                break
+            try:
+                entry, pos = decoder.raw_decode(content, pos)
+            except ValueError:
+                # Not fully written yet
+                break
+            yield entry
+        if not running:
+            break
+        time.sleep(poll)
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, args)
+
+
+class RestoreState(object):
+    """
+    Progress of a restore, saved so an interrupted restore can resume.
+
+    Repos are marked started before they are handed to a worker and done
+    once they have been restored.  A repo whose clone was started but never
+    finished may have left a partial clone behind, which is safe to remove.
+    """
+
+    def __init__(self, path, ref):
+        self._path = path
+        self._lock = threading.Lock()
+        data = {}
+        if path.check():
+            try:
+                data = json.loads(path.read())
+            except ValueError:
+                pass
+        if data.get("ref") != ref:
+            data = {}
+        self.ref = ref
+        self.cloning = set(data.get("cloning", ()))
+        self.done = set(data.get("done", ()))
+
+    def start(self, name, clone):
+        with self._lock:
+            if clone:
+                self.cloning.add(name)
+            self._save()
+
+    def finish(self, name):
+        with self._lock:
+            self.cloning.discard(name)
+            self.done.add(name)
+            self._save()
+
+    def interrupted(self, name):
+        """
+        True if a previous attempt started cloning name and never finished.
+        """
+        return name in self.cloning
+
+    def _save(self):
+        tmp = self._path.new(basename=self._path.basename + ".tmp")
+        tmp.write(
+            json.dumps(
+                {
+                    "ref": self.ref,
+                    "cloning": sorted(self.cloning),
+                    "done": sorted(self.done),
+                }
+            )
+        )
+        os.rename(tmp.strpath, self._path.strpath)
+
+    def clear(self):
+        if self._path.check():
+            self._path.remove()
+
+
+class AppliedManifest(object):
+    """
+    The URL and ref each repo was last restored to.
+
+    Restores compare the manifest they are applying against this one and
+    leave repos whose URL and ref haven't changed alone.  Repos are keyed by
+    their path under the source root.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self.repos = {}
+        if path.check():
+            try:
+                self.repos = json.loads(path.read())
+            except ValueError:
+                pass
+        self._current = {}
+
+    @staticmethod
+    def key(repo):
+        return url_name(repo.url)
+
+    def get(self, repo):
+        return self.repos.get(self.key(repo))
+
+    def record(self, repo, applied=True):
+        """
+        Note that repo is in the manifest being applied, and whether it
+        was restored.
+        """
+        entry = {"url": repo.url, "ref": repo.ref} if applied else None
+        self._current[self.key(repo)] = entry or self.get(repo)
+
+    def dropped(self):
+        """
+        Keys of the repos that are no longer in the manifest.
+        """
+        return sorted(set(self.repos) - set(self._current))
+
+    def save(self):
+        """
+        Save the entries of the manifest being applied; repos that failed
+        keep their previous entry, so they are retried next time.
+        """
+        repos = dict((k, v) for k, v in self._current.items() if v)
+        tmp = self._path.new(basename=self._path.basename + ".tmp")
+        tmp.write(json.dumps(repos, indent=2, sort_keys=True))
+        os.rename(tmp.strpath, self._path.strpath)
+        self.repos = repos
+
+
+# What an abbreviated commit name looks like
+_ABBREV_SHA = re.compile(r"^[0-9a-f]{7,40}$")
+
+
+def at_ref(repo):
+    """
+    Whether repo has its ref checked out: the branch named ref, or the
+    commit ref names with HEAD detached.
+    """
+    gitdir = git_dirs(repo.path.strpath)[0]
+    if gitdir is None:
+        return False
+    try:
+        with open(os.path.join(gitdir, "HEAD")) as f:
+            head = f.read().strip()
+    except (IOError, OSError):
+        return False
+    if head.startswith("ref: refs/heads/"):
+        return head[len("ref: refs/heads/"):] == repo.ref
+    # Only a commit name can be compared with HEAD as it is; a tag or
+    # branch named "abc" says nothing about a HEAD that starts with it
+    if _ABBREV_SHA.match(repo.ref) and head.startswith(repo.ref):
+        return True
+    try:
+        commit = run_git(
+            ["rev-parse", "--verify", "--quiet", repo.ref + "^{commit}"],
+            cwd=repo.path.strpath,
+        )
+    except GitError:
+        return False
+    return commit.strip() == head
+
+
+def plan_restore(repos, applied, full=False):
+    """
+    Decide what restoring each of repos involves.
+
+    Yields (repo, action, previous) where action is "clone", "checkout" or
+    "unchanged" and previous is the repo's entry in applied (an
+    AppliedManifest), if any.  Unless full is True, repos already restored
+    to the same URL and ref, and still at that ref, are unchanged.
+    """
+    for repo in repos:
+        previous = applied.get(repo)
+        if not repo.path.check():
+            action = "clone"
+        elif (
+            full
+            or previous != {"url": repo.url, "ref": repo.ref}
+            or not at_ref(repo)
+        ):
+            action = "checkout"
+        else:
+            action = "unchanged"
+        applied.record(repo, action == "unchanged")
+        yield repo, action, previous
+
+
+def restore_repo(
+    repo, shallow=False, retries=2, cleanup=False, delay=1, cache=None
+):
+    """
+    Restore a single repo, retrying with backoff on git failures.
+
+    If cleanup is True, whatever is at the repo's path is assumed to be
+    the remains of an interrupted clone and is removed first.  New clones
+    borrow objects from cache (an ObjectCache) if one is given; shallow
+    ones only from mirrors it already has, since creating a mirror fetches
+    the whole history.
+    """
+    attempt = 0
+    while True:
+        fresh = cleanup or not repo.path.check()
+        if cleanup and repo.path.check():
+            repo.path.remove()
+        try:
+            if fresh and cache is not None:
+                if shallow:
+                    repo.reference = cache.existing(repo.url)
+                else:
+                    repo.reference = cache.ensure(repo.url)
+            return repo.restore(shallow=shallow)
+        except GitError:
+            if attempt >= retries:
+                raise
+            attempt += 1
+            cleanup = fresh
+            time.sleep(delay * 2 ** (attempt - 1))
+
+
+def restore_repos(
+    repos,
+    state,
+    shallow=False,
+    workers=DEFAULT_WORKERS,
+    retries=2,
+    cache=None,
+):
+    """
+    Restore repos on a pool of workers, skipping those already done.
+
+    repos may be a generator; repos are handed to workers as it yields
+    them.  Yields (Repository, outcome, exception) as each one finishes.
+    """
+
+    def pending():
+        for repo in repos:
+            exists = repo.path.check()
+            if repo.name in state.done and exists:
+                continue
+            cleanup = exists and state.interrupted(repo.name)
+            state.start(repo.name, clone=cleanup or not exists)
+            yield repo, cleanup
+
+    def work(item):
+        repo, cleanup = item
+        return restore_repo(repo, shallow, retries, cleanup, cache=cache)
+
+    for (repo, _), outcome, exc in parallel(work, pending(), workers):
+        if exc is None:
+            state.finish(repo.name)
+        yield repo, outcome, exc
@@ -0,0 +1,185 @@
+from __future__ import absolute_import, print_function
+
+import filecmp
+import hashlib
+import os
+import shutil
+
+TEMPLATE_DIR = "templates"
+KEEP_TEMPLATES = 10
+# Bump when the transforms change what they do, to drop templates cached
+# by older versions
+CACHE_VERSION = 2
+
+
+def tree_digest(path):
+    """
+    A sha256 of the names and contents of the files under path (or of path
+    itself, if it is a file), and of where its symlinks point, in a stable
+    order. Symlinked directories are followed, unless they lead back up the
+    tree.
+    """
+    digest = hashlib.sha256()
+    root = str(path)
+    if os.path.isfile(root):
+        with open(root, "rb") as f:
+            digest.update(f.read())
+        return digest.hexdigest()
+
+    def update(full, data):
+        name = os.path.relpath(full, root).replace(os.sep, "/")
+        digest.update(name.encode("utf-8") + b"\0" + data + b"\0")
+
+    # The real paths of each directory's ancestors, to catch cycles
+    parents = {root: (os.path.realpath(root),)}
+    for dirpath, dirnames, filenames in os.walk(root, followlinks=True):
+        above = parents.pop(dirpath)
+        dirnames.sort()
+        for dirname in list(dirnames):
+            full = os.path.join(dirpath, dirname)
+            real = os.path.realpath(full)
+            if os.path.islink(full):
+                update(full, b"-> " + os.readlink(full).encode("utf-8"))
+            if real in above:
+                dirnames.remove(dirname)
+            else:
+                parents[full] = above + (real,)
+        for filename in sorted(filenames):
+            full = os.path.join(dirpath, filename)
+            if os.path.islink(full):
+                update(full, b"-> " + os.readlink(full).encode("utf-8"))
+            if os.path.isfile(full):
+                with open(full, "rb") as f:
+                    update(full, f.read())
+    return digest.hexdigest()
+
+
+def merged_digest(base, modules):
+    """
+    A sha256 of the content of the base template directory and of each of
+    modules, a list of (name, directory) pairs, in order.
+    """
+    digest = hashlib.sha256()
+    digest.update(tree_digest(base).encode("utf-8") + b"\0")
+    for name, path in modules:
+        digest.update(name.encode("utf-8") + b"\0")
+        digest.update(tree_digest(path).encode("utf-8") + b"\0")
+    return digest.hexdigest()
+
+
+def _entries(root, prefix=""):
+    """
+    The files and symlinks under root, as (prefix/relative path, path)
+    pairs; symlinked directories are listed, not walked.
+    """
+    for dirpath, dirnames, filenames in os.walk(root):
+        for name in dirnames + filenames:
+            full = os.path.join(dirpath, name)
+            if os.path.islink(full) or name in filenames:
+                yield os.path.join(prefix, os.path.relpath(full, root)), full
+
+
+def _same(source, dest):
+    if os.path.islink(source):
+        return os.path.islink(dest) and os.readlink(dest) == os.readlink(
+            source
+        )
+    return (
+        not os.path.islink(dest)
+        and os.path.isfile(dest)
+        and filecmp.cmp(source, dest, shallow=True)
+    )
+
+
+def sync_tree(sources, target):
+    """
+    Make target hold the files of sources, a list of (directory, prefix)
+    pairs, each directory's files under prefix (later ones win), copying
+    only the files that are missing or differ and removing the rest.
+    Symlinks are recreated as symlinks to the same place.
+
+    Returns (files copied, files removed).
+    """
+    wanted = {}
+    for directory, prefix in sources:
+        wanted.update(_entries(str(directory), prefix))
+    target = str(target)
+    copied = removed = 0
+    # Remove what isn't wanted first, symlinks included, so nothing is
+    # copied through a stale symlink
+    for name, path in list(_entries(target)):
+        if name not in wanted or (
+            os.path.islink(path) and not _same(wanted[name], path)
+        ):
+            os.remove(path)
+            removed += 1
+    for name, source in wanted.items():
+        dest = os.path.join(target, name)
+        if _same(source, dest):
+            continue
+        if os.path.isdir(dest) and not os.path.islink(dest):
+            shutil.rmtree(dest)
+        if not os.path.isdir(os.path.dirname(dest)):
+            os.makedirs(os.path.dirname(dest))
+        if os.path.islink(source):
+            os.symlink(os.readlink(source), dest)
+        else:
+            shutil.copy2(source, dest)
+        copied += 1
+    # Symlinks to directories aren't walked, so they keep their parents
+    for dirpath, dirnames, filenames in os.walk(target, topdown=False):
+        if dirpath != target and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+    return copied, removed
+
+
+class TemplateCache(object):
+    """
+    Compiled and transformed service templates, keyed by the content of the
+    template directory and of make_template.sh, the image and the names of
+    the transforms applied.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def key(self, template, script, image, transforms, content=None):
+        """
+        The key of template compiled by script for image with transforms;
+        content is template's tree_digest, if it is already known.
+        """
+        digest = hashlib.sha256()
+        for part in (
+            str(CACHE_VERSION),
+            content or tree_digest(template),
+            tree_digest(script),
+            image or "",
+            ",".join(transforms),
+        ):
+            digest.update(part.encode("utf-8") + b"\0")
+        return digest.hexdigest()[:32]
+
+    def get(self, key):
+        """
+        The cached template for key, or None.
+        """
+        if key is None:
+            return None
+        path = self.root.join(key + ".json")
+        return path if path.check() else None
+
+    def put(self, key, template):
+        """
+        Cache template (compiled JSON) under key, dropping the oldest
+        entries.
+        """
+        if key is None:
+            return
+        self.root.ensure(dir=True)
+        path = self.root.join(key + ".json")
+        tmp = path.new(basename=path.basename + ".tmp")
+        tmp.write(template)
+        os.rename(tmp.strpath, path.strpath)
+        cached = sorted(self.root.listdir("*.json"), key=lambda p: p.mtime())
+        for path in cached[:-KEEP_TEMPLATES]:
+            path.remove()
@@ -0,0 +1,124 @@
+from __future__ import absolute_import, print_function
+
+import functools
+import json
+import math
+import sys
+import time
+from contextlib import contextmanager
+
+
+class Timeline(object):
+    """
+    How long each phase of a run took, in the order the phases finished.
+    """
+
+    def __init__(self, clock=time.time):
+        self._clock = clock
+        self.started = clock()
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self.phases.append((name, self._clock() - start))
+
+    def total(self):
+        return sum(secs for _, secs in self.phases)
+
+    def as_dict(self):
+        return {
+            "started": self.started,
+            "phases": [
+                {"name": name, "seconds": round(secs, 3)}
+                for name, secs in self.phases
+            ],
+            "total": round(self.total(), 3),
+        }
+
+    def report(self, stream=None):
+        stream = sys.stderr if stream is None else stream
+        width = max([len(name) for name, _ in self.phases] + [5])
+        print("Startup timeline:", file=stream)
+        for name, secs in self.phases:
+            print("  %-*s %8.2fs" % (width, name, secs), file=stream)
+        print("  %-*s %8.2fs" % (width, "total", self.total()), file=stream)
+
+
+def timed(name):
+    """
+    Decorate a method so that its calls are recorded as the phase name of
+    self.timeline.
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.timeline.phase(name):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def percentile(values, pct):
+    """
+    The pct-th percentile of values by the nearest-rank method.
+    """
+    ordered = sorted(values)
+    rank = int(math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[max(rank, 1) - 1]
+
+
+def summarize(timelines):
+    """
+    The p50 and p95 of each phase (and the total) over timelines, as a list
+    of (phase, runs, p50, p95) in the order the phases first appear.
+    """
+    names = []
+    times = {}
+    for timeline in timelines:
+        # A phase that ran more than once in a run counts as its sum
+        run = {}
+        for name, secs in timeline.phases:
+            if name not in times:
+                names.append(name)
+                times[name] = []
+            run[name] = run.get(name, 0) + secs
+        for name, secs in run.items():
+            times[name].append(secs)
+    names.append("total")
+    times["total"] = [t.total() for t in timelines]
+    return [
+        (
+            name,
+            len(times[name]),
+            percentile(times[name], 50),
+            percentile(times[name], 95),
+        )
+        for name in names
+        if times[name]
+    ]
+
+
+def report_summary(summary, stream=None):
+    stream = sys.stderr if stream is None else stream
+    width = max([len(s[0]) for s in summary] + [5])
+    print(
+        "  %-*s %4s %9s %9s" % (width, "phase", "runs", "p50", "p95"),
+        file=stream,
+    )
+    for name, runs, p50, p95 in summary:
+        print(
+            "  %-*s %4d %8.2fs %8.2fs" % (width, name, runs, p50, p95),
+            file=stream,
+        )
+
+
+def write_json(path, data):
+    with open(str(path), "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
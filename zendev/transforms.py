@@ -0,0 +1,152 @@
+"""
+Transforms applied to compiled service templates before they are added to
+serviced.
+
+A transform is a function of one service definition that edits it in place
+and returns True if the service should be removed from the template.
+Transforms are registered in the order they run; apply() runs a set of them
+over a whole template in one traversal.
+"""
+from __future__ import absolute_import, print_function
+
+from collections import namedtuple
+
+from .log import info
+
+Transform = namedtuple("Transform", "name func applies")
+
+_registry = []
+
+
+class UnknownTransform(Exception):
+    pass
+
+
+def register(name, applies=None):
+    """
+    Register the decorated function as the transform name, run after those
+    registered before it.  applies(template) says whether it is applied to
+    template (the name or path passed to compile_template) by default.
+    """
+
+    def decorator(func):
+        _registry.append(
+            Transform(name, func, applies or (lambda template: True))
+        )
+        return func
+
+    return decorator
+
+
+def registered():
+    """
+    The names of the registered transforms, in the order they run.
+    """
+    return [t.name for t in _registry]
+
+
+def select(template, names=None, skip=()):
+    """
+    The transforms to apply to template, in the order they run: those named
+    in names, or every one that applies to template if names is None, less
+    those named in skip.
+    """
+    unknown = [
+        n for n in list(names or ()) + list(skip) if n not in registered()
+    ]
+    if unknown:
+        raise UnknownTransform(
+            "Unknown template transform %s (known: %s)"
+            % (", ".join(unknown), ", ".join(registered()))
+        )
+    if names is None:
+        chosen = [t for t in _registry if t.applies(template)]
+    else:
+        chosen = [t for t in _registry if t.name in names]
+    return [t for t in chosen if t.name not in skip]
+
+
+def apply(services, transforms):
+    """
+    Apply transforms to each of services and their descendants, in one
+    traversal.  Services a transform removes are dropped from their lists
+    once the rest of the list has been visited, and their descendants
+    aren't visited.
+    """
+    if not services or not transforms:
+        return
+    kept = []
+    for svc in services:
+        if any(t.func(svc) for t in transforms):
+            continue
+        kept.append(svc)
+        apply(svc.get("Services"), transforms)
+    if len(kept) != len(services):
+        services[:] = kept
+
+
+@register("zope_debug")
+def zope_debug(svc):
+    if svc.get("Name") == "Zope":
+        info("Set Zope to debug in template")
+        svc["Command"] = svc["Command"].replace("runzope", "zopectl fg")
+
+        for hc in (svc.get("HealthChecks") or {}).values():
+            if "runzope" in hc["Script"]:
+                hc["Script"] = hc["Script"].replace("runzope", "zopectl")
+
+
+# disable pagespeed in zproxy to avoid obfuscating javascript
+@register("zproxy_debug")
+def zproxy_debug(svc):
+    title = svc.get("Title", None)
+    if title and title.lower() == "zproxy":
+        configs = svc.get("ConfigFiles", {})
+        config = configs.get("/opt/zenoss/zproxy/conf/zproxy-nginx.conf", None)
+        if config:
+            config["Content"] = config["Content"].replace(
+                "pagespeed on", "pagespeed off"
+            )
+            info("Disabled pagespeed in zproxy template")
+
+
+@register(
+    "remove_catalogservice",
+    applies=lambda template: bool(template)
+    and any(p in template for p in ("ucspm", "resmgr", "nfvimon")),
+)
+def remove_catalogservice(svc):
+    if svc.get("Name") == "zencatalogservice":
+        info("Removed zencatalogservice from resmgr template")
+        return True
+
+    if svc.get("HealthChecks"):
+        svc["HealthChecks"].pop("catalogservice_answering", None)
+    if svc.get("Prereqs"):
+        svc["Prereqs"] = [
+            prereq
+            for prereq in svc["Prereqs"]
+            if prereq["Name"] != "zencatalogservice response"
+        ]
+
+
+@register("remove_otsdb_bigtable")
+def remove_otsdb_bigtable(svc):
+    if svc.get("Name") in ("reader-bigtable", "writer-bigtable"):
+        info("Removed %s from resmgr template" % svc["Name"])
+        return True
+
+
+@register("remove_auth0_vars")
+def remove_auth0_vars(svc):
+    if svc.get("Name") == "Zenoss.cse":
+        for var in (
+            "auth0-audience",
+            "auth0-emailkey",
+            "auth0-tenant",
+            "auth0-tenantkey",
+            "auth0-whitelist",
+        ):
+            key = "global.conf.%s" % var
+            if svc["Context"].get(key, None):
+                svc["Context"][key] = ""
@@ -3,11 +3,13 @@ from __future__ import absolute_import, print_function
 import re
 import os
 import py
-import git
 import six
 import socket
+import stat
 from termcolor import colored as colored_orig
 import subprocess
+import threading
+from collections import OrderedDict
 
 _COLORS = not os.environ.get("ZENDEV_COLORS", "").lower() in (
     "0",
@@ -17,17 +19,148 @@ _COLORS = not os.environ.get("ZENDEV_COLORS", "").lower() in (
 )
 
 
-def is_git_repo(path):
+class LRUCache(object):
     """
-    Path is a filesystem path or a remote URI.
+    A thread-safe mapping that holds at most maxsize items, dropping the
+    least recently used ones first.  on_evict, if given, is called with
+    each item that is dropped to make room.
     """
-    if not py.path.local(path).check(dir=True):
-        return False
+
+    def __init__(self, maxsize, on_evict=None):
+        self.maxsize = maxsize
+        self._on_evict = on_evict
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._items.pop(key)
+            except KeyError:
+                return default
+            self._items[key] = value
+            return value
+
+    def _add(self, key, value):
+        # Called holding the lock; returns the items dropped to make room
+        self._items.pop(key, None)
+        self._items[key] = value
+        evicted = []
+        while len(self._items) > self.maxsize:
+            evicted.append(self._items.popitem(last=False)[1])
+        return evicted
+
+    def _evicted(self, evicted):
+        if self._on_evict is not None:
+            for item in evicted:
+                self._on_evict(item)
+
+    def put(self, key, value):
+        with self._lock:
+            evicted = self._add(key, value)
+        self._evicted(evicted)
+        return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._items.pop(key, default)
+
+    def setdefault(self, key, value):
+        """
+        Return the item for key, first adding value if there is none.
+        """
+        with self._lock:
+            if key in self._items:
+                existing = self._items.pop(key)
+                self._items[key] = existing
+                return existing
+            evicted = self._add(key, value)
+        self._evicted(evicted)
+        return value
+
+    def clear(self):
+        """
+        Remove every item; return them.
+        """
+        with self._lock:
+            items = list(self._items.values())
+            self._items.clear()
+        return items
+
+
+def _stat(path):
     try:
-        git.Repo(str(path))
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def _is_git_dir(gitdir):
+    """
+    Whether gitdir looks like a repository's git directory (or a linked
+    worktree's, which points at the shared one through commondir).
+    """
+    if not os.path.isfile(os.path.join(gitdir, "HEAD")):
+        return False
+    if os.path.isfile(os.path.join(gitdir, "commondir")):
         return True
-    except git.InvalidGitRepositoryError:
+    return os.path.isdir(os.path.join(gitdir, "objects")) and os.path.isdir(
+        os.path.join(gitdir, "refs")
+    )
+
+
+def _check_git_repo(path, dotgit, dotgit_stat):
+    if dotgit_stat is None:
+        if not os.path.isfile(os.path.join(path, "HEAD")):
+            return False
+        # Possibly a bare repository; let GitPython decide
+        import git
+
+        try:
+            git.Repo(path)
+            return True
+        except git.InvalidGitRepositoryError:
+            return False
+    if stat.S_ISDIR(dotgit_stat.st_mode):
+        return _is_git_dir(dotgit)
+    # A gitfile, as left by worktrees, submodules and --separate-git-dir
+    with open(dotgit) as f:
+        line = f.readline().strip()
+    if not line.startswith("gitdir:"):
+        return False
+    return _is_git_dir(os.path.join(path, line.split(":", 1)[1].strip()))
+
+
+_git_repos = LRUCache(4096)
+
+
+def is_git_repo(path):
+    """
+    Path is a filesystem path or a remote URI.
+
+    Answered by looking at path's .git with plain stat calls; GitPython is
+    only asked about directories that might be bare repositories.  Results
+    are cached until path or its .git is modified.
+    """
+    path = str(path)
+    st = _stat(path)
+    if st is None or not stat.S_ISDIR(st.st_mode):
         return False
+    dotgit = os.path.join(path, ".git")
+    dotgit_stat = _stat(dotgit)
+    signature = (
+        st.st_mtime,
+        dotgit_stat.st_mtime if dotgit_stat else None,
+    )
+    cached = _git_repos.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    result = _check_git_repo(path, dotgit, dotgit_stat)
+    _git_repos.put(path, (signature, result))
+    return result
 
 
 here = py.path.local(__file__).dirpath().join
@@ -127,6 +260,39 @@ def repofilter(repos=(), field_fn=lambda x: x.name):
     return filter_
 
 
+DEFAULT_WORKERS = 8
+
+
+def parallel(func, items, workers=DEFAULT_WORKERS):
+    """
+    Call func on every item using a bounded pool of threads.
+
+    Yields (item, result, exception) tuples in the order they complete.
+    Exceptions raised by func are returned rather than raised so one
+    failure doesn't abandon the remaining items.  items may be a generator;
+    it is consumed lazily, so work starts before it is exhausted.
+    """
+    from multiprocessing.pool import ThreadPool
+
+    def call(item):
+        try:
+            return item, func(item), None
+        except Exception as e:
+            return item, None, e
+
+    if hasattr(items, "__len__"):
+        if not items:
+            return
+        workers = min(workers, len(items))
+    pool = ThreadPool(max(1, workers))
+    try:
+        for result in pool.imap_unordered(call, items):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
 def get_ip_address():
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     try:
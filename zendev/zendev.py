@@ -6,30 +6,22 @@ import subprocess
 import os
 import sys
 import textwrap
+import time
 
-from .environment import ZenDevEnvironment, NotInitialized
-from .utils import here, colored
-
-from .cmd import (
-    build,
-    devimg,
-    environment,
-    repos,
-    serviced,
-    tags,
-    test,
-    dumpzodb,
-    impact_devimg,
-)
+from .environment import get_environment, NotInitialized
+from .repo import output_lock
+from .utils import here, colored, is_git_repo, parallel, DEFAULT_WORKERS
+
+from .cmd import add_commands
 
 from .config import get_config, get_envname
-from .log import error
+from .log import error, info
 
 
 def build_argparser():
     epilog = textwrap.dedent(
         """
-    Environment commands: {init, ls, use, drop, env, root}
+    Environment commands: {init, ls, use, drop, env, export, root}
     Repo commands: {cd, restore, status, pull}
     Serviced commands: {serviced, atttach, devshell, dump-zodb}
     """
@@ -55,21 +47,21 @@ def build_argparser():
     ls_parser.set_defaults(functor=ls)
 
     update_parser = subparsers.add_parser("selfupdate", help="Update zendev")
+    update_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="number of repos to initialize at once (default %(default)s)",
+    )
     update_parser.set_defaults(functor=selfupdate)
 
     version_parser = subparsers.add_parser("version", help="Print version")
     version_parser.set_defaults(functor=version)
 
-    # Add sub commands here
-    environment.add_commands(subparsers)
-    tags.add_commands(subparsers, tagsCompleter)
-    build.add_commands(subparsers)
-    devimg.add_commands(subparsers)
-    impact_devimg.add_commands(subparsers)
-    test.add_commands(subparsers)
-    repos.add_commands(subparsers)
-    serviced.add_commands(subparsers)
-    dumpzodb.add_commands(subparsers)
+    # Sub commands are registered in zendev.cmd; their implementing
+    # modules are only imported when the command runs.
+    add_commands(subparsers, tagsCompleter)
     argcomplete.autocomplete(parser)
 
     return parser
@@ -86,11 +78,38 @@ def selfupdate(args, env):
         )
     # Initialize all repos for all environments.  This is to ensure that repos
     # created without a branch.path config value are updated to include that.
+    start = time.time()
     config = get_config()
-    for env_name in config.environments:
+    repos = []
+    for env_name in sorted(config.environments):
         env = check_env(env_name)
-        for repo in env.repos():
-            repo.initialize()
+        if env._repos_file.check():
+            repos.extend(env.repos())
+    pending = [
+        r for r in repos if is_git_repo(r.path) and not r.is_initialized()
+    ]
+    failed = 0
+    for done, (repo, _, exc) in enumerate(
+        parallel(lambda repo: repo.initialize(), pending, args.jobs), 1
+    ):
+        with output_lock:
+            if exc is not None:
+                failed += 1
+                error("%s: %s" % (repo.path, exc))
+            print("[%d/%d] %s" % (done, len(pending), repo.path))
+            sys.stdout.flush()
+    info(
+        "%d repos initialized, %d up to date or not cloned, %d failed in "
+        "%.2fs"
+        % (
+            len(pending) - failed,
+            len(repos) - len(pending),
+            failed,
+            time.time() - start,
+        )
+    )
+    if failed:
+        sys.exit(1)
 
 
 def root(args, env):
@@ -138,7 +157,7 @@ def check_env(name=None, **kwargs):
         sys.exit(1)
 
     try:
-        return ZenDevEnvironment(envname, **kwargs)
+        return get_environment(envname, **kwargs)
     except NotInitialized:
         error("Not a zendev environment. Run 'zendev init' first.")
         sys.exit(1)
@@ -151,6 +170,7 @@ def check_env(name=None, **kwargs):
 all_env_whitelist = [
     "bootstrap",
     "env",
+    "export",
     "init," "ls",
     "root",
     "selfupdate",